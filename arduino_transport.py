@@ -0,0 +1,238 @@
+import asyncio
+import threading
+import time
+from collections import deque
+
+from instrumentation import stats
+
+
+class EventLoopThread:
+    def __init__(self, name="arduino-transport"):
+        """
+        Runs an asyncio event loop on a background thread, so blocking code can hand it work.
+        Several transports can share one loop.
+        :param name: Name of the thread.
+        """
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name=name, daemon=True)
+        self.thread.start()
+
+    def submit(self, coroutine):
+        """
+        Schedule a coroutine on the loop from any thread.
+        :param coroutine: The coroutine to run.
+        :return: A concurrent.futures.Future for its result.
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def call_soon(self, callback, *args):
+        """
+        Schedule a callback on the loop from any thread.
+        :param callback: The function to call.
+        :param args: Arguments for the callback.
+        """
+        self.loop.call_soon_threadsafe(callback, *args)
+
+    def stop(self):
+        """
+        Stop the loop and wait for its thread to finish.
+        """
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=5)
+
+
+class AsyncArduinoTransport:
+    def __init__(self, main, host, port, loop_thread=None, name=None):
+        """
+        Non-blocking connection to an Arduino, driven by an asyncio event loop.
+        Outgoing messages go through a bounded queue that drops the oldest message when full,
+        and the connection is re-established with exponential backoff whenever it drops.
+        :param main: The Main instance.
+        :param host: The Arduino's address.
+        :param port: The Arduino's port.
+        :param loop_thread: EventLoopThread to run on, a new one is started if None.
+        :param name: Name of the device, used in log messages.
+        """
+        self.main = main
+        self.host = host
+        self.port = port
+        self.name = name or f"{host}:{port}"
+        arduino_config = main.get_config()["arduino"]
+        self.queue_size: int = arduino_config.get("queue_size", 100)
+        self.connect_timeout: float = arduino_config.get("connect_timeout", 5)
+        self.reconnect_delay: float = arduino_config.get("reconnect_delay", 0.5)
+        self.max_reconnect_delay: float = arduino_config.get("max_reconnect_delay", 30)
+        self.max_message_size: int = arduino_config.get("max_message_size", 1024)
+        # An empty heartbeat message disables heartbeats and the receive timeout
+        self.heartbeat_message: str = arduino_config.get("heartbeat_message", "")
+        self.heartbeat_interval: float = arduino_config.get("heartbeat_interval", 5)
+        self.heartbeat_timeout: float = arduino_config.get("heartbeat_timeout", 15)
+
+        self.loop_thread = loop_thread or EventLoopThread()
+        self.owns_loop = loop_thread is None
+        self.outgoing = deque(maxlen=self.queue_size)
+        self.outgoing_ready = None
+        self.connected = threading.Event()
+        self.messages = deque(maxlen=100)
+        self.dropped = 0
+        self.task = None
+        self.run_task = None
+
+    def connect(self, wait=True):
+        """
+        Start connecting to the Arduino in the background.
+        :param wait: Wait up to connect_timeout seconds for the first connection.
+        :return: True if connected, False if still trying.
+        """
+        if self.task is None:
+            self.task = self.loop_thread.submit(self.run())
+        if wait:
+            return self.connected.wait(self.connect_timeout)
+        return self.connected.is_set()
+
+    def send_message(self, message):
+        """
+        Queue a message for the Arduino. Never blocks, safe to call from any thread.
+
+        :param message: String message to send
+        """
+        # Add newline to indicate end of message
+        self.loop_thread.call_soon(self.enqueue, (message.strip() + '\n').encode())
+
+    def enqueue(self, data):
+        """
+        Add encoded data to the outgoing queue. Runs on the event loop.
+        :param data: The bytes to send.
+        """
+        if len(self.outgoing) == self.outgoing.maxlen:
+            self.dropped += 1
+            print(f"[{self.name}] Outgoing queue full, dropping the oldest message.")
+        self.outgoing.append(data)
+        if self.outgoing_ready is not None:
+            self.outgoing_ready.set()
+
+    async def run(self):
+        """
+        Keep a connection to the Arduino open, reconnecting with exponential backoff.
+        """
+        self.run_task = asyncio.current_task()
+        self.outgoing_ready = asyncio.Event()
+        if self.outgoing:
+            self.outgoing_ready.set()
+        delay = self.reconnect_delay
+        while True:
+            try:
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_connection(self.host, self.port, limit=self.max_message_size),
+                    self.connect_timeout)
+            except (OSError, asyncio.TimeoutError) as e:
+                print(f"[{self.name}] Error connecting, retrying in {delay:.1f}s: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+                continue
+
+            print(f"Connected to Arduino Wi-Fi server at {self.host}:{self.port}")
+            delay = self.reconnect_delay
+            self.connected.set()
+            tasks = [asyncio.ensure_future(self.read_loop(reader)),
+                     asyncio.ensure_future(self.write_loop(writer))]
+            if self.heartbeat_message:
+                tasks.append(asyncio.ensure_future(self.heartbeat_loop()))
+            try:
+                done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception():
+                        print(f"[{self.name}] Connection lost: {task.exception()}")
+            finally:
+                self.connected.clear()
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                writer.close()
+
+    async def read_loop(self, reader):
+        """
+        Read newline terminated messages until the connection closes or times out.
+        :param reader: The connection's StreamReader.
+        """
+        timeout = self.heartbeat_timeout if self.heartbeat_message else None
+        # Set after an oversized message is discarded, until the newline that ends it
+        discarding = False
+        while True:
+            try:
+                line = await asyncio.wait_for(reader.readuntil(b"\n"), timeout)
+            except asyncio.TimeoutError:
+                raise ConnectionError(f"Nothing received for {timeout} seconds")
+            except asyncio.LimitOverrunError as e:
+                # The data is left in the reader's buffer, drop it and the rest of the message after it
+                if not discarding:
+                    print(f"[{self.name}] Discarding a message longer than {self.max_message_size} bytes.")
+                await reader.readexactly(e.consumed)
+                discarding = True
+                continue
+            except asyncio.IncompleteReadError:
+                raise ConnectionError("Connection closed by the Arduino server")
+            if discarding:
+                discarding = False
+                continue
+
+            start = time.perf_counter()
+            response = line.decode(errors="replace").strip()
+            if response != "" and response != self.heartbeat_message:
+                self.main.add_message(response)
+                self.main.debug(f"SERVER: Received from Arduino: {response}")
+                self.messages.append(response)
+            stats.record("arduino.receive", time.perf_counter() - start)
+
+    async def write_loop(self, writer):
+        """
+        Send queued messages as they come in.
+        :param writer: The connection's StreamWriter.
+        """
+        while True:
+            await self.outgoing_ready.wait()
+            while self.outgoing:
+                data = self.outgoing.popleft()
+                try:
+                    start = time.perf_counter()
+                    writer.write(data)
+                    await writer.drain()
+                    stats.record("arduino.send", time.perf_counter() - start)
+                except Exception:
+                    # Keep the message for the next connection
+                    self.outgoing.appendleft(data)
+                    raise
+                print(f"Sent: {data.decode().strip()}")
+            self.outgoing_ready.clear()
+
+    async def heartbeat_loop(self):
+        """
+        Periodically queue the heartbeat message, so a dead connection is noticed.
+        """
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            self.enqueue((self.heartbeat_message + '\n').encode())
+
+    async def close(self):
+        """
+        Stop the connection task and wait for it to finish. Runs on the event loop.
+        """
+        if self.run_task is not None:
+            self.run_task.cancel()
+            await asyncio.gather(self.run_task, return_exceptions=True)
+            self.run_task = None
+
+    def disconnect(self):
+        """
+        Closes the connection to the Arduino server.
+        """
+        if self.task is not None:
+            try:
+                self.loop_thread.submit(self.close()).result(timeout=5)
+            except Exception as e:
+                print(f"Error closing the connection: {e}")
+            self.task = None
+            print(f"Disconnected from the Arduino server at {self.host}:{self.port}.")
+        self.connected.clear()
+        if self.owns_loop:
+            self.loop_thread.stop()
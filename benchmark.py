@@ -0,0 +1,541 @@
+import argparse
+import copy
+import itertools
+import json
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+import cv2 as cv
+import numpy as np
+from yaml import safe_load
+
+from config_loader import ConfigLoader
+from device_registry import DeviceRegistry
+from fake_arduino import FakeArduino
+from hand_tracker import HandTracker
+from instrumentation import stats
+
+# Stages reported for every run, in pipeline order
+REPORTED_STAGES = ["capture", "flip", "cvtcolor", "hands_process", "inference", "decision", "drawing", "send",
+                   "process_frame"]
+
+
+class SyntheticSource:
+    def __init__(self, frames, width=1280, height=960, fps=0.0):
+        """
+        Generated frames with a moving square, standing in for a camera.
+        No hand is ever detected in them, so they measure the cost of the pipeline itself.
+        :param frames: Number of frames to produce.
+        :param width: Frame width.
+        :param height: Frame height.
+        :param fps: Frames per second to pace reads at, like a camera. 0 reads as fast as possible.
+        """
+        self.frames = frames
+        self.width = width
+        self.height = height
+        self.interval = 1 / fps if fps else 0.0
+        self.index = 0
+        self.next_read = 0.0
+        rng = np.random.default_rng(0)
+        self.background = rng.integers(0, 64, (height, width, 3), dtype=np.uint8)
+
+    def isOpened(self):
+        """
+        :return: True until every frame has been read.
+        """
+        return self.index < self.frames
+
+    def read(self):
+        """
+        Produce the next frame, like VideoCapture.read.
+        :return: A success flag and the frame.
+        """
+        if not self.isOpened():
+            return False, None
+        wait_for_frame(self)
+        frame = self.background.copy()
+        size = self.height // 4
+        x = (self.index * 8) % (self.width - size)
+        y = (self.height - size) // 2
+        frame[y:y + size, x:x + size] = (200, 180, 160)
+        self.index += 1
+        return True, frame
+
+    def release(self):
+        """
+        Stop producing frames.
+        """
+        self.index = self.frames
+
+
+class VideoSource:
+    def __init__(self, path, frames=0, fps=0.0):
+        """
+        Frames read from a recorded video file, standing in for a camera.
+        :param path: Path to the video file.
+        :param frames: Stop after this many frames, 0 reads the whole file.
+        :param fps: Frames per second to pace reads at, like a camera. 0 reads as fast as possible.
+        """
+        self.capture = cv.VideoCapture(path)
+        if not self.capture.isOpened():
+            raise ValueError(f"Couldn't open video {path}")
+        self.frames = frames
+        self.interval = 1 / fps if fps else 0.0
+        self.index = 0
+        self.next_read = 0.0
+        self.finished = False
+
+    def isOpened(self):
+        """
+        :return: True until the end of the file or the frame limit.
+        """
+        # A VideoCapture stays open at the end of the file, the tracker would wait on it forever
+        return not self.finished and (not self.frames or self.index < self.frames)
+
+    def read(self):
+        """
+        Read the next frame of the video.
+        :return: A success flag and the frame.
+        """
+        if not self.isOpened():
+            return False, None
+        wait_for_frame(self)
+        success, frame = self.capture.read()
+        if not success:
+            self.finished = True
+            return False, None
+        self.index += 1
+        return True, frame
+
+    def release(self):
+        """
+        Close the video file.
+        """
+        self.finished = True
+        self.capture.release()
+
+
+class LandmarkFrame(np.ndarray):
+    """
+    A blank frame carrying the recorded landmarks it stands for,
+    so they go through the pipeline's queues together with it.
+    """
+    landmarks = []
+
+
+class LandmarkSource:
+    def __init__(self, path, fps=0.0):
+        """
+        Landmark sequences recorded with --record-landmarks, replayed straight into the
+        gesture logic instead of running hand detection. Frames are blank.
+        :param path: Path to the JSON recording.
+        :param fps: Frames per second to pace reads at. 0 reads as fast as possible.
+        """
+        with open(path, "r") as recording_file:
+            recording = json.load(recording_file)
+        self.width = recording["width"]
+        self.height = recording["height"]
+        self.sequence = recording["frames"]
+        self.interval = 1 / fps if fps else 0.0
+        self.index = 0
+        self.next_read = 0.0
+        self.blank = np.zeros((self.height, self.width, 3), dtype=np.uint8)
+        self.local = threading.local()
+
+    def isOpened(self):
+        """
+        :return: True until every recorded frame has been replayed.
+        """
+        return self.index < len(self.sequence)
+
+    def read(self):
+        """
+        Move on to the next recorded frame.
+        :return: A success flag and a blank LandmarkFrame of the recorded size.
+        """
+        if not self.isOpened():
+            return False, None
+        wait_for_frame(self)
+        frame = self.blank.view(LandmarkFrame)
+        frame.landmarks = self.sequence[self.index]
+        self.index += 1
+        return True, frame
+
+    def release(self):
+        """
+        Stop replaying.
+        """
+        self.index = len(self.sequence)
+
+    def attach(self, tracker):
+        """
+        Replace the tracker's hand detection with the landmarks of the frame being processed.
+        The frame is flipped before detection, which loses its landmarks, so they are taken
+        from the frame when processing starts, on the thread processing it.
+        A frame dropped by the pipeline drops its landmarks with it.
+        :param tracker: The HandTracker.
+        """
+        process_frame = tracker.process_frame
+
+        def replay_process_frame(frame, capture_time=0.0):
+            self.local.landmarks = frame.landmarks
+            return process_frame(frame, capture_time)
+
+        tracker.process_frame = replay_process_frame
+        tracker.detect_hands = self.detect_hands
+
+    def detect_hands(self, frame, frame_width, frame_height):
+        """
+        Replaces HandTracker.detect_hands, returning the recorded landmarks of the frame being processed.
+        :return: Objects shaped like MediaPipe hand landmarks.
+        """
+        return [SimpleNamespace(landmark=[SimpleNamespace(x=x, y=y) for x, y in hand])
+                for hand in self.local.landmarks]
+
+
+def wait_for_frame(source):
+    """
+    Sleep until the source's next frame is due, when it is paced.
+    :param source: A frame source with interval and next_read attributes.
+    """
+    if not source.interval:
+        return
+    now = time.perf_counter()
+    if source.next_read > now:
+        time.sleep(source.next_read - now)
+    source.next_read = max(now, source.next_read) + source.interval
+
+
+class BenchmarkMain:
+    def __init__(self, config):
+        """
+        The parts of Main a HandTracker and its Arduino connection need, without the server,
+        the database or ThingSpeak.
+        :param config: The config to run with.
+        """
+        self.config = config
+        self.timer_ids = itertools.count(1)
+        self.messages = []
+
+    def get_config(self):
+        """
+        Get the run's config
+        :return: The config's content.
+        """
+        return self.config
+
+    def get_logger(self):
+        """
+        Nothing is logged while benchmarking
+        :return: None
+        """
+        return None
+
+    def get_server(self):
+        """
+        There is no server while benchmarking
+        :return: None
+        """
+        return None
+
+    def get_current_time(self):
+        """
+        Get the current date and time
+        :return: The date and time as a string in the format 'YYYY-MM-DD HH:mm:ss'
+        """
+        return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime())
+
+    def start_timer(self, command=None):
+        """
+        Generate a timer ID for a command. The round trip isn't timed, there is no server to reply to.
+        :param command: Unused.
+        :return: The timer ID
+        """
+        return str(next(self.timer_ids))
+
+    def add_message(self, message, date_time=None):
+        """
+        Keep a message received from the Arduino.
+        :param message: The message
+        :param date_time: Unused.
+        """
+        self.messages.append(message)
+
+    def debug(self, message):
+        """
+        Print a message if debug is enabled.
+        :param message: The message
+        """
+        if self.config["debug"]:
+            print(message)
+
+
+class CommandCounter:
+    def __init__(self, registry):
+        """
+        Forwards the tracker's commands to the fake Arduino, counting them.
+        :param registry: The DeviceRegistry connected to the fake Arduino.
+        """
+        self.registry = registry
+        self.commands = {}
+
+    def send_command(self, command):
+        """
+        Count a command and send it to the fake Arduino.
+        :param command: The command, e.g. FLIPSTATE.
+        """
+        self.commands[command] = self.commands.get(command, 0) + 1
+        self.registry.send_command(command)
+
+    def disconnect(self):
+        """
+        Close the connection to the fake Arduino.
+        """
+        self.registry.disconnect()
+
+
+def record_landmarks(tracker, path):
+    """
+    Wrap the tracker's hand detection to save every frame's landmarks for later replays.
+    :param tracker: The HandTracker.
+    :param path: Path of the JSON recording to write.
+    :return: A function writing the recording, to call once the run is over.
+    """
+    frames = []
+    detect_hands = tracker.detect_hands
+    size = {}
+
+    def recording_detect_hands(frame, frame_width, frame_height):
+        hand_landmarks_list = detect_hands(frame, frame_width, frame_height)
+        size.update(width=frame_width, height=frame_height)
+        frames.append([[[lm.x, lm.y] for lm in hand_landmarks.landmark] for hand_landmarks in hand_landmarks_list])
+        return hand_landmarks_list
+
+    def save():
+        with open(path, "w") as recording_file:
+            json.dump(dict(size, frames=frames), recording_file)
+        print(f"Recorded landmarks of {len(frames)} frames to {path}")
+
+    tracker.detect_hands = recording_detect_hands
+    return save
+
+
+def set_option(config, option):
+    """
+    Override a config value from the command line.
+    :param config: The config to change.
+    :param option: "dotted.key=value", the value is parsed as YAML.
+    """
+    key, _, value = option.partition("=")
+    *sections, name = key.split(".")
+    for section in sections:
+        config = config.setdefault(section, {})
+    config[name] = safe_load(value)
+
+
+def build_config(base_config, args, mode, scale, pipeline, port):
+    """
+    Build the config of one benchmark run.
+    :param base_config: The config loaded from config.yml.
+    :param args: The command line arguments.
+    :param mode: GESTURE or BOX.
+    :param scale: The inference scale.
+    :param pipeline: SERIAL or PIPELINED.
+    :param port: Port of the fake Arduino.
+    :return: A copy of the base config with the run's settings.
+    """
+    config = copy.deepcopy(base_config)
+    config["debug"] = args.debug
+    config["tracker"]["mode"] = mode
+    config["tracker"]["inference_scale"] = scale
+    config["tracker"]["pipeline"] = pipeline
+    # The controller changes the scale and skips frames, which would blur the comparison
+    config["tracker"].setdefault("adaptive", {})["enabled"] = args.adaptive
+    config["arduino"]["transport"] = "ASYNC"
+    config["arduino"]["devices"] = [{"name": "fake", "host": "127.0.0.1", "port": port}]
+    config["arduino"]["heartbeat_message"] = ""
+    if args.landmarks:
+        # Replayed frames are blank, the motion gate would skip them all,
+        # and there is no detection for the ROI to narrow down
+        config["tracker"].setdefault("motion_gate", {})["enabled"] = False
+        config["tracker"].setdefault("roi", {})["enabled"] = False
+    for option in args.set:
+        set_option(config, option)
+    return config
+
+
+def open_source(args, width, height):
+    """
+    Open the frame source selected on the command line.
+    :param width: Width of synthetic frames.
+    :param height: Height of synthetic frames.
+    :return: SyntheticSource, VideoSource or LandmarkSource.
+    """
+    if args.landmarks:
+        return LandmarkSource(args.landmarks, args.fps)
+    if args.video:
+        return VideoSource(args.video, args.frames, args.fps)
+    return SyntheticSource(args.frames or 300, width, height, args.fps)
+
+
+def run_benchmark(base_config, args, mode, scale, pipeline, fake):
+    """
+    Run the tracker headless over the whole source once.
+    :param base_config: The config loaded from config.yml.
+    :param args: The command line arguments.
+    :param mode: GESTURE or BOX.
+    :param scale: The inference scale.
+    :param pipeline: SERIAL or PIPELINED.
+    :param fake: The running FakeArduino.
+    :return: A dictionary with the run's settings and results.
+    """
+    config = build_config(base_config, args, mode, scale, pipeline, fake.port)
+    main = BenchmarkMain(config)
+    tracker = HandTracker(main, headless=True, connect=False)
+    registry = DeviceRegistry(main)
+    registry.connect()
+    counter = CommandCounter(registry)
+    tracker.client_handler = counter
+
+    source = open_source(args, config["tracker"]["frame_width"], config["tracker"]["frame_height"])
+    if isinstance(source, LandmarkSource):
+        source.attach(tracker)
+    save_recording = record_landmarks(tracker, args.record_landmarks) if args.record_landmarks else None
+
+    received_before = len(fake.received)
+    stats.reset()
+    start = time.perf_counter()
+    try:
+        if pipeline == "PIPELINED":
+            tracker.run_pipelined(source)
+        else:
+            tracker.run_serial(source)
+    finally:
+        elapsed = time.perf_counter() - start
+        source.release()
+
+    # Give the fake Arduino a moment to receive the last commands
+    sent = sum(counter.commands.values())
+    deadline = time.monotonic() + 2
+    while len(fake.received) - received_before < sent and time.monotonic() < deadline:
+        time.sleep(0.01)
+    counter.disconnect()
+    tracker.hands.close()
+    if tracker.roi_hands is not None:
+        tracker.roi_hands.close()
+    if save_recording is not None:
+        save_recording()
+
+    snapshot = stats.snapshot()["stages"]
+    processed = snapshot.get("tracker.process_frame", {}).get("count", 0)
+    return {
+        "name": f"{mode}/{scale}/{pipeline}",
+        "mode": mode,
+        "inference_scale": scale,
+        "pipeline": pipeline,
+        "frames_read": source.index,
+        "frames_processed": processed,
+        "seconds": elapsed,
+        "fps": processed / elapsed if elapsed else 0.0,
+        "gestures": counter.commands.get("FLIPSTATE", 0),
+        "received_by_arduino": len(fake.received) - received_before,
+        "motion_gate": tracker.motion_gate.get_stats() if tracker.motion_gate is not None else None,
+        "gesture_state": tracker.gesture_state.get_stats(),
+        "stages": {stage: {key: snapshot[f"tracker.{stage}"][key] for key in ("count", "p50_ms", "p95_ms", "p99_ms")}
+                   for stage in REPORTED_STAGES if f"tracker.{stage}" in snapshot},
+    }
+
+
+def print_result(result):
+    """
+    Print one run's results as a table.
+    :param result: A dictionary returned by run_benchmark.
+    """
+    print(f"\n{result['name']}: {result['frames_processed']}/{result['frames_read']} frames processed "
+          f"in {result['seconds']:.2f}s, {result['fps']:.1f} fps, {result['gestures']} gestures, "
+          f"{result['received_by_arduino']} commands received by the Arduino")
+    print(f"  {'stage':<14}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for stage, timings in result["stages"].items():
+        print(f"  {stage:<14}{timings['count']:>8}{timings['p50_ms']:>10.2f}"
+              f"{timings['p95_ms']:>10.2f}{timings['p99_ms']:>10.2f}")
+
+
+def compare_to_baseline(results, baseline_path, tolerance):
+    """
+    Compare the runs to a previous --output file.
+    :param results: Dictionaries returned by run_benchmark.
+    :param baseline_path: Path of the previous --output file.
+    :param tolerance: Fraction the fps may drop, or the p95 frame time rise, before it counts as a regression.
+    :return: A list of regression descriptions, empty if there are none.
+    """
+    with open(baseline_path, "r") as baseline_file:
+        baseline = {result["name"]: result for result in json.load(baseline_file)["results"]}
+
+    regressions = []
+    for result in results:
+        previous = baseline.get(result["name"])
+        if previous is None:
+            continue
+        if result["fps"] < previous["fps"] * (1 - tolerance):
+            regressions.append(f"{result['name']}: {result['fps']:.1f} fps, was {previous['fps']:.1f}")
+        p95 = result["stages"].get("process_frame", {}).get("p95_ms")
+        previous_p95 = previous["stages"].get("process_frame", {}).get("p95_ms")
+        if p95 is not None and previous_p95 is not None and p95 > previous_p95 * (1 + tolerance):
+            regressions.append(f"{result['name']}: p95 frame time {p95:.2f}ms, was {previous_p95:.2f}ms")
+        if result["gestures"] != previous["gestures"]:
+            regressions.append(f"{result['name']}: {result['gestures']} gestures, was {previous['gestures']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the hand tracker without a webcam or an Arduino")
+    source_group = parser.add_mutually_exclusive_group()
+    source_group.add_argument("--video", help="Recorded video file to read frames from")
+    source_group.add_argument("--landmarks", help="Landmark recording to replay into the gesture logic")
+    parser.add_argument("--frames", type=int, default=0,
+                        help="Frames to read, synthetic frames are used when no source is given (default 300)")
+    parser.add_argument("--fps", type=float, default=0.0, help="Pace reads like a camera, 0 reads as fast as possible")
+    parser.add_argument("--modes", nargs="+", default=["GESTURE", "BOX"], choices=["GESTURE", "BOX"])
+    parser.add_argument("--scales", nargs="+", type=float, default=[1.0, 0.5])
+    parser.add_argument("--pipelines", nargs="+", default=["SERIAL", "PIPELINED"], choices=["SERIAL", "PIPELINED"])
+    parser.add_argument("--adaptive", action="store_true", help="Keep the adaptive rate controller enabled")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE",
+                        help="Override a config value, e.g. tracker.motion_gate.enabled=false")
+    parser.add_argument("--config", default="config.yml")
+    parser.add_argument("--arduino-delay", type=float, default=0.0, help="Seconds the fake Arduino waits to reply")
+    parser.add_argument("--record-landmarks", help="Save the detected landmarks to replay with --landmarks")
+    parser.add_argument("--output", help="Write the results as JSON")
+    parser.add_argument("--baseline", help="Fail if the results regressed from this --output file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed regression from the baseline")
+    parser.add_argument("--debug", action="store_true")
+    args = parser.parse_args()
+
+    base_config = ConfigLoader(args.config).get()
+    fake = FakeArduino(delay=args.arduino_delay)
+    fake.start()
+
+    results = []
+    try:
+        for mode, scale, pipeline in itertools.product(args.modes, args.scales, args.pipelines):
+            result = run_benchmark(base_config, args, mode, scale, pipeline, fake)
+            print_result(result)
+            results.append(result)
+    finally:
+        fake.stop()
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump({"created": time.strftime('%Y-%m-%d %H:%M:%S'), "results": results}, output_file, indent=2)
+
+    if args.baseline:
+        regressions = compare_to_baseline(results, args.baseline, args.tolerance)
+        for regression in regressions:
+            print(f"[REGRESSION] {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
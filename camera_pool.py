@@ -0,0 +1,198 @@
+import multiprocessing
+import queue
+import threading
+import time
+
+
+class WorkerEvents:
+    def __init__(self, events, camera):
+        """
+        Stands in for the Arduino connection and the logger in a camera worker process,
+        forwarding commands and log messages to the parent process.
+        :param events: The multiprocessing queue read by the parent.
+        :param camera: The worker's camera index or URL.
+        """
+        self.events = events
+        self.camera = camera
+
+    def send_command(self, command):
+        """
+        Forward a command to the parent, which sends it to the Arduino.
+        :param command: The command, e.g. FLIPSTATE.
+        """
+        self.events.put(("command", self.camera, command))
+
+    def add_message(self, message, date_time=None):
+        """
+        Forward a log message to the parent's logger.
+        :param message: The message to log.
+        :param date_time: Unused, the parent timestamps the message.
+        """
+        self.events.put(("log", self.camera, message))
+
+    def disconnect(self):
+        """
+        Nothing to close, the parent owns the connection.
+        """
+
+
+class WorkerMain:
+    def __init__(self, config, events):
+        """
+        The parts of Main a HandTracker needs, for use in a camera worker process.
+        :param config: The parent's config.
+        :param events: WorkerEvents forwarding to the parent.
+        """
+        self.config = config
+        self.events = events
+
+    def get_config(self):
+        """
+        Get the config sent by the parent
+
+        :return: The config's content.
+        """
+        return self.config
+
+    def get_logger(self):
+        """
+        Get the logger, which forwards to the parent's logger
+
+        :return: WorkerEvents
+        """
+        return self.events
+
+    def get_current_time(self):
+        """
+        Get the current date and time
+        :return: The date and time as a string in the format 'YYYY-MM-DD HH:mm:ss'
+        """
+        return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime())
+
+    def debug(self, message):
+        """
+        Print a message if debug is enabled in config.
+        :param message: The message
+        """
+        if self.config["debug"]:
+            print(message)
+
+
+def run_camera_worker(camera, config, events, stop, settings):
+    """
+    Entry point of a camera worker process. Tracks one camera until the parent asks it to stop.
+    :param camera: Camera index or video stream URL.
+    :param config: The parent's config.
+    :param events: Multiprocessing queue for commands, log messages and stats.
+    :param stop: Multiprocessing event set by the parent to stop every worker.
+    :param settings: HandTracker keyword arguments.
+    """
+    import threading
+    from hand_tracker import HandTracker
+    from instrumentation import stats
+
+    worker_events = WorkerEvents(events, camera)
+    tracker = HandTracker(WorkerMain(config, worker_events), camera=camera, connect=False, **settings)
+    tracker.client_handler = worker_events
+    if tracker.headless:
+        tracker.install_signal_handlers()
+
+    def wait_for_stop():
+        stop.wait()
+        tracker.stop()
+
+    def report_stats():
+        # The worker's timings live in its own process, send them so the parent can serve them
+        interval = config["tracker"].get("stats_interval", 1.0)
+        while not stop.wait(interval):
+            rate = tracker.rate_controller.get_status() if tracker.rate_controller is not None else None
+            events.put(("stats", camera, {"stats": stats.snapshot(), "rate": rate}))
+
+    threading.Thread(target=wait_for_stop, daemon=True).start()
+    threading.Thread(target=report_stats, daemon=True).start()
+    try:
+        tracker.track()
+    except Exception as e:
+        worker_events.add_message(f"[ERROR] Camera worker stopped: {e}")
+
+
+class CameraPool:
+    def __init__(self, tracker, cameras):
+        """
+        Runs a tracker worker process per camera, so frame processing isn't limited by the GIL.
+        Workers send their gestures back to this process, which sends them to the Arduino.
+        :param tracker: The parent HandTracker, which owns the Arduino connection.
+        :param cameras: List of camera indices or video stream URLs.
+        """
+        self.tracker = tracker
+        self.main = tracker.main
+        self.cameras = cameras
+        # Spawn so workers start with a fresh interpreter on every platform
+        self.context = multiprocessing.get_context("spawn")
+        self.events = self.context.Queue()
+        self.stop = self.context.Event()
+        self.processes = []
+        # Latest stats reported by each worker, keyed by camera
+        self.worker_stats = {}
+        self.lock = threading.Lock()
+
+    def start(self):
+        """
+        Start a worker process per camera.
+        """
+        settings = dict(self.tracker.model_settings, headless=self.tracker.headless)
+        # A plain dict, so it can be sent to the workers
+        config = dict(self.main.get_config())
+        for camera in self.cameras:
+            process = self.context.Process(target=run_camera_worker,
+                                           args=(camera, config, self.events, self.stop, settings),
+                                           name=f"camera-{camera}", daemon=True)
+            process.start()
+            self.processes.append(process)
+        print(f"Started {len(self.processes)} camera workers.")
+
+    def run(self):
+        """
+        Dispatch the workers' commands, log messages and stats until the tracker is stopped
+        or every worker has exited.
+        """
+        self.start()
+        logger = self.main.get_logger()
+        try:
+            while not self.tracker.stop_event.is_set() and any(p.is_alive() for p in self.processes):
+                self.tracker.poll_controls()
+                try:
+                    kind, camera, payload = self.events.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+
+                if kind == "command":
+                    self.main.debug(f"Camera {camera} sent {payload}")
+                    self.tracker.send_command(payload)
+                elif kind == "log":
+                    logger.add_message(f"[Camera {camera}] {payload}", self.main.get_current_time())
+                elif kind == "stats":
+                    with self.lock:
+                        self.worker_stats[str(camera)] = payload
+        finally:
+            self.shutdown()
+
+    def get_stats(self):
+        """
+        Get the latest timings and rate controller status reported by each worker.
+        :return: A dictionary of camera to {"stats": ..., "rate": ...}, rate is None when adaptive rate is off.
+        """
+        with self.lock:
+            return dict(self.worker_stats)
+
+    def shutdown(self, timeout=5):
+        """
+        Ask every worker to stop, and terminate the ones that don't in time.
+        :param timeout: Seconds to wait for the workers.
+        """
+        self.stop.set()
+        deadline = time.monotonic() + timeout
+        for process in self.processes:
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                process.terminate()
@@ -0,0 +1,78 @@
+import os
+import threading
+import time
+
+from yaml import safe_load
+
+
+class ConfigLoader:
+    def __init__(self, path="config.yml"):
+        """
+        Loads the config file once and keeps it in memory.
+        Reloads update the same dictionary in place, so every reference to it stays current.
+        :param path: Path to the config YAML file.
+        """
+        self.path = path
+        self.config = {}
+        self.mtime = None
+        self.watch_thread = None
+        self.load()
+
+    def load(self):
+        """
+        Read and parse the config file, keeping the current config if it can't be read.
+        :return: True if the config was loaded, False otherwise.
+        """
+        try:
+            mtime = os.stat(self.path).st_mtime
+            with open(self.path, "r") as config_file:
+                new_config = safe_load(config_file)
+        except FileNotFoundError:
+            print(f"No {self.path} file detected...")
+            return False
+        except Exception as e:
+            print(f"Couldn't read {self.path}: {e}")
+            return False
+
+        if not isinstance(new_config, dict):
+            print(f"Ignoring {self.path}, it doesn't contain a mapping.")
+            return False
+
+        # Update key by key rather than clearing, so readers never see a missing section
+        self.config.update(new_config)
+        for key in list(self.config.keys() - new_config.keys()):
+            self.config.pop(key, None)
+        self.mtime = mtime
+        return True
+
+    def get(self):
+        """
+        Get the in-memory config, without touching the filesystem.
+        :return: The config's content.
+        """
+        return self.config
+
+    def watch(self, interval):
+        """
+        Start a background thread reloading the config when the file's modification time changes.
+        :param interval: Seconds between checks.
+        """
+        if self.watch_thread is not None or not interval or interval <= 0:
+            return
+        self.watch_thread = threading.Thread(target=self.watch_loop, args=(interval,),
+                                             name="config-watcher", daemon=True)
+        self.watch_thread.start()
+
+    def watch_loop(self, interval):
+        """
+        Poll the config file's modification time and reload it when it changes.
+        :param interval: Seconds between checks.
+        """
+        while True:
+            time.sleep(interval)
+            try:
+                mtime = os.stat(self.path).st_mtime
+            except OSError:
+                continue
+            if mtime != self.mtime and self.load():
+                print(f"Reloaded {self.path}")
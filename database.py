@@ -1,13 +1,245 @@
+import atexit
+import math
 import os
+import queue
 import time
 import threading
 import sqlite3
+from pathlib import Path
+
+from instrumentation import stats
+
+# Schema migrations, applied in order on startup.
+# PRAGMA user_version stores how many of them the database has already applied.
+MIGRATIONS = [
+    # 1: Index timestamps so date queries are range scans rather than full table scans,
+    # and index the date prefix so rows can be counted per day straight from the index.
+    [
+        "CREATE INDEX IF NOT EXISTS idx_light_logs_timestamp ON light_logs (timestamp)",
+        "CREATE INDEX IF NOT EXISTS idx_light_logs_date ON light_logs (substr(timestamp, 1, 10))",
+    ],
+    # 2: Per day rollup of the logs, kept up to date by the writer thread, so the metrics
+    # page reads one row per day rather than every log.
+    [
+        """
+        CREATE TABLE IF NOT EXISTS daily_rollup (
+            date TEXT PRIMARY KEY,
+            count INTEGER NOT NULL DEFAULT 0,
+            high_count INTEGER NOT NULL DEFAULT 0,
+            low_count INTEGER NOT NULL DEFAULT 0,
+            time_count INTEGER NOT NULL DEFAULT 0,
+            time_sum FLOAT NOT NULL DEFAULT 0,
+            time_min FLOAT,
+            time_max FLOAT
+            )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS daily_latency_histogram (
+            date TEXT NOT NULL,
+            bucket INTEGER NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (date, bucket)
+            ) WITHOUT ROWID
+        """,
+        # Backfilled by migration 3, once every rollup table exists
+    ],
+    # 3: Per hour rollup, so the charts of today on the metrics page don't read today's logs either.
+    # Nothing queries the date index since the rollup, so it is dropped rather than kept up to date.
+    [
+        "DROP INDEX IF EXISTS idx_light_logs_date",
+        """
+        CREATE TABLE IF NOT EXISTS hourly_rollup (
+            hour TEXT PRIMARY KEY,
+            high_count INTEGER NOT NULL DEFAULT 0,
+            low_count INTEGER NOT NULL DEFAULT 0,
+            time_count INTEGER NOT NULL DEFAULT 0,
+            time_sum FLOAT NOT NULL DEFAULT 0
+            ) WITHOUT ROWID
+        """,
+        lambda conn: rebuild_rollup(conn),
+    ],
+]
+
+# Latency histogram buckets grow geometrically from 1ms,
+# so percentiles read from the histogram are within 5% of the real value.
+LATENCY_BUCKET_BASE = 0.001
+LATENCY_BUCKET_GROWTH = 1.05
+
+
+def latency_bucket(seconds):
+    """
+    Get the histogram bucket a latency falls into
+    :param seconds: The latency in seconds
+    :return: The bucket index
+    """
+    if seconds <= LATENCY_BUCKET_BASE:
+        return 0
+    return math.ceil(math.log(seconds / LATENCY_BUCKET_BASE, LATENCY_BUCKET_GROWTH))
+
+
+def bucket_upper_bound(bucket):
+    """
+    Get the highest latency a histogram bucket holds
+    :param bucket: The bucket index
+    :return: The latency in seconds
+    """
+    return LATENCY_BUCKET_BASE * LATENCY_BUCKET_GROWTH ** bucket
+
+
+class ReadConnectionPool:
+    def __init__(self, path, cached_statements=128):
+        """
+        One read-only connection per thread, kept open and reused for every query the thread runs.
+        Each connection caches its compiled statements, so repeated queries skip parsing and planning.
+        With WAL enabled by the writer thread, readers never block it or each other.
+        :param path: Path to the database file.
+        :param cached_statements: Compiled statements cached per connection.
+        """
+        self.uri = f"{Path(path).resolve().as_uri()}?mode=ro"
+        self.cached_statements = cached_statements
+        self.local = threading.local()
+        # Every open connection, by thread, so they can be closed when their thread is gone
+        self.connections = {}
+        self.lock = threading.Lock()
+
+    def get(self):
+        """
+        Get the calling thread's connection, opening it on first use.
+        :return: A read-only sqlite3 connection.
+        """
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            # Closed from other threads when pruned, it is only ever used by this one
+            conn = sqlite3.connect(self.uri, uri=True, cached_statements=self.cached_statements,
+                                   check_same_thread=False)
+            self.local.conn = conn
+            with self.lock:
+                self.prune()
+                self.connections[threading.get_ident()] = (threading.current_thread(), conn)
+        return conn
+
+    def discard(self):
+        """
+        Close the calling thread's connection, e.g. after an error, so the next query reconnects.
+        """
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            return
+        self.local.conn = None
+        with self.lock:
+            self.connections.pop(threading.get_ident(), None)
+        conn.close()
+
+    def prune(self):
+        """
+        Close the connections of threads that have exited, e.g. the development server's request threads.
+        Must be called with the lock held.
+        """
+        for ident, (thread, conn) in list(self.connections.items()):
+            if not thread.is_alive():
+                del self.connections[ident]
+                conn.close()
+
+    def close(self):
+        """
+        Close every connection.
+        """
+        with self.lock:
+            for thread, conn in self.connections.values():
+                conn.close()
+            self.connections.clear()
+
+
+def summarize_rows(rows):
+    """
+    Aggregate log rows per day, for the rollup tables
+    :param rows: Iterable of (timestamp, string, timer_id, time) rows
+    :return: A tuple of (rollup rows, histogram rows, hourly rows) ready to be upserted
+    """
+    days = {}
+    histogram = {}
+    hours = {}
+    for timestamp, message, timer_id, elapsed_time in rows:
+        date = timestamp[:10]
+        # [count, high_count, low_count, time_count, time_sum, time_min, time_max]
+        day = days.setdefault(date, [0, 0, 0, 0, 0.0, None, None])
+        # [high_count, low_count, time_count, time_sum], per 'YYYY-MM-DD HH'
+        hour = hours.setdefault(timestamp[:13], [0, 0, 0, 0.0])
+        day[0] += 1
+        if "HIGH" in message.upper():
+            day[1] += 1
+            hour[0] += 1
+        elif "LOW" in message.upper():
+            day[2] += 1
+            hour[1] += 1
+        if elapsed_time is not None:
+            day[3] += 1
+            day[4] += elapsed_time
+            day[5] = elapsed_time if day[5] is None else min(day[5], elapsed_time)
+            day[6] = elapsed_time if day[6] is None else max(day[6], elapsed_time)
+            hour[2] += 1
+            hour[3] += elapsed_time
+            key = (date, latency_bucket(elapsed_time))
+            histogram[key] = histogram.get(key, 0) + 1
+
+    rollup_rows = [(date, *values) for date, values in days.items()]
+    histogram_rows = [(date, bucket, count) for (date, bucket), count in histogram.items()]
+    hourly_rows = [(hour, *values) for hour, values in hours.items()]
+    return rollup_rows, histogram_rows, hourly_rows
+
+
+def update_rollup(conn, rows):
+    """
+    Add log rows to the rollup tables. Must run in the same transaction as the rows' insert.
+    :param conn: An open connection to the database
+    :param rows: Iterable of (timestamp, string, timer_id, time) rows
+    """
+    rollup_rows, histogram_rows, hourly_rows = summarize_rows(rows)
+    conn.executemany("""
+        INSERT INTO daily_rollup (date, count, high_count, low_count, time_count, time_sum, time_min, time_max)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (date) DO UPDATE SET
+            count = count + excluded.count,
+            high_count = high_count + excluded.high_count,
+            low_count = low_count + excluded.low_count,
+            time_count = time_count + excluded.time_count,
+            time_sum = time_sum + excluded.time_sum,
+            time_min = min(coalesce(time_min, excluded.time_min), coalesce(excluded.time_min, time_min)),
+            time_max = max(coalesce(time_max, excluded.time_max), coalesce(excluded.time_max, time_max))
+    """, rollup_rows)
+    conn.executemany("""
+        INSERT INTO daily_latency_histogram (date, bucket, count)
+        VALUES (?, ?, ?)
+        ON CONFLICT (date, bucket) DO UPDATE SET count = count + excluded.count
+    """, histogram_rows)
+    conn.executemany("""
+        INSERT INTO hourly_rollup (hour, high_count, low_count, time_count, time_sum)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (hour) DO UPDATE SET
+            high_count = high_count + excluded.high_count,
+            low_count = low_count + excluded.low_count,
+            time_count = time_count + excluded.time_count,
+            time_sum = time_sum + excluded.time_sum
+    """, hourly_rows)
+
+
+def rebuild_rollup(conn):
+    """
+    Recompute the rollup tables from every row in light_logs
+    :param conn: An open connection to the database
+    """
+    conn.execute("DELETE FROM daily_rollup")
+    conn.execute("DELETE FROM daily_latency_histogram")
+    conn.execute("DELETE FROM hourly_rollup")
+    cursor = conn.execute("SELECT timestamp, string, timer_id, time FROM light_logs")
+    update_rollup(conn, cursor)
 
 
 class Database:
     def __init__(self, main):
         self.server = main.get_server()
         self.logger = main.get_logger()
+        self.events = main.get_events()
         self.config = main.get_config()
         self.main = main
 
@@ -15,6 +247,15 @@ class Database:
         db_path: str = self.config['database']['path']
         os.makedirs(os.path.dirname(db_path), exist_ok=True)
 
+        # Rows are queued and written in batches by a single writer thread
+        self.batch_size: int = self.config["database"].get("batch_size", 50)
+        self.flush_interval: float = self.config["database"].get("flush_interval", 0.5)
+        # Failed batches are retried with exponential backoff, then logged and dropped
+        self.max_retries: int = self.config["database"].get("max_retries", 5)
+        self.retry_delay: float = self.config["database"].get("retry_delay", 1.0)
+        self.queue = queue.Queue()
+        self.writer_thread = None
+
         # Connect and create the table if it doesnt exist already
         try:
             print(f"Trying db at {db_path}")
@@ -30,6 +271,7 @@ class Database:
                     )
             """)
             conn.commit()
+            self.migrate(conn)
             conn.close()
             message = f"Connected to database at {main.get_current_time()}."
             self.logger.add_message(message, main.get_current_time())
@@ -39,26 +281,180 @@ class Database:
             print(message)
             self.logger.add_message(message, main.get_current_time())
 
+        self.writer_thread = threading.Thread(target=self.write_loop, name="database-writer", daemon=True)
+        self.writer_thread.start()
+        atexit.register(self.close)
+
+    def migrate(self, conn):
+        """
+        Apply the schema migrations the database hasn't run yet
+        :param conn: An open connection to the database
+        """
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for number, statements in enumerate(MIGRATIONS[version:], start=version + 1):
+            with conn:
+                for statement in statements:
+                    if callable(statement):
+                        statement(conn)
+                    else:
+                        conn.execute(statement)
+                conn.execute(f"PRAGMA user_version = {number}")
+            print(f"Applied database migration {number}")
+
     def save_to_db(self, message, timer_id, elapsed_time, date_time):
         """
-        Save a row to the database
+        Queue a row to be saved to the database by the writer thread
         :param message: The message to save
         :param timer_id: The timer ID to save
         :param elapsed_time: The time elapsed between the start and end of the action
         :param date_time: The current date and time.
         """
-        try:
-            conn = sqlite3.connect(self.config["database"]["path"])
-            cursor = conn.cursor()
-            cursor.execute("""
-                    INSERT INTO light_logs (timestamp, string, timer_id, time)
-                    VALUES (?, ?, ?, ?)
-                """, (date_time, message, timer_id, elapsed_time))
-            conn.commit()
+        with stats.timed("database.save_to_db"):
+            self.queue.put((date_time, message, timer_id, elapsed_time))
+
+    def write_loop(self):
+        """
+        Writer thread loop. Owns the only write connection and commits queued rows
+        once the batch size is reached, or the flush interval has passed since the first queued row.
+        A None item flushes the pending rows and stops the loop.
+        A batch that can't be written is retried with backoff, reconnecting first,
+        and written to the log file instead once max_retries attempts have failed.
+        """
+        conn = None
+        batch = []
+        deadline = None
+        failures = 0
+        running = True
+        while running:
+            timeout = None if not batch else max(0.0, deadline - time.monotonic())
+            try:
+                row = self.queue.get(timeout=timeout)
+                if row is None:
+                    running = False
+                else:
+                    if not batch:
+                        deadline = time.monotonic() + self.flush_interval
+                    batch.append(row)
+            except queue.Empty:
+                pass
+
+            # While retrying, wait for the backoff even if the batch is full
+            full = not failures and len(batch) >= self.batch_size
+            ready = not running or full or time.monotonic() >= deadline
+            if not batch or not ready:
+                continue
+
+            if conn is None:
+                conn = self.open_writer_connection()
+            if conn is not None and self.write_batch(conn, batch):
+                batch = []
+                failures = 0
+                continue
+
+            failures += 1
+            if conn is not None:
+                conn.close()
+                conn = None
+            if not running or failures > self.max_retries:
+                self.log_dropped_rows(batch, failures)
+                batch = []
+                failures = 0
+            else:
+                deadline = time.monotonic() + self.retry_delay * 2 ** (failures - 1)
+
+        if conn is not None:
             conn.close()
-            self.main.debug(f"{self.main.get_current_time()} Saved message successfully: {message}")
+
+    def open_writer_connection(self):
+        """
+        Open the writer thread's connection.
+        :return: The connection, or None if the database couldn't be opened.
+        """
+        try:
+            conn = sqlite3.connect(self.config["database"]["path"], timeout=30)
+            # WAL lets the server read while rows are being written
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            return conn
         except Exception as e:
-            message = f"[ERROR] Couldn't save string: {e}"
+            message = f"[ERROR] Couldn't open the database for writing: {e}"
             print(message)
             self.logger.add_message(message, self.main.get_current_time())
+            return None
 
+    def log_dropped_rows(self, batch, attempts):
+        """
+        Write rows that couldn't be saved to the log file, so they aren't lost silently.
+        :param batch: List of (timestamp, string, timer_id, time) rows
+        :param attempts: How many times saving them was attempted
+        """
+        message = f"[ERROR] Dropped {len(batch)} row(s) after {attempts} failed attempt(s), logging them here instead."
+        print(message)
+        self.logger.add_message(message, self.main.get_current_time())
+        for date_time, string, timer_id, elapsed_time in batch:
+            self.logger.add_message(f"[UNSAVED] {string} (timer {timer_id}, {elapsed_time})", date_time)
+        # Still shown live, they won't ever be in the database for a page load to miss
+        self.publish(batch)
+
+    def publish(self, batch):
+        """
+        Publish rows to the live feed. Saved rows are only published once committed, so a page
+        rendered with the logs up to an event ID always has every row published up to it.
+        :param batch: List of (timestamp, string, timer_id, time) rows
+        """
+        if self.events is None:
+            return
+        for date_time, string, timer_id, elapsed_time in batch:
+            self.events.publish({"timestamp": date_time, "message": string, "timer_id": timer_id,
+                                 "time": elapsed_time})
+
+    def write_batch(self, conn, batch):
+        """
+        Insert a batch of rows and update the rollup tables in a single transaction
+        :param conn: The writer thread's connection
+        :param batch: List of (timestamp, string, timer_id, time) rows
+        :return: True if the batch was saved, False otherwise.
+        """
+        try:
+            start = time.perf_counter()
+            with conn:
+                conn.executemany("""
+                        INSERT INTO light_logs (timestamp, string, timer_id, time)
+                        VALUES (?, ?, ?, ?)
+                    """, batch)
+                update_rollup(conn, batch)
+            stats.record("database.write_batch", time.perf_counter() - start)
+            # Cached pages of these days are out of date now
+            if self.server is not None:
+                self.server.cache.invalidate_dates({row[0][:10] for row in batch})
+            self.publish(batch)
+            self.main.debug(f"{self.main.get_current_time()} Saved {len(batch)} message(s) successfully.")
+            return True
+        except Exception as e:
+            message = f"[ERROR] Couldn't save {len(batch)} string(s): {e}"
+            print(message)
+            self.logger.add_message(message, self.main.get_current_time())
+            return False
+
+    def rebuild_rollup(self):
+        """
+        Recompute the rollup tables from every saved log, to backfill or repair them.
+        """
+        conn = sqlite3.connect(self.config["database"]["path"], timeout=30)
+        try:
+            with conn:
+                # Take the write lock first, so the writer thread can't insert rows mid-rebuild
+                conn.execute("BEGIN IMMEDIATE")
+                rebuild_rollup(conn)
+            print("Rebuilt the daily rollup.")
+        finally:
+            conn.close()
+
+    def close(self):
+        """
+        Flush the queued rows and stop the writer thread.
+        """
+        if self.writer_thread is None or not self.writer_thread.is_alive():
+            return
+        self.queue.put(None)
+        self.writer_thread.join()
@@ -0,0 +1,93 @@
+from collections import deque
+
+from arduino_transport import AsyncArduinoTransport, EventLoopThread
+
+
+class DeviceRegistry:
+    def __init__(self, main):
+        """
+        Pool of connections to every configured Arduino, sharing one event loop.
+        Each device has its own connection and send queue, so a command reaches
+        all of them in parallel and the slowest device doesn't hold the others back.
+        :param main: The Main instance.
+        """
+        self.main = main
+        self.config = main.get_config()
+        device_configs = self.get_device_configs()
+        self.loop_thread = EventLoopThread()
+        self.messages = deque(maxlen=100)
+        self.devices = {}
+
+        for device in device_configs:
+            transport = AsyncArduinoTransport(main, device["host"], device["port"],
+                                              loop_thread=self.loop_thread, name=device.get("name"))
+            # Keep the latest messages of every device in one place
+            transport.messages = self.messages
+            self.devices[transport.name] = transport
+
+    def get_device_configs(self):
+        """
+        Get the configured devices, falling back to the single arduino host and port.
+        :return: A list of dictionaries with 'name', 'host' and 'port'.
+        :raises ValueError: If two devices have the same name, one would replace the other.
+        """
+        arduino_config = self.config["arduino"]
+        devices = arduino_config.get("devices")
+        if not devices:
+            devices = [{"host": arduino_config["host"], "port": arduino_config["port"]}]
+
+        names = set()
+        for device in devices:
+            # Devices without a name are named after their address, like AsyncArduinoTransport does
+            name = device.get("name") or f"{device['host']}:{device['port']}"
+            if name in names:
+                raise ValueError(f"Several Arduino devices are named '{name}' in the config, names must be unique.")
+            names.add(name)
+        return devices
+
+    def connect(self):
+        """
+        Start connecting to every device, waiting up to connect_timeout seconds for them.
+        :return: True if every device is connected, False if some are still being retried.
+        """
+        for transport in self.devices.values():
+            transport.connect(wait=False)
+        return all([transport.connect() for transport in self.devices.values()])
+
+    def send_command(self, command):
+        """
+        Send a command to every device, each with its own timer. Never blocks.
+        :param command: The command, e.g. FLIPSTATE or GETSTATE.
+        """
+        for transport in self.devices.values():
+            transport.send_message(f"{self.main.start_timer(command)}:{command}")
+
+    def send_message(self, message):
+        """
+        Send a message as is to every device. Never blocks.
+        :param message: String message to send
+        """
+        for transport in self.devices.values():
+            transport.send_message(message)
+
+    def get_status(self):
+        """
+        Get the connection status of every device.
+        :return: A list of dictionaries describing each device.
+        """
+        return [{
+            "name": name,
+            "host": transport.host,
+            "port": transport.port,
+            "connected": transport.connected.is_set(),
+            "queued": len(transport.outgoing),
+            "dropped": transport.dropped,
+        } for name, transport in self.devices.items()]
+
+    def disconnect(self):
+        """
+        Close every connection and stop the event loop.
+        """
+        for transport in self.devices.values():
+            transport.disconnect()
+        self.loop_thread.stop()
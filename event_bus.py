@@ -0,0 +1,53 @@
+import itertools
+import threading
+from collections import deque
+
+
+class EventBus:
+    def __init__(self, history=500):
+        """
+        In-memory publish/subscribe of the messages added to Main, for live dashboards.
+        The latest events are kept in a ring buffer, so clients joining late or reconnecting
+        catch up from it instead of reading the database. Subscribers only wait on a shared
+        condition, so a slow client can't make the bus hold more than the ring buffer.
+        :param history: Number of recent events kept for late joiners.
+        """
+        self.events = deque(maxlen=history)
+        self.ids = itertools.count(1)
+        self.last_id = 0
+        self.condition = threading.Condition()
+
+    def publish(self, data):
+        """
+        Publish an event to every subscriber. Never blocks on them.
+        :param data: JSON serializable event data.
+        :return: The event's ID.
+        """
+        with self.condition:
+            event_id = next(self.ids)
+            self.events.append((event_id, data))
+            self.last_id = event_id
+            self.condition.notify_all()
+        return event_id
+
+    def get_since(self, last_id):
+        """
+        Get the buffered events published after an event.
+        :param last_id: ID of the last event the client has, 0 for every buffered event.
+        :return: A list of (event ID, data) tuples, oldest first.
+        """
+        with self.condition:
+            if last_id >= self.last_id:
+                return []
+            return [event for event in self.events if event[0] > last_id]
+
+    def wait(self, last_id, timeout=None):
+        """
+        Wait for events published after an event.
+        :param last_id: ID of the last event the client has.
+        :param timeout: Seconds to wait at most, None waits forever.
+        :return: A list of (event ID, data) tuples, empty if the timeout expired first.
+        """
+        with self.condition:
+            self.condition.wait_for(lambda: self.last_id > last_id, timeout)
+        return self.get_since(last_id)
@@ -0,0 +1,143 @@
+import argparse
+import asyncio
+import threading
+import urllib.request
+
+
+class FakeArduino:
+    def __init__(self, host="127.0.0.1", port=0, post_url=None, delay=0.0, pin=7):
+        """
+        Local stand-in for the Arduino, for testing and benchmarking without the hardware.
+        It answers FLIPSTATE and GETSTATE like the Arduino, echoes anything else back,
+        and can POST its replies to the server like the Arduino does.
+        :param host: Address to listen on.
+        :param port: Port to listen on, 0 picks a free one.
+        :param post_url: URL of the server to POST "timer:reply" messages to, None disables it.
+        :param delay: Seconds to wait before replying, to simulate the device's latency.
+        :param pin: Pin number reported in replies.
+        """
+        self.host = host
+        self.port = port
+        self.post_url = post_url
+        self.delay = delay
+        self.pin = pin
+        self.state = False
+        self.received = []
+        # Writer and handler task of each open connection
+        self.connections = {}
+        self.loop = None
+        self.thread = None
+        self.server = None
+        self.ready = threading.Event()
+
+    async def handle_client(self, reader, writer):
+        """
+        Handle one connection, replying to each newline terminated message.
+        """
+        self.connections[writer] = asyncio.current_task()
+        try:
+            await self.reply_loop(reader, writer)
+        except ConnectionError:
+            pass
+        finally:
+            self.connections.pop(writer, None)
+            writer.close()
+
+    async def reply_loop(self, reader, writer):
+        """
+        Reply to each message of a connection until it closes.
+        """
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            message = line.decode(errors="replace").strip()
+            if not message:
+                continue
+            self.received.append(message)
+            timer_id, _, command = message.rpartition(":")
+
+            if command == "FLIPSTATE":
+                self.state = not self.state
+            elif command != "GETSTATE":
+                writer.write(line)
+                await writer.drain()
+                continue
+
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            reply = f"Pin {self.pin} set to {'HIGH' if self.state else 'LOW'}"
+            writer.write(f"{reply}\n".encode())
+            await writer.drain()
+            if self.post_url:
+                await asyncio.get_running_loop().run_in_executor(None, self.post, f"{timer_id}:{reply}")
+
+    def post(self, data):
+        """
+        POST a reply to the server, like the Arduino does.
+        :param data: The "timer:reply" message.
+        """
+        try:
+            urllib.request.urlopen(urllib.request.Request(self.post_url, data=data.encode(), method="POST"), timeout=5)
+        except Exception as e:
+            print(f"Fake Arduino couldn't POST to {self.post_url}: {e}")
+
+    async def serve(self):
+        """
+        Listen for connections until the loop is stopped.
+        """
+        self.server = await asyncio.start_server(self.handle_client, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.ready.set()
+        async with self.server:
+            await self.server.serve_forever()
+
+    def start(self):
+        """
+        Run the fake Arduino on a background thread.
+        :return: The port it listens on.
+        """
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="fake-arduino", daemon=True)
+        self.thread.start()
+        asyncio.run_coroutine_threadsafe(self.serve(), self.loop)
+        self.ready.wait(5)
+        return self.port
+
+    def stop(self):
+        """
+        Stop listening and drop the open connections, like the device being switched off.
+        """
+        if self.loop is not None and self.server is not None:
+            asyncio.run_coroutine_threadsafe(self.shutdown(), self.loop).result(5)
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join(5)
+            self.loop.close()
+            self.loop = None
+
+    async def shutdown(self):
+        """
+        Close the server and every connection. Runs on the loop.
+        """
+        self.server.close()
+        tasks = list(self.connections.values())
+        for writer in list(self.connections):
+            writer.close()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self.server.wait_closed()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for the Arduino light controller")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5001)
+    parser.add_argument("--post-url", default=None, help="Server URL to POST replies to, e.g. http://127.0.0.1:5000/")
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds to wait before replying")
+    args = parser.parse_args()
+
+    fake = FakeArduino(args.host, args.port, args.post_url, args.delay)
+    print(f"Fake Arduino listening on {args.host}:{args.port}")
+    try:
+        asyncio.run(fake.serve())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,45 @@
+import threading
+from collections import deque
+
+
+class FrameQueue:
+    def __init__(self, maxsize=1):
+        """
+        Bounded queue that drops the oldest item when full,
+        so the consumer always works on the freshest frame.
+        :param maxsize: Maximum number of frames to hold.
+        """
+        self.frames = deque(maxlen=maxsize)
+        self.condition = threading.Condition()
+        self.dropped = 0
+
+    def put(self, frame):
+        """
+        Adds a frame to the queue, discarding the oldest one if the queue is full.
+        :param frame: The frame to add.
+        """
+        with self.condition:
+            if len(self.frames) == self.frames.maxlen:
+                self.dropped += 1
+            self.frames.append(frame)
+            self.condition.notify()
+
+    def get(self, timeout=None):
+        """
+        Takes the oldest frame in the queue, waiting for one if it is empty.
+        :param timeout: Maximum time to wait in seconds, None waits forever.
+        :return: The frame, or None if the timeout expired.
+        """
+        with self.condition:
+            if not self.frames:
+                self.condition.wait(timeout)
+            if not self.frames:
+                return None
+            return self.frames.popleft()
+
+    def clear(self):
+        """
+        Discards every frame in the queue.
+        """
+        with self.condition:
+            self.frames.clear()
@@ -0,0 +1,126 @@
+import math
+from collections import deque
+
+import numpy as np
+
+
+class OneEuroFilter:
+    def __init__(self, min_cutoff=1.0, beta=0.01, d_cutoff=1.0):
+        """
+        One-Euro filter over a whole landmark array at once.
+        Slow movements are smoothed heavily to remove jitter, fast ones lightly to keep up with the hand.
+        :param min_cutoff: Cutoff frequency in Hz when the hand is still, lower smooths more.
+        :param beta: How much the cutoff rises with speed, higher lags less on fast movements.
+        :param d_cutoff: Cutoff frequency in Hz of the speed estimate.
+        """
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.previous = None
+        self.previous_speed = None
+        self.previous_time = None
+
+    @staticmethod
+    def alpha(cutoff, elapsed):
+        """
+        Smoothing factor of an exponential filter with the given cutoff frequency.
+        :param cutoff: Cutoff frequency in Hz, a float or an array.
+        :param elapsed: Seconds since the previous sample.
+        """
+        tau = 1.0 / (2 * math.pi * cutoff)
+        return 1.0 / (1.0 + tau / elapsed)
+
+    def filter(self, values, timestamp):
+        """
+        Smooth one sample.
+        :param values: Array of coordinates, e.g. the (21, 2) landmark pixel coordinates of a hand.
+        :param timestamp: Time of the sample in seconds.
+        :return: The smoothed coordinates, as floats.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if self.previous is None or self.previous.shape != values.shape or timestamp <= self.previous_time:
+            self.previous = values
+            self.previous_speed = np.zeros_like(values)
+            self.previous_time = timestamp
+            return values
+
+        elapsed = timestamp - self.previous_time
+        speed = (values - self.previous) / elapsed
+        speed_alpha = self.alpha(self.d_cutoff, elapsed)
+        speed = self.previous_speed + speed_alpha * (speed - self.previous_speed)
+
+        cutoff = self.min_cutoff + self.beta * np.abs(speed)
+        filtered = self.previous + self.alpha(cutoff, elapsed) * (values - self.previous)
+
+        self.previous = filtered
+        self.previous_speed = speed
+        self.previous_time = timestamp
+        return filtered
+
+    def reset(self):
+        """
+        Forget the previous samples, e.g. when the hand is lost.
+        """
+        self.previous = None
+        self.previous_speed = None
+        self.previous_time = None
+
+
+class GestureStateMachine:
+    def __init__(self, confirm_frames=1, window=1):
+        """
+        Debounced on/off gesture state. The state only changes once confirm_frames of the last
+        window observations agree, so a single jittery frame can't flip it.
+        confirm_frames=1 and window=1 change the state on every frame's result.
+        :param confirm_frames: Observations needed to change the state.
+        :param window: Number of recent observations considered.
+        """
+        self.window = max(1, window)
+        self.confirm_frames = min(max(1, confirm_frames), self.window)
+        self.history = deque(maxlen=self.window)
+        self.state = 0
+        self.transitions = 0
+        self.rejected = 0
+
+    def update(self, observation):
+        """
+        Add one frame's result.
+        :param observation: True if the gesture is made, False if it is released,
+                            None if the frame says neither, which keeps the state as is.
+        :return: True if the state just turned on, False otherwise.
+        """
+        if observation is None:
+            return False
+        self.history.append(observation)
+
+        if self.state == 0 and observation:
+            if sum(self.history) >= self.confirm_frames:
+                self.set_state(1)
+                return True
+            self.rejected += 1
+        elif self.state == 1 and not observation:
+            if len(self.history) - sum(self.history) >= self.confirm_frames:
+                self.set_state(0)
+            else:
+                self.rejected += 1
+        return False
+
+    def set_state(self, state):
+        """
+        Change the state, starting a new window so older frames can't count towards the next change.
+        :param state: 0 or 1.
+        """
+        self.state = state
+        self.transitions += 1
+        self.history.clear()
+
+    def get_stats(self):
+        """
+        Get how many state changes were made and how many frames were held back by the debounce.
+        :return: A dictionary of the counters.
+        """
+        return {
+            "state": self.state,
+            "transitions": self.transitions,
+            "rejected": self.rejected,
+        }
@@ -6,8 +6,17 @@ print(f"OpenCV and Mediapipe loaded in {time.time() - start:.5f} seconds")
 
 import numpy as np
 from typing import List, Optional
-from wifi_handler import WiFiClientHandler, send_message
+from wifi_handler import WiFiClientHandler, register_client_handler
+from device_registry import DeviceRegistry
+from frame_queue import FrameQueue
+from camera_pool import CameraPool
+from motion_gate import MotionGate
+from rate_controller import AdaptiveRateController
+from gesture_filter import GestureStateMachine, OneEuroFilter
+from instrumentation import stats
 import threading
+import signal
+from collections import deque
 
 
 class HandTracker:
@@ -17,46 +26,95 @@ class HandTracker:
                  detection_confidence: float = 0.7,
                  tracking_confidence: float = 0.5,
                  hitbox_margin: int = 20,
+                 headless: bool = False,
+                 camera=0,
+                 connect: bool = True,
                  ):
         """
-        Initialize HandTracker with configurable parameters and optional WiFi connection
+        Initialize HandTracker with configurable parameters and its Arduino connection,
+        configured in the arduino section of the config
 
         Args:
-            host (Optional[str]): WiFi host address. None disables WiFi connection.
-            port (Optional[int]): WiFi port number. None disables WiFi connection.
+            main: The Main instance
             max_hands (int): Maximum number of hands to detect
             detection_confidence (float): Minimum detection confidence
             tracking_confidence (float): Minimum tracking confidence
             hitbox_margin (int): Margin around palm for finger detection
+            headless (bool): Skip all drawing and GUI calls, overrides tracker.headless in config
+            camera (int | str): Camera index or video stream URL
+            connect (bool): Connect to the Arduino. Camera worker processes send their commands
+                through the parent process instead.
         """
         # WiFi Communication Setup
         self.client_handler = None
         self.main = main
         self.config = self.main.get_config()
         self.mode = self.config["tracker"]["mode"]
-        try:
-            print(f"Connecting to arduino")
-            self.client_handler = WiFiClientHandler(main)
-            print("Handler created")
-            self.client_handler.connect()
-            print("WiFi connection established.")
-
-            self.messages = []
-            self.listening_thread = threading.Thread(target=self.listen_for_messages, daemon=True)
-            self.listening_thread.start()
-
-        except Exception as e:
-            print(f"Failed to establish WiFi connection: {e}")
-            raise
+        self.camera = camera
+        self.window_name = "Hand Tracking"
+        # Only the latest messages are kept
+        self.messages = deque(maxlen=100)
+        # Kept so camera worker processes can build the same model
+        self.model_settings = {
+            "max_hands": max_hands,
+            "detection_confidence": detection_confidence,
+            "tracking_confidence": tracking_confidence,
+            "hitbox_margin": hitbox_margin,
+        }
+        if connect:
+            self.connect_arduino()
 
         # Hand Detection Constants
-        self.finger_tips = [4, 8, 12, 16, 20]
+        self.finger_tips = np.array([4, 8, 12, 16, 20])
         self.finger_names = ["Thumb", "Index", "Middle", "Ring", "Pinky"]
-        self.palm_points = [0, 1, 5, 9, 13, 17]
+        self.palm_points = np.array([0, 1, 5, 9, 13, 17])
         self.hitbox_margin = int(hitbox_margin + hitbox_margin/100)
 
         # Hand Detection State
         self.state = 0
+        self.is_s_pressed = False
+        self.stop_event = threading.Event()
+        self.state_requested = threading.Event()
+
+        # Headless mode skips drawing and the OpenCV window,
+        # quit and "get state" are then requested through signals or the server.
+        self.headless: bool = headless or self.config["tracker"].get("headless", False)
+
+        # Inference runs on a frame downscaled by this factor, clamped to (0, 1]
+        inference_scale = float(self.config["tracker"].get("inference_scale", 1.0))
+        self.inference_scale = min(max(inference_scale, 0.1), 1.0)
+
+        # Optional motion pre-filter, skipping detection on idle frames
+        motion_gate_config = self.config["tracker"].get("motion_gate", {})
+        self.motion_gate = MotionGate(motion_gate_config) if motion_gate_config.get("enabled", False) else None
+        self.hand_present = False
+
+        # ROI tracking runs detection around the last known hands, or the box in BOX mode
+        roi_config = self.config["tracker"].get("roi", {})
+        self.roi_enabled: bool = roi_config.get("enabled", False)
+        self.roi_margin: int = roi_config.get("margin", 80)
+        self.roi_min_size: int = roi_config.get("min_size", 160)
+        self.roi = None
+        # Set when the hand wasn't found in the region, so the next frame runs on the full frame
+        self.roi_missed = False
+
+        # Adaptive rate control adjusts the inference scale and frame rate to hold a target latency
+        adaptive_config = self.config["tracker"].get("adaptive", {})
+        self.rate_controller = AdaptiveRateController(main, adaptive_config, self.inference_scale) \
+            if adaptive_config.get("enabled", False) else None
+        self.stage_times = {}
+        # Set when several cameras are tracked by worker processes, which report their own stats
+        self.camera_pool = None
+
+        # Gestures must hold for several frames before the state changes, and the palm hitbox
+        # (or the box in BOX mode) grows or shrinks by the hysteresis to keep the current state
+        filter_config = self.config["tracker"].get("gesture_filter", {})
+        self.gesture_state = GestureStateMachine(filter_config.get("confirm_frames", 1), filter_config.get("window", 1))
+        self.hysteresis: int = filter_config.get("hysteresis", 0)
+        # Optional One-Euro smoothing of the landmarks, one filter per hand
+        self.smoothing_config = filter_config.get("smoothing", {})
+        self.smoothing_enabled: bool = self.smoothing_config.get("enabled", False)
+        self.landmark_filters = []
 
         # MediaPipe Setup
         self.mp_hands = mp.solutions.hands
@@ -69,56 +127,107 @@ class HandTracker:
             min_detection_confidence=detection_confidence,
             min_tracking_confidence=tracking_confidence
         )
+        # Feeding crops to the full frame model would break its tracking between frames, so they get
+        # their own tracking model. The crop only moves when the hands near its edge, so between moves
+        # the model tracks the landmarks instead of running palm detection on every frame.
+        self.roi_hands = self.mp_hands.Hands(
+            static_image_mode=False,
+            max_num_hands=max_hands,
+            min_detection_confidence=detection_confidence,
+            min_tracking_confidence=tracking_confidence
+        ) if self.roi_enabled else None
 
-    def detect_in_box(self, hand_landmarks, frame_width, frame_height):
+    def connect_arduino(self):
         """
-        Check if all hand landmarks fall into the specified positional box.
+        Connect to the Arduino, or every configured Arduino, with the configured transport.
+        """
+        try:
+            print(f"Connecting to arduino")
+            # Transports: SOCKET, ASYNC
+            if self.config["arduino"].get("transport", "SOCKET") == "ASYNC":
+                # Sends are queued and received messages handled on the transport's event loop,
+                # so no listening thread is needed and the frame loop never blocks on the network.
+                # Every configured device gets its own connection, commands are fanned out to all of them.
+                self.client_handler = DeviceRegistry(self.main)
+                register_client_handler(self.client_handler)
+                self.main.get_server().run()
+                if not self.client_handler.connect():
+                    print("Some Arduinos aren't reachable yet, will keep retrying in the background.")
+                self.messages = self.client_handler.messages
+            else:
+                self.client_handler = WiFiClientHandler(self.main)
+                print("Handler created")
+                self.client_handler.connect()
+                print("WiFi connection established.")
+
+                self.listening_thread = threading.Thread(target=self.listen_for_messages, daemon=True)
+                self.listening_thread.start()
+
+        except Exception as e:
+            print(f"Failed to establish WiFi connection: {e}")
+            raise
+
+    def landmarks_to_array(self, hand_landmarks, frame_width, frame_height):
+        """
+        Convert the MediaPipe hand landmarks to pixel coordinates once per frame,
+        so every gesture and box check can share them.
 
         Args:
             hand_landmarks: MediaPipe hand landmarks
             frame_width (int): Width of the video frame
             frame_height (int): Height of the video frame
 
+        Returns:
+            np.ndarray: (21, 2) array of integer (x, y) pixel coordinates
+        """
+        landmarks = hand_landmarks.landmark
+        coords = np.fromiter((value for lm in landmarks for value in (lm.x, lm.y)),
+                             dtype=np.float64, count=2 * len(landmarks)).reshape(-1, 2)
+        coords *= (frame_width, frame_height)
+        return coords.astype(np.int32)
+
+    def detect_in_box(self, landmark_coords, frame_width, frame_height, margin=0):
+        """
+        Check if all hand landmarks fall into the specified positional box.
+
+        Args:
+            landmark_coords (np.ndarray): (21, 2) landmark pixel coordinates
+            frame_width (int): Width of the video frame
+            frame_height (int): Height of the video frame
+            margin (int): Pixels to grow the box by, negative values shrink it
+
         Returns:
             bool: True if all landmarks are within the box, False otherwise.
         """
         # Get box configuration
         box_x_min, box_y_min, box_x_max, box_y_max = self.get_box_boundaries(frame_width, frame_height)
-
-        # Convert all landmarks to pixel coordinates
-        landmark_coords = [(int(lm.x * frame_width), int(lm.y * frame_height)) for lm in hand_landmarks.landmark]
+        box_x_min, box_y_min = box_x_min - margin, box_y_min - margin
+        box_x_max, box_y_max = box_x_max + margin, box_y_max + margin
 
         # Check if all landmarks are inside the box
-        all_in_box = all(
-            box_x_min <= x <= box_x_max and
-            box_y_min <= y <= box_y_max
-            for x, y in landmark_coords
-        )
+        all_in_box = np.all((landmark_coords >= (box_x_min, box_y_min)) &
+                            (landmark_coords <= (box_x_max, box_y_max)))
 
-        return all_in_box
+        return bool(all_in_box)
 
 
     def listen_for_messages(self):
         """
-        Loop to continuously call receive_message.
+        Loop to keep the received messages until the connection closes.
         """
-        while True:
-            message = self.client_handler.receive_message()
-            if message:
-                self.messages.append(message)
+        for message in self.client_handler.iter_messages():
+            self.messages.append(message)
 
-    def draw_polygon(self, frame, hand_landmarks):
+    def draw_polygon(self, frame, landmark_coords):
         """
         Draw a polygon around the palm using convex hull and minimum area rectangle.
 
         Args:
             frame: Input video frame
-            hand_landmarks: MediaPipe hand landmarks
+            landmark_coords (np.ndarray): (21, 2) landmark pixel coordinates
         """
-        # Extract palm points and convert to pixel coordinates
-        points = np.array([[int(hand_landmarks.landmark[i].x * frame.shape[1]),
-                            int(hand_landmarks.landmark[i].y * frame.shape[0])]
-                           for i in [0, 1, 5, 9, 13, 17]], dtype=np.int32)
+        # Extract palm points
+        points = landmark_coords[self.palm_points]
 
         # Calculate convex hull
         hull = cv.convexHull(points)
@@ -133,48 +242,45 @@ class HandTracker:
         # Draw polygon on the frame
         cv.polylines(frame, [box], isClosed=True, color=(0, 255, 0), thickness=2)
 
-    def calculate_bounding_box(self, palm_coords):
+    def calculate_bounding_box(self, palm_coords, margin=None):
         """
         Calculate bounding box with margin for palm landmarks.
 
         Args:
-            palm_coords (List[tuple]): Coordinates of palm landmarks
+            palm_coords (np.ndarray): (N, 2) coordinates of palm landmarks
+            margin (Optional[int]): Margin around the landmarks, defaults to the hitbox margin
 
         Returns:
             List[int]: Bounding box coordinates [x_min, x_max, y_min, y_max]
         """
-        x_min = min([coord[0] for coord in palm_coords]) - self.hitbox_margin
-        x_max = max([coord[0] for coord in palm_coords]) + self.hitbox_margin
-        y_min = min([coord[1] for coord in palm_coords]) - self.hitbox_margin
-        y_max = max([coord[1] for coord in palm_coords]) + self.hitbox_margin
+        if margin is None:
+            margin = self.hitbox_margin
+        x_min, y_min = palm_coords.min(axis=0) - margin
+        x_max, y_max = palm_coords.max(axis=0) + margin
 
-        return [x_min, x_max, y_min, y_max]
+        return [int(x_min), int(x_max), int(y_min), int(y_max)]
 
     def detect_raised_fingers(self,
-                              hand_landmarks,
+                              landmark_coords,
                               frame_width: int,
                               frame_height: int,
-                              frame) -> List[str]:
+                              frame,
+                              margin: Optional[int] = None) -> List[str]:
         """
         Detect raised fingers based on palm hitbox.
 
         Args:
-            hand_landmarks: MediaPipe hand landmarks
+            landmark_coords (np.ndarray): (21, 2) landmark pixel coordinates
             frame_width (int): Width of video frame
             frame_height (int): Height of video frame
             frame: Current video frame
+            margin (Optional[int]): Margin around the palm, defaults to the hitbox margin
 
         Returns:
             List[str]: Names of raised fingers
         """
-        raised_fingers = []
-
-        # Get palm landmarks and convert to pixel coordinates
-        palm_landmarks = [hand_landmarks.landmark[i] for i in self.palm_points]
-        palm_coords = [(int(lm.x * frame_width), int(lm.y * frame_height)) for lm in palm_landmarks]
-
         # Calculate bounding box
-        coords = self.calculate_bounding_box(palm_coords)
+        coords = self.calculate_bounding_box(landmark_coords[self.palm_points], margin)
 
         # Clamp hitbox coordinates
         x_min = max(0, coords[0])
@@ -183,20 +289,70 @@ class HandTracker:
         y_max = min(frame_height, coords[3])
 
         # Visualize palm hitbox
-        cv.rectangle(frame, (x_min, y_min), (x_max, y_max), (0, 255, 255), 2)
+        if not self.headless:
+            drawing_start = time.perf_counter()
+            cv.rectangle(frame, (x_min, y_min), (x_max, y_max), (0, 255, 255), 2)
+            self.record_stage("drawing", drawing_start)
 
         # Check finger tips against hitbox
-        for idx in range(5):
-            tip = self.finger_tips[idx]
-            tip_landmark = hand_landmarks.landmark[tip]
-            tip_x = int(tip_landmark.x * frame_width)
-            tip_y = int(tip_landmark.y * frame_height)
+        tip_coords = landmark_coords[self.finger_tips]
+        in_hitbox = np.all((tip_coords >= (x_min, y_min)) & (tip_coords <= (x_max, y_max)), axis=1)
 
-            # If tip is outside hitbox, consider finger raised
-            if not (x_min <= tip_x <= x_max and y_min <= tip_y <= y_max):
-                raised_fingers.append(self.finger_names[idx])
+        # If tip is outside hitbox, consider finger raised
+        return [name for name, inside in zip(self.finger_names, in_hitbox) if not inside]
 
-        return raised_fingers
+    def observe_gesture(self, landmark_coords, frame_width, frame_height, frame):
+        """
+        Check one hand for the current mode's gesture, with hysteresis towards the current state.
+
+        Args:
+            landmark_coords (np.ndarray): (21, 2) landmark pixel coordinates
+            frame_width (int): Width of video frame
+            frame_height (int): Height of video frame
+            frame: Current video frame
+
+        Returns:
+            Optional[bool]: True if the gesture is made, False if it is released, None if neither
+        """
+        if self.mode == "GESTURE":
+            # A larger hitbox while off makes raising fingers count later, a smaller one while on
+            # makes them count as lowered later
+            hysteresis = -self.hysteresis if self.state == 1 else self.hysteresis
+            raised_fingers = self.detect_raised_fingers(landmark_coords, frame_width, frame_height, frame,
+                                                        self.hitbox_margin + hysteresis)
+            if not raised_fingers:
+                return False
+            # Index and pinky, or the index alone which is more accessible,
+            # for people with arthritis for example
+            if set(raised_fingers) in ({"Index", "Pinky"}, {"Index"}):
+                return True
+            return None
+
+        if self.mode == "BOX":
+            # The hand has to be further in to turn on, and further out to turn off
+            hysteresis = self.hysteresis if self.state == 1 else -self.hysteresis
+            return self.detect_in_box(landmark_coords, frame_width, frame_height, hysteresis)
+        return None
+
+    def smooth_landmarks(self, hands_coords):
+        """
+        Smooth each hand's landmarks with its own One-Euro filter, removing jitter between frames.
+
+        Args:
+            hands_coords (List[np.ndarray]): (21, 2) landmark pixel coordinates of each hand
+
+        Returns:
+            List[np.ndarray]: The smoothed coordinates of each hand
+        """
+        if len(self.landmark_filters) != len(hands_coords):
+            # Hands are matched by their order, start over when one appears or disappears
+            self.landmark_filters = [OneEuroFilter(self.smoothing_config.get("min_cutoff", 1.0),
+                                                   self.smoothing_config.get("beta", 0.01),
+                                                   self.smoothing_config.get("d_cutoff", 1.0))
+                                     for _ in hands_coords]
+        timestamp = time.perf_counter()
+        return [landmark_filter.filter(coords, timestamp).round().astype(np.int32)
+                for landmark_filter, coords in zip(self.landmark_filters, hands_coords)]
 
     def get_box_boundaries(self, frame_width, frame_height):
         """
@@ -227,81 +383,216 @@ class HandTracker:
         return box_x_min, box_y_min, box_x_max, box_y_max
 
 
-    def process_frame(self, frame):
+    def get_roi(self, frame_width, frame_height):
+        """
+        Get the region to run detection on: around the box in BOX mode,
+        around the hands found in the previous frame otherwise.
+
+        Args:
+            frame_width (int): Width of the video frame
+            frame_height (int): Height of the video frame
+
+        Returns:
+            Optional[tuple]: (x_min, y_min, x_max, y_max) clamped to the frame, None for the full frame
+        """
+        if self.mode == "BOX":
+            box_x_min, box_y_min, box_x_max, box_y_max = self.get_box_boundaries(frame_width, frame_height)
+            roi = (box_x_min - self.roi_margin, box_y_min - self.roi_margin,
+                   box_x_max + self.roi_margin, box_y_max + self.roi_margin)
+        elif self.roi is not None:
+            roi = self.roi
+        else:
+            return None
+
+        x_min, y_min = max(0, roi[0]), max(0, roi[1])
+        x_max, y_max = min(frame_width, roi[2]), min(frame_height, roi[3])
+        # Too small to find a hand in, or no smaller than the frame itself
+        if x_max - x_min < self.roi_min_size or y_max - y_min < self.roi_min_size:
+            return None
+        if (x_max - x_min) * (y_max - y_min) >= frame_width * frame_height:
+            return None
+        return x_min, y_min, x_max, y_max
+
+    def update_roi(self, hands_coords):
+        """
+        Remember the region around the hands found in this frame, for the next frame's detection.
+        The region stays where it is while the hands are at least half the margin away from its edges,
+        so the crop model keeps tracking them instead of detecting them again in a moved crop.
+
+        Args:
+            hands_coords (List[np.ndarray]): (21, 2) landmark pixel coordinates of each hand
+        """
+        if not hands_coords:
+            self.roi = None
+            return
+        x_min, x_max, y_min, y_max = self.calculate_bounding_box(np.concatenate(hands_coords), self.roi_margin // 2)
+        if self.roi is not None and self.roi[0] <= x_min and self.roi[1] <= y_min \
+                and x_max <= self.roi[2] and y_max <= self.roi[3]:
+            return
+        x_min, x_max, y_min, y_max = self.calculate_bounding_box(np.concatenate(hands_coords), self.roi_margin)
+        self.roi = (x_min, y_min, x_max, y_max)
+
+    def detect_hands(self, frame, frame_width, frame_height):
+        """
+        Run hand detection, on the region of interest when ROI tracking is enabled.
+        When no hand is found in the region, the hand may just have left it: nothing is observed
+        on this frame, and the next frame runs on the full frame.
+
+        Args:
+            frame: Flipped BGR video frame
+            frame_width (int): Width of the video frame
+            frame_height (int): Height of the video frame
+
+        Returns:
+            Optional[list]: MediaPipe hand landmarks, normalized to the full frame, None when nothing was observed
+        """
+        roi = self.get_roi(frame_width, frame_height) if self.roi_enabled and not self.roi_missed else None
+        if roi is not None:
+            x_min, y_min, x_max, y_max = roi
+            # The crop is downscaled like the full frame, so the adaptive rate controller's
+            # scale applies to both paths
+            rgb_crop = self.prepare_inference_frame(frame[y_min:y_max, x_min:x_max])
+            with stats.timed("tracker.hands_process"):
+                results = self.roi_hands.process(rgb_crop)
+            if not results.multi_hand_landmarks:
+                # In BOX mode, only a hand leaving the box can change the state once it's on
+                self.roi_missed = self.mode != "BOX" or self.state == 1
+                return None if self.roi_missed else []
+            # Map the landmarks from the crop's coordinates back to the full frame's
+            crop_width, crop_height = x_max - x_min, y_max - y_min
+            for hand_landmarks in results.multi_hand_landmarks:
+                for lm in hand_landmarks.landmark:
+                    lm.x = (x_min + lm.x * crop_width) / frame_width
+                    lm.y = (y_min + lm.y * crop_height) / frame_height
+            return results.multi_hand_landmarks
+
+        self.roi_missed = False
+        # Landmarks are normalized to [0, 1], so scaling them by the full frame size
+        # maps them back onto the full resolution frame whatever size inference ran at.
+        rgb_frame = self.prepare_inference_frame(frame)
+        with stats.timed("tracker.hands_process"):
+            results = self.hands.process(rgb_frame)
+        return results.multi_hand_landmarks or []
+
+    def prepare_inference_frame(self, frame):
+        """
+        Build the RGB buffer fed to the hand model, downscaled by the configured inference scale.
+        The model resizes its input internally, so a smaller buffer only saves the
+        colour conversion and copy cost on the full resolution frame.
+
+        Args:
+            frame: Flipped BGR video frame, or a region of it
+
+        Returns:
+            RGB frame at inference resolution
+        """
+        with stats.timed("tracker.cvtcolor"):
+            if self.inference_scale < 1.0:
+                frame = cv.resize(frame, None, fx=self.inference_scale, fy=self.inference_scale,
+                                  interpolation=cv.INTER_AREA)
+            return cv.cvtColor(frame, cv.COLOR_BGR2RGB)
+
+    def process_frame(self, frame, capture_time=0.0):
         """
         Process a single video frame for hand tracking
 
         Args:
             frame: Input video frame
+            capture_time (float): Seconds it took to capture the frame, for the adaptive rate controller
 
         Returns:
             tuple: Processed frame and hand landmarks (if detected)
         """
         frame_height, frame_width, _ = frame.shape
-        frame = cv.flip(frame, 1)
-        rgb_frame = cv.cvtColor(frame, cv.COLOR_BGR2RGB)
-
-        # Detect hands
-        results = self.hands.process(rgb_frame)
+        frame_start = time.perf_counter()
+        self.stage_times = {"capture": capture_time}
+
+        # Drop frames when the rate controller is holding back the processing rate
+        run_detection = self.rate_controller is None or self.rate_controller.should_process()
+        # Skip detection on frames where nothing moved, the state can't have changed
+        if run_detection and self.motion_gate is not None:
+            run_detection = self.motion_gate.should_process(frame, self.hand_present)
+        with stats.timed("tracker.flip"):
+            frame = cv.flip(frame, 1)
+
+        hand_landmarks_list = []
+        # Whether this frame tells where the hands are, False when detection was skipped or missed the ROI
+        observed = run_detection
+        if run_detection:
+            if self.rate_controller is not None:
+                self.inference_scale = self.rate_controller.scale
+
+            # Detect hands
+            inference_start = time.perf_counter()
+            hand_landmarks_list = self.detect_hands(frame, frame_width, frame_height)
+            if hand_landmarks_list is None:
+                # Keep the state, the filters and the hand as present until the full frame is checked
+                hand_landmarks_list = []
+                observed = False
+            else:
+                self.hand_present = bool(hand_landmarks_list)
+            self.stage_times["inference"] = time.perf_counter() - inference_start
+        decision_start = time.perf_counter()
 
         # Always visualize the box if mode is BOX
-        if self.mode == "BOX":
+        if self.mode == "BOX" and not self.headless:
+            drawing_start = time.perf_counter()
             box_x_min, box_y_min, box_x_max, box_y_max = self.get_box_boundaries(frame_width, frame_height)
             cv.rectangle(frame, (box_x_min, box_y_min), (box_x_max, box_y_max), (255, 255, 0), 2)
+            self.record_stage("drawing", drawing_start)
+
+        hands_coords = []
+        if hand_landmarks_list:
+            for hand_landmarks in hand_landmarks_list:
+                # Convert the landmarks once, shared by every check below
+                landmark_coords = self.landmarks_to_array(hand_landmarks, frame_width, frame_height)
+                hands_coords.append(landmark_coords)
 
-        if results.multi_hand_landmarks:
-            for hand_landmarks in results.multi_hand_landmarks:
                 # Draw hand landmarks
-                self.mp_drawing.draw_landmarks(
-                    frame,
-                    hand_landmarks,
-                    self.mp_hands.HAND_CONNECTIONS,
-                    self.mp_drawing.DrawingSpec(color=(0, 255, 0), thickness=2, circle_radius=2),
-                    self.mp_drawing.DrawingSpec(color=(255, 0, 0), thickness=2)
-                )
-
-                if self.mode == "GESTURE":
-                    # Detect raised fingers
-                    raised_fingers = self.detect_raised_fingers(hand_landmarks, frame_width, frame_height, frame)
-                    if raised_fingers:
-                        if len(raised_fingers) == 2 and "Index" in raised_fingers and "Pinky" in raised_fingers and self.state != 1:
-                            self.state = 1
-                            command = "FLIPSTATE"
-                            timer = self.main.start_timer()
-                            message = timer + ":" + command
-                            self.client_handler.send_message(message)
-                        # More accessible than pinky AND index
-                        # # For people with arthritis for example
-                        elif len(raised_fingers) == 1 and "Index" in raised_fingers and self.state != 1:
-                            self.state = 1
-                            command = "FLIPSTATE"
-                            timer = self.main.start_timer()
-                            message = timer + ":" + command
-                            self.client_handler.send_message(message)
-
-                        elif self.state == 1 and not raised_fingers:
-                            self.state = 0
-                    elif self.state != 0:
-                        self.state = 0
-
-                elif self.mode == "BOX":
-                    # Check if all landmarks are in the box
-                    all_in_box = self.detect_in_box(hand_landmarks, frame_width, frame_height)
-
-                    if all_in_box and self.state != 1:
-                        self.state = 1
-                        command = "FLIPSTATE"
-                        timer = self.main.start_timer()
-                        message = f"{timer}:{command}"
-                        self.client_handler.send_message(message)
-
-                    elif self.state == 1 and not all_in_box:
-                        self.state = 0
+                if not self.headless:
+                    drawing_start = time.perf_counter()
+                    self.mp_drawing.draw_landmarks(
+                        frame,
+                        hand_landmarks,
+                        self.mp_hands.HAND_CONNECTIONS,
+                        self.mp_drawing.DrawingSpec(color=(0, 255, 0), thickness=2, circle_radius=2),
+                        self.mp_drawing.DrawingSpec(color=(255, 0, 0), thickness=2)
+                    )
+                    self.record_stage("drawing", drawing_start)
+
+            if self.smoothing_enabled:
+                hands_coords = self.smooth_landmarks(hands_coords)
+
+            observations = [self.observe_gesture(landmark_coords, frame_width, frame_height, frame)
+                            for landmark_coords in hands_coords]
+            # Any hand making the gesture turns it on, otherwise any hand releasing it turns it off.
+            # Frames without a hand keep the state as is.
+            observation = True if True in observations else False if False in observations else None
+            if self.gesture_state.update(observation):
+                self.send_command("FLIPSTATE")
+            self.state = self.gesture_state.state
+
+        if observed:
+            if not hands_coords:
+                self.landmark_filters = []
+            self.update_roi(hands_coords)
+        if run_detection:
+            self.stage_times["decision"] = time.perf_counter() - decision_start \
+                - self.stage_times.get("send", 0.0) - self.stage_times.get("drawing", 0.0)
+            if self.rate_controller is not None:
+                self.rate_controller.record_frame(self.stage_times)
+
+        for stage, seconds in self.stage_times.items():
+            stats.record(f"tracker.{stage}", seconds)
+        stats.record("tracker.process_frame", time.perf_counter() - frame_start)
         return frame
 
-    def run(self):
+    def open_capture(self):
         """
-        Main tracking loop
+        Open the tracker's camera and apply the configured resolution and framerate.
+
+        Returns:
+            cv.VideoCapture: The opened capture device
         """
         frame_height: int = self.config["tracker"]["frame_height"]
         frame_width: int = self.config["tracker"]["frame_width"]
@@ -312,47 +603,227 @@ class HandTracker:
         cv.setUseOptimized(True)
         cv.setNumThreads(thread_count)
 
-        cap = cv.VideoCapture(0, cv.CAP_DSHOW)
+        # Camera indices use DirectShow, video stream URLs are opened as is
+        if isinstance(self.camera, int):
+            cap = cv.VideoCapture(self.camera, cv.CAP_DSHOW)
+        else:
+            cap = cv.VideoCapture(self.camera)
         cap.set(cv.CAP_PROP_FRAME_WIDTH, frame_width)
         cap.set(cv.CAP_PROP_FRAME_HEIGHT, frame_height)
 
         cap.set(cv.CAP_PROP_FPS, framerate)
+        return cap
 
+    def handle_key(self, key):
+        """
+        React to a key pressed in the tracking window.
 
-        try:
-            is_s_pressed = False
-            while cap.isOpened():
+        Args:
+            key (int): Key code returned by cv.waitKey
+
+        Returns:
+            bool: False if the tracker should stop, True otherwise
+        """
+        # Kill process if key is pressed
+        if key in [ord('q'), ord('Q')]:
+            return False
+        # Get the state and log it to db
+        elif key in [ord('s'), ord('S')]:
+            if not self.is_s_pressed:
+                self.request_state()
+                self.is_s_pressed = True
+        # Prevent the user from accidentally sending multiple requests
+        # To not accidentally DoS the device
+        elif key in [ord('s'), ord("S")]:
+            self.is_s_pressed = False
+        return True
+
+    def send_command(self, command):
+        """
+        Send a command to the Arduino, or to every configured Arduino, timing each reply.
+
+        Args:
+            command (str): The command, e.g. FLIPSTATE or GETSTATE
+        """
+        send_start = time.perf_counter()
+        self.client_handler.send_command(command)
+        self.record_stage("send", send_start)
+
+    def record_stage(self, stage, start):
+        """
+        Add the time since start to a stage of the current frame.
+
+        Args:
+            stage (str): Name of the stage
+            start (float): time.perf_counter() when the stage started
+        """
+        self.stage_times[stage] = self.stage_times.get(stage, 0.0) + time.perf_counter() - start
+
+    def stop(self):
+        """
+        Ask the tracking loop to stop. Safe to call from any thread or a signal handler.
+        """
+        self.stop_event.set()
+
+    def request_state(self):
+        """
+        Ask the tracking loop to query the Arduino's state and log it.
+        Safe to call from any thread or a signal handler.
+        """
+        self.state_requested.set()
+
+    def poll_controls(self):
+        """
+        Handle control requests made from other threads, on the thread running process_frame.
+        """
+        if self.state_requested.is_set():
+            self.state_requested.clear()
+            self.send_command("GETSTATE")
+
+    def install_signal_handlers(self):
+        """
+        Control the tracker through signals when there is no window to take key presses:
+        SIGINT/SIGTERM stop tracking, SIGUSR1 gets the state where the platform supports it.
+        """
+        signal.signal(signal.SIGINT, lambda signum, frame: self.stop())
+        signal.signal(signal.SIGTERM, lambda signum, frame: self.stop())
+        if hasattr(signal, "SIGUSR1"):
+            signal.signal(signal.SIGUSR1, lambda signum, frame: self.request_state())
+
+    def run_serial(self, cap):
+        """
+        Capture, process and display each frame one after the other on the calling thread.
+
+        Args:
+            cap: The opened capture device
+        """
+        while cap.isOpened() and not self.stop_event.is_set():
+            capture_start = time.perf_counter()
+            success, frame = cap.read()
+            if not success:
+                print("Ignoring empty camera frame.")
+                continue
+
+            processed_frame = self.process_frame(frame, time.perf_counter() - capture_start)
+            self.poll_controls()
+            if self.headless:
+                continue
+
+            cv.imshow(self.window_name, processed_frame)
+
+            key = cv.waitKey(1) & 0xFF
+            if not self.handle_key(key):
+                break
+
+    def run_pipelined(self, cap):
+        """
+        Run capture and inference on their own threads, connected to the display loop
+        by bounded queues that drop the oldest frame, so every stage works on the freshest frame.
+        The display stays on the calling thread, as OpenCV windows must be driven from it.
+        In headless mode there is no display, so inference runs on the calling thread instead.
+
+        Args:
+            cap: The opened capture device
+        """
+        raw_frames = FrameQueue(maxsize=1)
+        processed_frames = FrameQueue(maxsize=1)
+
+        def grab():
+            while cap.isOpened() and not self.stop_event.is_set():
+                capture_start = time.perf_counter()
                 success, frame = cap.read()
                 if not success:
                     print("Ignoring empty camera frame.")
                     continue
+                raw_frames.put((frame, time.perf_counter() - capture_start))
+            self.stop_event.set()
+
+        def infer():
+            while not self.stop_event.is_set():
+                captured = raw_frames.get(timeout=0.1)
+                if captured is not None:
+                    processed_frames.put(self.process_frame(*captured))
+                # Commands are sent from the inference thread, the only one touching the frame's stage times
+                self.poll_controls()
+
+        threads = [threading.Thread(target=grab, name="tracker-capture", daemon=True)]
+        if not self.headless:
+            threads.append(threading.Thread(target=infer, name="tracker-inference", daemon=True))
+        for thread in threads:
+            thread.start()
+
+        try:
+            while not self.stop_event.is_set():
+                if self.headless:
+                    captured = raw_frames.get(timeout=0.1)
+                    if captured is not None:
+                        self.process_frame(*captured)
+                    self.poll_controls()
+                    continue
 
-                processed_frame = self.process_frame(frame)
-                cv.imshow("Hand Tracking", processed_frame)
+                processed_frame = processed_frames.get(timeout=0.1)
+                if processed_frame is not None:
+                    cv.imshow(self.window_name, processed_frame)
 
                 key = cv.waitKey(1) & 0xFF
-
-                # Kill process if key is pressed
-                if key in [ord('q'), ord('Q')]:
+                if not self.handle_key(key):
                     break
-                # Get the state and log it to db
-                elif key in [ord('s'), ord('S')]:
-                    if not is_s_pressed:
-                        get_state(self.main.start_timer())
-                        is_s_pressed = True
-                # Prevent the user from accidentally sending multiple requests
-                # To not accidentally DoS the device
-                elif key in [ord('s'), ord("S")]:
-                    is_s_pressed = False
+        finally:
+            self.stop_event.set()
+            for thread in threads:
+                thread.join(timeout=1)
+            self.main.debug(f"Pipeline dropped {raw_frames.dropped} captured and "
+                            f"{processed_frames.dropped} processed frames.")
+
+    def track(self):
+        """
+        Capture and process frames from the tracker's camera until stopped
+        """
+        # Pipeline modes: SERIAL, PIPELINED
+        pipeline: str = self.config["tracker"].get("pipeline", "SERIAL")
+        if self.camera != 0:
+            self.window_name = f"Hand Tracking ({self.camera})"
+        cap = self.open_capture()
+
+        try:
+            if pipeline == "PIPELINED":
+                self.run_pipelined(cap)
+            else:
+                self.run_serial(cap)
+        finally:
+            cap.release()
+            if not self.headless:
+                cv.destroyAllWindows()
+            if self.motion_gate is not None:
+                gate_stats = self.motion_gate.get_stats()
+                self.main.get_logger().add_message(
+                    f"Motion gate skipped {gate_stats['skipped']} of "
+                    f"{gate_stats['skipped'] + gate_stats['processed']} frames.")
+            gesture_stats = self.gesture_state.get_stats()
+            self.main.get_logger().add_message(
+                f"Gesture state changed {gesture_stats['transitions']} times, "
+                f"{gesture_stats['rejected']} unconfirmed frames ignored.")
+
+    def run(self):
+        """
+        Main tracking loop.
+        When several cameras are configured, each one is tracked by a worker process
+        and this process only dispatches their commands to the Arduino.
+        """
+        cameras = self.config["tracker"].get("cameras") or [self.camera]
+        if self.headless:
+            self.install_signal_handlers()
+
+        try:
+            if len(cameras) > 1:
+                self.camera_pool = CameraPool(self, cameras)
+                self.camera_pool.run()
+            else:
+                self.camera = cameras[0]
+                self.track()
         finally:
             # Gracefully disconnect.
             if self.client_handler:
                 self.client_handler.disconnect()
-            cap.release()
-            cv.destroyAllWindows()
             logger = self.main.get_logger()
             logger.add_message("Disconnected Gracefully.")
-
-
-def get_state(timer_id):
-    send_message(f"{timer_id}:GETSTATE")
@@ -0,0 +1,141 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Histogram bucket upper bounds, in seconds
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class StageStats:
+    def __init__(self, window):
+        """
+        Timing counters, histogram and recent samples of one stage.
+        :param window: Number of recent samples kept for percentiles.
+        """
+        self.samples = deque(maxlen=window)
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.lock = threading.Lock()
+
+    def record(self, seconds):
+        """
+        Record one duration.
+        :param seconds: The duration in seconds.
+        """
+        index = 0
+        while index < len(BUCKETS) and seconds > BUCKETS[index]:
+            index += 1
+        with self.lock:
+            self.samples.append(seconds)
+            self.buckets[index] += 1
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def snapshot(self):
+        """
+        Get the stage's counters and the percentiles of its recent samples, in milliseconds.
+        :return: A dictionary describing the stage.
+        """
+        with self.lock:
+            samples = sorted(self.samples)
+            count, total, maximum = self.count, self.total, self.max
+            buckets = list(self.buckets)
+
+        def percentile(fraction):
+            if not samples:
+                return None
+            return samples[min(len(samples) - 1, int(fraction * len(samples)))] * 1000
+
+        return {
+            "count": count,
+            "mean_ms": total / count * 1000 if count else None,
+            "max_ms": maximum * 1000,
+            "p50_ms": percentile(0.50),
+            "p95_ms": percentile(0.95),
+            "p99_ms": percentile(0.99),
+            "buckets": buckets,
+            "total_seconds": total,
+        }
+
+
+class Instrumentation:
+    def __init__(self, window=1024):
+        """
+        Registry of per-stage timings, cheap enough to leave on in the hot path.
+        :param window: Number of recent samples kept per stage.
+        """
+        self.window = window
+        self.stages = {}
+        self.lock = threading.Lock()
+        self.started = time.time()
+
+    def record(self, stage, seconds):
+        """
+        Record how long a stage took.
+        :param stage: Name of the stage, e.g. tracker.hands_process.
+        :param seconds: The duration in seconds.
+        """
+        stats = self.stages.get(stage)
+        if stats is None:
+            with self.lock:
+                stats = self.stages.setdefault(stage, StageStats(self.window))
+        stats.record(seconds)
+
+    def reset(self):
+        """
+        Forget every stage's timings, e.g. between benchmark runs.
+        """
+        with self.lock:
+            self.stages = {}
+            self.started = time.time()
+
+    @contextmanager
+    def timed(self, stage):
+        """
+        Time the body of a with statement.
+        :param stage: Name of the stage.
+        """
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.record(stage, (time.perf_counter_ns() - start) / 1e9)
+
+    def snapshot(self):
+        """
+        Get every stage's timings.
+        :return: A dictionary ready to be served as JSON.
+        """
+        return {
+            "uptime_seconds": time.time() - self.started,
+            "bucket_bounds_seconds": list(BUCKETS),
+            "stages": {stage: stats.snapshot() for stage, stats in sorted(self.stages.items())},
+        }
+
+    def prometheus(self):
+        """
+        Get every stage's timings in the Prometheus text exposition format.
+        :return: The metrics as a string.
+        """
+        lines = [
+            "# HELP stage_duration_seconds Time spent in each instrumented stage.",
+            "# TYPE stage_duration_seconds histogram",
+        ]
+        for stage, stats in sorted(self.stages.items()):
+            snapshot = stats.snapshot()
+            cumulative = 0
+            for bound, count in zip(BUCKETS + ("+Inf",), snapshot["buckets"]):
+                cumulative += count
+                lines.append(f'stage_duration_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'stage_duration_seconds_sum{{stage="{stage}"}} {snapshot["total_seconds"]}')
+            lines.append(f'stage_duration_seconds_count{{stage="{stage}"}} {snapshot["count"]}')
+        return "\n".join(lines) + "\n"
+
+
+# Shared by every module, like the client_handler in wifi_handler
+stats = Instrumentation()
@@ -0,0 +1,93 @@
+import argparse
+import itertools
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+# POSTs look like the Arduino's replies. Their timer IDs don't exist, so they are logged without a time.
+POST_BODIES = itertools.cycle(["0:Pin 7 set to HIGH", "0:Pin 7 set to LOW"])
+
+
+def request_once(base_url, endpoint, timeout):
+    """
+    Send one request.
+    :param base_url: The server's URL, e.g. http://127.0.0.1:5000
+    :param endpoint: "GET /path" or "POST /path".
+    :param timeout: Seconds to wait for the response.
+    :return: The latency in seconds, and whether the request succeeded.
+    """
+    method, path = endpoint.split(" ", 1)
+    data = next(POST_BODIES).encode() if method == "POST" else None
+    request = urllib.request.Request(base_url.rstrip("/") + path, data=data, method=method)
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            success = response.status < 400
+    except (urllib.error.URLError, OSError):
+        success = False
+    return time.perf_counter() - start, success
+
+
+def run_load(base_url, endpoints, concurrency, duration, timeout):
+    """
+    Send requests from several threads for a while, cycling through the endpoints.
+    :return: A dictionary of endpoint to a list of (latency, success) tuples.
+    """
+    results = {endpoint: [] for endpoint in endpoints}
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def worker(offset):
+        for endpoint in itertools.islice(itertools.cycle(endpoints), offset, None):
+            if time.monotonic() >= deadline:
+                break
+            result = request_once(base_url, endpoint, timeout)
+            with lock:
+                results[endpoint].append(result)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for offset in range(concurrency):
+            executor.submit(worker, offset % len(endpoints))
+    return results
+
+
+def percentile(sorted_values, fraction):
+    """
+    Get a percentile of sorted values.
+    """
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def print_results(results, duration):
+    """
+    Print the throughput and latency percentiles of each endpoint.
+    """
+    print(f"{'endpoint':<16}{'requests':>10}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for endpoint, samples in results.items():
+        latencies = sorted(latency for latency, success in samples)
+        errors = sum(1 for latency, success in samples if not success)
+        print(f"{endpoint:<16}{len(samples):>10}{errors:>8}{len(samples) / duration:>10.1f}"
+              f"{percentile(latencies, 0.50) * 1000:>10.1f}{percentile(latencies, 0.95) * 1000:>10.1f}"
+              f"{percentile(latencies, 0.99) * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Load test the dashboard server. Run it against server.mode DEVELOPMENT and PRODUCTION to compare.")
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--endpoints", nargs="+", default=["GET /", "GET /metrics", "POST /"],
+                        help='Requests to cycle through, e.g. "GET /metrics"')
+    parser.add_argument("--concurrency", type=int, default=16, help="Number of concurrent clients")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to run for")
+    parser.add_argument("--timeout", type=float, default=10)
+    args = parser.parse_args()
+
+    print(f"Load testing {args.url} with {args.concurrency} clients for {args.duration:.0f}s...")
+    start = time.perf_counter()
+    results = run_load(args.url, args.endpoints, args.concurrency, args.duration, args.timeout)
+    print_results(results, time.perf_counter() - start)
@@ -1,3 +1,5 @@
+import atexit
+import threading
 import time
 import os
 
@@ -6,10 +8,25 @@ class Logger:
     def __init__(self, main):
         self.config = main.read_config()
         self.directory: str = self.config['logs']['directory']
+        # Lines are buffered and written by a background thread,
+        # every flush_interval seconds or once buffer_size lines are waiting.
+        self.flush_interval: float = self.config['logs'].get('flush_interval', 1.0)
+        self.buffer_size: int = self.config['logs'].get('buffer_size', 100)
+        # Log files are rotated daily, and when they grow past max_size bytes. 0 disables the size limit.
+        self.max_size: int = self.config['logs'].get('max_size', 10 * 1024 * 1024)
         self.log_file = self.get_log_file()
         self.ensure_log_directory()
         self.main = main
 
+        self.file = None
+        self.next_day = self.get_next_day()
+        self.buffer = []
+        self.condition = threading.Condition()
+        self.closing = False
+        self.writer_thread = threading.Thread(target=self.write_loop, name="logger-writer", daemon=True)
+        self.writer_thread.start()
+        atexit.register(self.close)
+
     def get_log_file(self):
         """
         Retrives the log file
@@ -18,6 +35,14 @@ class Logger:
         current_day = time.strftime('%d-%m-%Y', time.localtime())
         return os.path.join(self.directory, f"log_{current_day}.log")
 
+    def get_next_day(self):
+        """
+        Get the time at which the log file should next be rotated
+        :return: The next local midnight, as a timestamp
+        """
+        now = time.localtime()
+        return time.mktime((now.tm_year, now.tm_mon, now.tm_mday + 1, 0, 0, 0, 0, 0, -1))
+
     def ensure_log_directory(self):
         """
         Check if log file exists, if the log file doesn't exist, create it.
@@ -27,15 +52,81 @@ class Logger:
 
     def add_message(self, message, date_time=None):
         """
-        Adds a message to the log file.
+        Adds a message to the log file buffer. It is written by the writer thread.
         Will also print to console if debug is enabled.
         :param message: The message to added.
         :param date_time: The current date and time.
         """
         log_message = f"{date_time}: {message}"
-        current_log_file = self.get_log_file()
-        if self.log_file != current_log_file:
-            self.log_file = current_log_file
         self.main.debug(f"Adding to log file: {log_message}")
-        with open(self.log_file, 'a') as file:
-            file.write(f"{log_message}\n")
\ No newline at end of file
+        with self.condition:
+            self.buffer.append(f"{log_message}\n")
+            if len(self.buffer) >= self.buffer_size:
+                self.condition.notify()
+
+    def write_loop(self):
+        """
+        Writer thread loop. Writes the buffered lines through a persistent file handle.
+        """
+        running = True
+        while running:
+            with self.condition:
+                if not self.closing and len(self.buffer) < self.buffer_size:
+                    self.condition.wait(self.flush_interval)
+                lines, self.buffer = self.buffer, []
+                running = not self.closing
+            if lines:
+                self.write_lines(lines)
+        if self.file:
+            self.file.close()
+            self.file = None
+
+    def write_lines(self, lines):
+        """
+        Write lines to the current log file, rotating it first if needed.
+        :param lines: The lines to write.
+        """
+        try:
+            self.rotate_if_needed()
+            self.file.write("".join(lines))
+            self.file.flush()
+        except Exception as e:
+            print(f"Error writing to log file: {e}")
+
+    def rotate_if_needed(self):
+        """
+        Open the day's log file if the day changed or no file is open,
+        and move the current file aside if it grew past the size limit.
+        """
+        if self.file is None or time.time() >= self.next_day:
+            if self.file:
+                self.file.close()
+                self.file = None
+            self.log_file = self.get_log_file()
+            self.next_day = self.get_next_day()
+            self.file = open(self.log_file, 'a')
+
+        if self.max_size and self.file.tell() >= self.max_size:
+            self.file.close()
+            self.file = None
+            base, extension = os.path.splitext(self.log_file)
+            index = 1
+            while os.path.exists(f"{base}.{index}{extension}"):
+                index += 1
+            try:
+                os.replace(self.log_file, f"{base}.{index}{extension}")
+            except OSError as e:
+                # Keep writing to the same file, rotation is retried on the next write
+                print(f"Couldn't rotate log file {self.log_file}: {e}")
+            self.file = open(self.log_file, 'a')
+
+    def close(self):
+        """
+        Write the remaining buffered lines and close the log file.
+        """
+        if not self.writer_thread.is_alive():
+            return
+        with self.condition:
+            self.closing = True
+            self.condition.notify()
+        self.writer_thread.join()
@@ -1,15 +1,17 @@
 print("Starting...")
+import argparse
 import time
-import uuid
 
-from yaml import safe_load
 from dotenv import dotenv_values
-import thingspeak
 
 from hand_tracker import HandTracker
 from server import Server
 from logger import Logger
 from database import Database
+from config_loader import ConfigLoader
+from thingspeak_uploader import ThingSpeakUploader
+from timer_registry import TimerRegistry
+from event_bus import EventBus
 
 print("Imported classes")
 
@@ -30,10 +32,17 @@ class Main:
         2791860: dotenv_values(".env")["PERFORMANCE_KEY"]
     }
 
-    def __init__(self):
+    def __init__(self, headless=False):
         print("Initializing Main")
         global server, logger, database
-        self.timers = {}
+        self.headless = headless
+        self.config_loader = ConfigLoader("config.yml")
+        self.config_loader.watch(self.read_config().get("config_reload_interval", 0))
+        timers_config = self.read_config().get("timers", {})
+        self.timers = TimerRegistry(self, timers_config.get("ttl", 30), timers_config.get("sweep_interval", 5))
+        # Live feed of the messages for the dashboard
+        self.events = EventBus(self.read_config()["server"].get("event_history", 500))
+        self.thingspeak_uploader = ThingSpeakUploader(self, self.thingspeak_keys)
         logger = Logger(self)
         print("Logger initialized...")
         server = Server(self)
@@ -43,48 +52,37 @@ class Main:
 
     def read_config(self):
         """
-        Read the content of the config YAML file and return it as a variable
+        Get the content of the config YAML file, loaded once and kept in memory.
+        Doesn't touch the filesystem, edits are picked up by the config watcher.
         :return: The config's content.
         """
-        try:
-            with open("config.yml", "r") as config_file:
-                global config
-                config = safe_load(config_file)
-                return config
-        except Exception as e:
-            print("No config.yml file detected...")
+        global config
+        config = self.config_loader.get()
+        return config
 
-    def start_timer(self):
+    def start_timer(self, command=None):
         """
-        Starts a timer and generates a unique, non-duplicate timer ID.
-        :return: The unique timer ID
+        Starts a timer with a unique ID. Safe to call from any thread.
+        :param command: The command being timed, its round trip is recorded under its name.
+        :return: The unique timer ID, a short string
         """
-        while True:
-            # Generate a unique ID
-            timer_id = str(uuid.uuid4())
-            if timer_id not in self.timers:
-                break
-
-        # Start the timer
-        self.timers[timer_id] = time.time()
+        timer_id = self.timers.start(command)
         self.debug(f"Started timer with ID '{timer_id}'.")
         return timer_id
 
     def stop_timer(self, timer_id):
         """
-        Stops a timer with the given ID and returns the elapsed time.
-        :param timer_id: Unique ID for the timer
-        :return: Elapsed time in seconds, or None if the timer doesn't exist
+        Stops a timer with the given ID and returns the elapsed time. Safe to call from any thread.
+        :param timer_id: Unique ID for the timer, as sent back by the Arduino
+        :return: Elapsed time in seconds, or None if the timer doesn't exist or expired
         """
-        if timer_id not in self.timers:
+        elapsed_time = self.timers.stop(timer_id)
+        if elapsed_time is None:
             self.debug(f"No timer found with ID '{timer_id}'.")
             return None
-        else:
-            elapsed_time = time.time() - self.timers[timer_id]
-            del self.timers[timer_id]  # Remove the timer from the dictionary
-            self.debug(f"Stopped timer with ID '{timer_id}'. Elapsed time: {elapsed_time:.3f} seconds")
-            self.send_to_thingspeak(elapsed_time, 2791860)
-            return elapsed_time
+        self.debug(f"Stopped timer with ID '{timer_id}'. Elapsed time: {elapsed_time:.3f} seconds")
+        self.send_to_thingspeak(elapsed_time, 2791860)
+        return elapsed_time
 
     def run(self):
         """
@@ -99,8 +97,8 @@ class Main:
                     self,
                     max_hands=1,
                     detection_confidence=0.7,
-                    tracking_confidence=0.5
-
+                    tracking_confidence=0.5,
+                    headless=self.headless
                 )
             except Exception as e:
                 print(f"Error creating tracker: {e}")
@@ -113,6 +111,21 @@ class Main:
             tracker.run()
         except Exception as e:
             print(f"An error occurred during hand tracking: {e}")
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        """
+        Flush buffered work before the application exits.
+        """
+        self.timers.close()
+        self.thingspeak_uploader.close()
+        if server is not None:
+            server.close()
+        if database is not None:
+            database.close()
+        if logger is not None:
+            logger.close()
 
     def get_tracker(self):
         """
@@ -138,6 +151,14 @@ class Main:
         """
         return logger
 
+    def get_events(self):
+        """
+        Get the live feed of the messages
+
+        :return: EventBus
+        """
+        return self.events
+
     def get_config(self):
         """
         Get the variable storing the config]
@@ -170,7 +191,11 @@ class Main:
         if self.read_config()["logs"]["log_to_logger"]:
             logger.add_message(message, date_time)
         if self.read_config()["logs"]["log_to_database"]:
+            # Published to the live feed by the database writer, once committed
             database.save_to_db(message, timer_id, time_elapsed, date_time)
+        else:
+            self.events.publish({"timestamp": date_time, "message": message, "timer_id": timer_id,
+                                 "time": time_elapsed})
         if self.read_config()["logs"]["log_to_thingspeak"]:
             state = None
             if("HIGH" in message):
@@ -195,17 +220,12 @@ class Main:
 
     def send_to_thingspeak(self, message, channel_id):
         """
-
+        Queue a message for the background ThingSpeak uploader. Never blocks on the network.
         :param message: the message to send to ThingSpeak
         :param channel_id: The ThingSpeak channelID
         """
-        channel = thingspeak.Channel(id=channel_id, api_key=self.thingspeak_keys[channel_id])
         if message is not None and self.read_config()["logs"]["log_to_thingspeak"]:
-            try:
-                channel.update({'field1': message})
-                self.debug("Updated successfully: ")
-            except Exception as e:
-                self.add_message(f"[ERROR] {e}")
+            self.thingspeak_uploader.send(channel_id, message)
 
     def debug(self, message):
         """
@@ -217,5 +237,16 @@ class Main:
 
 
 if __name__ == "__main__":
-    main = Main()
-    main.run()
+    parser = argparse.ArgumentParser(description="Hand tracking light controller")
+    parser.add_argument("--headless", action="store_true",
+                        help="Run without a window or drawing. Control the tracker through signals or the server.")
+    parser.add_argument("--rebuild-rollup", action="store_true",
+                        help="Recompute the daily rollup used by /metrics from every saved log, then exit.")
+    args = parser.parse_args()
+
+    main = Main(headless=args.headless)
+    if args.rebuild_rollup:
+        main.get_database().rebuild_rollup()
+        main.shutdown()
+    else:
+        main.run()
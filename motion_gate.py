@@ -0,0 +1,81 @@
+import cv2 as cv
+import numpy as np
+
+
+class MotionGate:
+    def __init__(self, gate_config):
+        """
+        Cheap motion pre-filter deciding whether a frame is worth running hand detection on.
+        Compares a small, blurred greyscale copy of each frame with the previous one.
+        :param gate_config: The tracker.motion_gate config section.
+        """
+        # Width of the frame motion is detected on, its height keeps the aspect ratio
+        self.width: int = gate_config.get("width", 64)
+        # Brightness change (0-255) for a pixel to count as changed
+        self.pixel_threshold: int = gate_config.get("pixel_threshold", 25)
+        # Fraction of changed pixels that counts as motion
+        self.motion_threshold: float = gate_config.get("motion_threshold", 0.01)
+        # Frames detection keeps running for after motion stops
+        self.hold_frames: int = gate_config.get("hold_frames", 15)
+        # Detection runs at least every max_skip frames anyway, 0 disables it
+        self.max_skip: int = gate_config.get("max_skip", 30)
+
+        self.previous = None
+        self.hold = 0
+        self.skipped_in_row = 0
+        self.processed = 0
+        self.skipped = 0
+
+    def detect_motion(self, frame):
+        """
+        Check whether the frame changed noticeably since the previous one.
+        :param frame: BGR video frame
+        :return: True if there is motion, False otherwise.
+        """
+        height, width = frame.shape[:2]
+        small = cv.resize(frame, (self.width, max(1, self.width * height // width)), interpolation=cv.INTER_AREA)
+        grey = cv.GaussianBlur(cv.cvtColor(small, cv.COLOR_BGR2GRAY), (5, 5), 0)
+
+        previous, self.previous = self.previous, grey
+        if previous is None:
+            return True
+        changed = np.count_nonzero(cv.absdiff(grey, previous) > self.pixel_threshold)
+        return changed >= self.motion_threshold * grey.size
+
+    def should_process(self, frame, hand_present=False):
+        """
+        Decide whether to run hand detection on a frame.
+        Detection always runs while a hand is tracked, and for hold_frames after the last motion.
+        :param frame: BGR video frame
+        :param hand_present: Whether a hand was found in the last processed frame.
+        :return: True to run detection, False to skip the frame.
+        """
+        if self.detect_motion(frame):
+            self.hold = self.hold_frames
+            active = True
+        elif self.hold > 0:
+            self.hold -= 1
+            active = True
+        else:
+            active = False
+
+        if hand_present or active or (self.max_skip and self.skipped_in_row >= self.max_skip):
+            self.skipped_in_row = 0
+            self.processed += 1
+            return True
+
+        self.skipped_in_row += 1
+        self.skipped += 1
+        return False
+
+    def get_stats(self):
+        """
+        Get how many frames were processed and skipped.
+        :return: A dictionary of the counters and the fraction of skipped frames.
+        """
+        total = self.processed + self.skipped
+        return {
+            "processed": self.processed,
+            "skipped": self.skipped,
+            "skipped_ratio": self.skipped / total if total else 0.0,
+        }
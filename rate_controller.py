@@ -0,0 +1,129 @@
+import threading
+
+
+class AdaptiveRateController:
+    def __init__(self, main, adaptive_config, inference_scale):
+        """
+        Adjusts the inference scale and how many frames are processed to hold a target latency.
+        When frames take too long, the inference scale is lowered first, then frames are skipped.
+        When there is headroom, frames stop being skipped first, then the scale is raised back.
+        :param main: The Main instance.
+        :param adaptive_config: The tracker.adaptive config section.
+        :param inference_scale: The configured inference scale, the highest the controller will use.
+        """
+        self.main = main
+        # Target time to detect, decide and send for one frame, in milliseconds
+        self.target_latency: float = adaptive_config.get("target_latency", 50)
+        # Fraction above or below the target before adjusting
+        self.tolerance: float = adaptive_config.get("tolerance", 0.2)
+        self.min_scale: float = adaptive_config.get("min_scale", 0.25)
+        self.max_scale: float = inference_scale
+        self.scale_step: float = adaptive_config.get("scale_step", 0.05)
+        # Process one frame in max_skip at most
+        self.max_skip: int = adaptive_config.get("max_skip", 4)
+        # Frames between adjustments, so each change can take effect before the next
+        self.adjust_interval: int = adaptive_config.get("adjust_interval", 30)
+        # Weight of the latest frame in the latency moving average
+        self.smoothing: float = adaptive_config.get("smoothing", 0.1)
+
+        self.scale = inference_scale
+        self.skip = 1
+        self.latency = None
+        self.stage_latency = {}
+        self.frames = 0
+        self.frames_since_adjust = 0
+        self.reason = "Starting up"
+        self.lock = threading.Lock()
+
+    def should_process(self):
+        """
+        Decide whether to process the next frame, one in every `skip` frames.
+        :return: True to process the frame, False to drop it.
+        """
+        self.frames += 1
+        return self.frames % self.skip == 0
+
+    def record_frame(self, stage_times):
+        """
+        Record the time each stage took for a processed frame, and adjust if needed.
+        :param stage_times: Dictionary of stage name to seconds.
+        """
+        # Capture time is reported but not controlled, it is mostly spent waiting for the camera's next frame
+        latency = sum(seconds for stage, seconds in stage_times.items() if stage != "capture") * 1000
+        with self.lock:
+            self.latency = latency if self.latency is None else \
+                self.latency + self.smoothing * (latency - self.latency)
+            for stage, seconds in stage_times.items():
+                previous = self.stage_latency.get(stage)
+                milliseconds = seconds * 1000
+                self.stage_latency[stage] = milliseconds if previous is None else \
+                    previous + self.smoothing * (milliseconds - previous)
+
+            self.frames_since_adjust += 1
+            if self.frames_since_adjust >= self.adjust_interval:
+                self.frames_since_adjust = 0
+                self.adjust()
+
+    def adjust(self):
+        """
+        Change the scale or the frame skip by one step towards the target latency.
+        """
+        upper = self.target_latency * (1 + self.tolerance)
+        lower = self.target_latency * (1 - self.tolerance)
+
+        if self.latency > upper:
+            if self.scale - self.scale_step >= self.min_scale:
+                self.set_scale(self.scale - self.scale_step, f"latency {self.latency:.1f}ms above {upper:.1f}ms")
+            elif self.skip < self.max_skip:
+                self.set_skip(self.skip + 1, f"latency {self.latency:.1f}ms above {upper:.1f}ms at minimum scale")
+        elif self.latency < lower:
+            if self.skip > 1:
+                self.set_skip(self.skip - 1, f"latency {self.latency:.1f}ms below {lower:.1f}ms")
+            elif self.scale < self.max_scale:
+                self.set_scale(min(self.max_scale, self.scale + self.scale_step),
+                               f"latency {self.latency:.1f}ms below {lower:.1f}ms")
+
+    def set_scale(self, scale, reason):
+        """
+        Change the inference scale and log why.
+        :param scale: The new scale.
+        :param reason: Why it changed.
+        """
+        self.reason = f"Inference scale {self.scale:.2f} -> {scale:.2f}: {reason}"
+        self.scale = scale
+        self.log(self.reason)
+
+    def set_skip(self, skip, reason):
+        """
+        Change how many frames are skipped and log why.
+        :param skip: Process one frame in this many.
+        :param reason: Why it changed.
+        """
+        self.reason = f"Processing 1 in {self.skip} -> 1 in {skip} frames: {reason}"
+        self.skip = skip
+        self.log(self.reason)
+
+    def log(self, message):
+        """
+        Log an adjustment.
+        :param message: The message
+        """
+        self.main.debug(f"Adaptive rate: {message}")
+        logger = self.main.get_logger()
+        if logger is not None:
+            logger.add_message(f"Adaptive rate: {message}", self.main.get_current_time())
+
+    def get_status(self):
+        """
+        Get the controller's current settings and measurements.
+        :return: A dictionary describing the controller.
+        """
+        with self.lock:
+            return {
+                "target_latency_ms": self.target_latency,
+                "latency_ms": self.latency,
+                "stage_latency_ms": dict(self.stage_latency),
+                "inference_scale": self.scale,
+                "process_one_in": self.skip,
+                "reason": self.reason,
+            }
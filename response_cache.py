@@ -0,0 +1,104 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+class ResponseCache:
+    def __init__(self, max_entries=128):
+        """
+        LRU cache of rendered pages, keyed by route and date.
+        Entries expire after their TTL, or never for days that are over, and are invalidated
+        whenever rows are written for their date.
+        :param max_entries: Pages kept at most, the least recently used are evicted first.
+        """
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        # Bumped on every invalidation of a date, so a page rendered while rows were being
+        # written for its date isn't cached
+        self.generations = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """
+        Get a cached page.
+        :param key: The page's key, e.g. ("date", "2024-11-01").
+        :return: A dictionary with the page's 'body' and 'etag', or None if it isn't cached or expired.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry["expires"] is not None and entry["expires"] <= time.monotonic():
+                del self.entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def generation(self, date):
+        """
+        Get the invalidation generation of a date, to pass to put() once the page is rendered.
+        :param date: The date in yyyy-mm-dd format.
+        """
+        with self.lock:
+            return self.generations.get(date, 0)
+
+    def put(self, key, body, date, ttl=None, generation=None):
+        """
+        Cache a page.
+        :param key: The page's key.
+        :param body: The rendered page.
+        :param date: The date the page shows, in yyyy-mm-dd format.
+        :param ttl: Seconds the page stays cached, None to keep it until it is invalidated or evicted.
+        :param generation: The date's generation from before the page was rendered. The page isn't
+                           cached if the date was invalidated since.
+        :return: A dictionary with the page's 'body' and 'etag'.
+        """
+        entry = {
+            "body": body,
+            "etag": hashlib.sha1(body.encode()).hexdigest(),
+            "date": date,
+            "expires": time.monotonic() + ttl if ttl is not None else None,
+        }
+        with self.lock:
+            if generation is not None and generation != self.generations.get(date, 0):
+                return entry
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+        return entry
+
+    def invalidate_dates(self, dates):
+        """
+        Remove the cached pages of dates that just had rows written.
+        :param dates: Iterable of dates in yyyy-mm-dd format.
+        """
+        dates = set(dates)
+        with self.lock:
+            for date in dates:
+                self.generations[date] = self.generations.get(date, 0) + 1
+            for key in [key for key, entry in self.entries.items() if entry["date"] in dates]:
+                del self.entries[key]
+                self.invalidations += 1
+
+    def get_stats(self):
+        """
+        Get the cache's counters.
+        :return: A dictionary of the counters and the number of cached pages.
+        """
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
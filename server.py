@@ -1,11 +1,15 @@
-from datetime import datetime
-import sqlite3
+from datetime import datetime, timedelta
+import hmac
+import json
 
-from flask import Flask, render_template_string, request, render_template
+from flask import Flask, render_template_string, request, render_template, jsonify, g, Response, stream_with_context
 import threading
 import time
 
 from logger import Logger
+from database import bucket_upper_bound, ReadConnectionPool
+from instrumentation import stats
+from response_cache import ResponseCache
 
 class Server:
     def __init__(self, main):
@@ -15,31 +19,114 @@ class Server:
         self.database = main.get_database()
         self.config = main.get_config()
         self.main = main
+        # Queries reuse one read-only connection per server thread
+        self.read_pool = ReadConnectionPool(self.config["database"]["path"],
+                                            self.config["database"].get("cached_statements", 128))
+        # Rendered /metrics and /date pages, invalidated by the database writer
+        cache_config = self.config["server"].get("cache", {})
+        self.cache = ResponseCache(cache_config.get("max_entries", 128))
+        # /events and /events/poll hold a server thread each while open, so they are capped
+        # to leave threads for the other routes
+        self.event_streams = 0
+        self.event_streams_lock = threading.Lock()
 
     def _add_routes(self):
         """
         Add the routes to the web server.
         :return: The HTML page to serve.
         """
+        @self.app.before_request
+        def start_request_timer():
+            g.request_start = time.perf_counter()
+
+        @self.app.after_request
+        def record_request_time(response):
+            if "request_start" in g:
+                stats.record(f"http.{request.method}.{request.endpoint}", time.perf_counter() - g.request_start)
+            return response
+
         @self.app.route('/')
         def index():
             current_time = time.strftime('%H:%M:%S', time.localtime())
             current_date = time.strftime('%Y-%m-%d', time.localtime())
 
-            # Fetch all messages for the current day
-            daily_messages = self.get_messages_for_day(current_date)
-            daily_messages.sort(reverse=True)
+            # Saved messages are published once committed, so every event up to this ID is in the logs
+            # read below. Read before them, messages saved in between are streamed twice at worst.
+            last_event_id = self.main.events.last_id
+            # Only the newest page is rendered, the page fetches older ones from /api/logs
+            start, end = self.get_day_range(current_date)
+            logs, next_cursor = self.get_logs(start, end, self.get_page_size())
+
+            return render_template("index.html", time=current_time, messages=self.format_messages(logs),
+                                   start=start, end=end, next_cursor=next_cursor, last_event_id=last_event_id)
+
+        @self.app.route('/events')
+        def events():
+            # Browsers send the last event they received when they reconnect
+            last_id = self.get_last_event_id(request.headers.get("Last-Event-ID") or request.args.get("since"))
+            keepalive = self.config["server"].get("event_keepalive", 15)
+            lifetime = self.config["server"].get("event_stream_lifetime", 300)
+            if not self.acquire_event_stream():
+                return "Too many live connections", 503
 
-            return render_template("index.html", time=current_time, messages=daily_messages)
+            def stream(last_id):
+                yield f"retry: {int(keepalive * 1000)}\n\n"
+                for event_id, data in self.main.events.get_since(last_id):
+                    last_id = event_id
+                    yield self.format_event(event_id, data)
+                # Closed after its lifetime, so the thread is given back and EventSource
+                # reconnects, picking up from the last event it received
+                deadline = time.monotonic() + lifetime
+                while True:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    new_events = self.main.events.wait(last_id, min(keepalive, remaining))
+                    if not new_events:
+                        # Keeps proxies from closing an idle connection
+                        yield ": keepalive\n\n"
+                    for event_id, data in new_events:
+                        last_id = event_id
+                        yield self.format_event(event_id, data)
+
+            response = Response(stream(last_id), mimetype="text/event-stream",
+                                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+            # Called by the WSGI server when the stream ends or the client disconnects
+            response.call_on_close(self.release_event_stream)
+            return response
+
+        @self.app.route('/events/poll')
+        def events_poll():
+            # Long polling, for clients that can't use /events
+            last_id = self.get_last_event_id(request.args.get("since"))
+            timeout = min(request.args.get("timeout", 25, type=float), 60)
+            if not self.acquire_event_stream():
+                return "Too many live connections", 503
+            try:
+                new_events = self.main.events.get_since(last_id) or self.main.events.wait(last_id, timeout)
+            finally:
+                self.release_event_stream()
+            return jsonify({
+                "events": [dict(data, id=event_id) for event_id, data in new_events],
+                "last_id": new_events[-1][0] if new_events else last_id,
+            })
 
         @self.app.route('/metrics')
         def metrics():
-            daily_data = self.get_daily_string_counts() or []
-            today_performance = self.get_performance_data(self.main.get_current_date()) or []
-            high_low_data = self.get_high_low_data(self.main.get_current_date())
+            today = self.main.get_current_date()
+
+            def render():
+                daily_data = self.get_daily_string_counts() or []
+                today_performance = self.get_performance_data(today) or []
+                today_summary = self.get_daily_summary(today)
+                high_low_data = self.get_high_low_data(today)
 
-            self.main.debug(f"High/Low Data: {high_low_data}")
-            return render_template("metrics.html", daily_data=daily_data, today_performance=today_performance, high_low_data=high_low_data)
+                self.main.debug(f"High/Low Data: {high_low_data}")
+                return render_template("metrics.html", daily_data=daily_data, today_performance=today_performance,
+                                       today_summary=today_summary, high_low_data=high_low_data)
+
+            # Every day but today is read from the rollup, so only today's rows change the page
+            return self.cached_response(("metrics", today), today, render)
 
         @self.app.route("/date=<date>", methods=['GET'])
         def handle_get(date):
@@ -48,13 +135,50 @@ class Server:
             except ValueError as e:
                 return "Invalid date format", 404
 
-            logs = self.get_messages_for_day(date)
+            def render():
+                start, end = self.get_day_range(date)
+                logs, next_cursor = self.get_logs(start, end, self.get_page_size())
+                if not logs:
+                    return None
+
+                current_time = time.strftime('%H:%M:%S', time.localtime())
+                return render_template("index.html", time=current_time, messages=self.format_messages(logs),
+                                       date=date, start=start, end=end, next_cursor=next_cursor)
 
-            if not logs:
+            response = self.cached_response(("date", date), date, render)
+            if response is None:
                 return "No logs found for this date", 404
+            return response
 
-            current_time = time.strftime('%H:%M:%S', time.localtime())
-            return render_template("index.html", time=current_time, messages=logs, date=date)
+        @self.app.route('/api/logs')
+        def api_logs():
+            try:
+                start, end = self.get_range_args()
+                cursor = self.parse_cursor(request.args.get("cursor"))
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            order = "asc" if request.args.get("order", "desc").lower() == "asc" else "desc"
+            limit = self.get_page_size(request.args.get("limit", type=int))
+
+            logs, next_cursor = self.get_logs(start, end, limit, cursor, order)
+            return jsonify({"logs": logs, "next_cursor": next_cursor})
+
+        @self.app.route('/api/logs/export')
+        def api_logs_export():
+            try:
+                start, end = self.get_range_args()
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            order = "asc" if request.args.get("order", "asc").lower() == "asc" else "desc"
+
+            # Newline delimited JSON, one log per line, or a single JSON array
+            if request.args.get("format") == "ndjson":
+                chunks = (json.dumps(log) + "\n" for log in self.iter_logs(start, end, order))
+                mimetype = "application/x-ndjson"
+            else:
+                chunks = self.iter_json_array(self.iter_logs(start, end, order))
+                mimetype = "application/json"
+            return Response(stream_with_context(chunks), mimetype=mimetype)
 
         @self.app.route('/', methods=['POST'])
         def handle_post():
@@ -69,60 +193,430 @@ class Server:
                 return "Data received successfully", 200
             return "Bad Request", 400
 
-    def get_messages_for_day(self, date):
+        @self.app.route('/devices')
+        def devices():
+            tracker = self.main.get_tracker()
+            if tracker is None or not hasattr(tracker.client_handler, "get_status"):
+                return jsonify([])
+            return jsonify(tracker.client_handler.get_status())
+
+        @self.app.route('/stats')
+        def stats_json():
+            snapshot = dict(stats.snapshot(), timers=self.main.timers.get_stats(), cache=self.cache.get_stats())
+            pool = self.get_camera_pool()
+            if pool is not None:
+                # Tracker stages are timed in the camera workers, not in this process
+                snapshot["cameras"] = {camera: worker["stats"] for camera, worker in pool.get_stats().items()}
+            return jsonify(snapshot)
+
+        @self.app.route('/stats/prometheus')
+        def stats_prometheus():
+            return Response(stats.prometheus(), mimetype="text/plain; version=0.0.4")
+
+        @self.app.route('/tracker/rate')
+        def tracker_rate():
+            pool = self.get_camera_pool()
+            if pool is not None:
+                # Each camera worker runs its own controller
+                cameras = {camera: worker["rate"] for camera, worker in pool.get_stats().items()}
+                return jsonify({"enabled": any(rate is not None for rate in cameras.values()), "cameras": cameras})
+            tracker = self.main.get_tracker()
+            if tracker is None or tracker.rate_controller is None:
+                return jsonify({"enabled": False})
+            return jsonify(dict(tracker.rate_controller.get_status(), enabled=True))
+
+        @self.app.route('/control/quit', methods=['POST'])
+        def control_quit():
+            if not self.is_control_allowed():
+                return "Forbidden", 403
+            tracker = self.main.get_tracker()
+            if tracker is None:
+                return "Tracker not running", 503
+            tracker.stop()
+            return "Stopping tracker", 200
+
+        @self.app.route('/control/state', methods=['POST'])
+        def control_state():
+            if not self.is_control_allowed():
+                return "Forbidden", 403
+            tracker = self.main.get_tracker()
+            if tracker is None:
+                return "Tracker not running", 503
+            tracker.request_state()
+            return "State requested", 200
+
+    def get_camera_pool(self):
         """
-        Fetches messages for a specific day from the SQLite database.
+        Get the tracker's camera pool, when several cameras are tracked by worker processes.
 
-        :param date: The date in yyyy-mm-dd format.
-        :return: A list of messages for the day.
+        :return: The CameraPool, or None with a single camera or no tracker.
+        """
+        tracker = self.main.get_tracker()
+        return getattr(tracker, "camera_pool", None) if tracker is not None else None
+
+    def is_control_allowed(self):
+        """
+        Check whether the current request may control the tracker.
+        Requests from this machine always may, others only with the configured server.control_token,
+        sent in the X-Control-Token header.
+
+        :return: True if the request is allowed, False otherwise.
+        """
+        if request.remote_addr in ("127.0.0.1", "::1"):
+            return True
+        token = self.config["server"].get("control_token")
+        if not token:
+            return False
+        return hmac.compare_digest(request.headers.get("X-Control-Token", ""), str(token))
+
+    def get_logs(self, start=None, end=None, limit=100, cursor=None, order="desc"):
+        """
+        Fetches one page of logs, ordered by timestamp then id, with keyset pagination.
+        The pages are read straight from the timestamp index, however deep they are.
+
+        :param start: Earliest timestamp to include, None for no limit.
+        :param end: Timestamp to stop before, None for no limit.
+        :param limit: Number of logs per page.
+        :param cursor: (timestamp, id) of the last log of the previous page, None for the first page.
+        :param order: "desc" for newest first, "asc" for oldest first.
+        :return: A list of log dictionaries, and the cursor of the next page or None if this is the last one.
+        """
+        query, params = self.build_logs_query(start, end, cursor, order)
+        results = self.execute_query(query + " LIMIT ?", params + [limit + 1])
+
+        logs = [self.row_to_log(row) for row in results[:limit]]
+        next_cursor = None
+        if len(results) > limit:
+            next_cursor = f"{logs[-1]['timestamp']}|{logs[-1]['id']}"
+        return logs, next_cursor
+
+    def iter_logs(self, start=None, end=None, order="asc", chunk_size=500):
+        """
+        Iterates over every log in a range without loading them all in memory, for exports.
+
+        :param start: Earliest timestamp to include, None for no limit.
+        :param end: Timestamp to stop before, None for no limit.
+        :param order: "asc" for oldest first, "desc" for newest first.
+        :param chunk_size: Number of rows fetched from the database at once.
+        :return: A generator of log dictionaries, raising the database's error if the export fails.
+        """
+        query, params = self.build_logs_query(start, end, None, order)
+        # Its own cursor on the thread's connection, closed even if the client disconnects mid-export
+        cursor = None
+        failed = False
+        try:
+            cursor = self.read_pool.get().execute(query, params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield self.row_to_log(row)
+        except Exception as e:
+            print(f"Error exporting logs: {e}")
+            failed = True
+            # Abort the response mid-stream, an export cut short must not look complete to the client
+            raise
+        finally:
+            if cursor is not None:
+                cursor.close()
+            # Only once the cursor is closed, closing the connection first would hide the error
+            if failed:
+                self.read_pool.discard()
+
+    def build_logs_query(self, start, end, cursor, order):
+        """
+        Build the query of a range of logs.
+
+        :param start: Earliest timestamp to include, None for no limit.
+        :param end: Timestamp to stop before, None for no limit.
+        :param cursor: (timestamp, id) to continue after, None to start from the beginning of the range.
+        :param order: "asc" or "desc".
+        :return: The query and its parameters.
+        """
+        conditions, params = [], []
+        if start is not None:
+            conditions.append("timestamp >= ?")
+            params.append(start)
+        if end is not None:
+            conditions.append("timestamp < ?")
+            params.append(end)
+        if cursor is not None:
+            conditions.append("(timestamp, id) > (?, ?)" if order == "asc" else "(timestamp, id) < (?, ?)")
+            params.extend(cursor)
+
+        direction = "ASC" if order == "asc" else "DESC"
+        query = "SELECT id, timestamp, string, timer_id, time FROM light_logs"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += f" ORDER BY timestamp {direction}, id {direction}"
+        return query, params
+
+    @staticmethod
+    def row_to_log(row):
+        """
+        Convert a light_logs row to a dictionary.
+
+        :param row: (id, timestamp, string, timer_id, time)
+        :return: A dictionary ready to be served as JSON.
+        """
+        return {"id": row[0], "timestamp": row[1], "message": row[2], "timer_id": row[3], "time": row[4]}
+
+    @staticmethod
+    def format_messages(logs):
+        """
+        Format logs the way the index page shows them.
+
+        :param logs: A list of log dictionaries.
+        :return: A list of 'timestamp: message' strings.
+        """
+        return [f"{log['timestamp']}: {log['message']}" for log in logs]
+
+    def acquire_event_stream(self):
+        """
+        Count a new /events or /events/poll connection, unless server.max_event_streams are already open.
+
+        :return: True if the connection may be served, it must then be released with release_event_stream.
+        """
+        with self.event_streams_lock:
+            if self.event_streams >= self.config["server"].get("max_event_streams", 4):
+                return False
+            self.event_streams += 1
+            return True
+
+    def release_event_stream(self):
+        """
+        Count a /events or /events/poll connection as closed.
+        """
+        with self.event_streams_lock:
+            self.event_streams -= 1
+
+    @staticmethod
+    def iter_json_array(items):
+        """
+        Stream items as one JSON array, a chunk per item.
+
+        :param items: An iterable of JSON serializable items.
+        :return: A generator of string chunks.
+        """
+        yield "["
+        for index, item in enumerate(items):
+            yield ("," if index else "") + json.dumps(item)
+        yield "]"
+
+    def cached_response(self, key, date, render):
+        """
+        Serve a page from the cache, rendering and caching it on a miss.
+        Days that are over are cached until evicted, today and later days for server.cache.today_ttl seconds.
+        Clients sending the page's ETag in If-None-Match get an empty 304 response.
+
+        :param key: The page's cache key.
+        :param date: The date the page shows, in yyyy-mm-dd format.
+        :param render: Function rendering the page, returning None if there is nothing to show.
+        :return: The response, or None if render returned None.
+        """
+        closed_day = date < self.main.get_current_date()
+        entry = self.cache.get(key)
+        if entry is None:
+            generation = self.cache.generation(date)
+            body = render()
+            if body is None:
+                return None
+            ttl = None if closed_day else self.config["server"].get("cache", {}).get("today_ttl", 5)
+            entry = self.cache.put(key, body, date, ttl, generation)
+
+        response = Response(entry["body"], mimetype="text/html")
+        response.set_etag(entry["etag"])
+        # Browsers must check with the server before reusing a page that can still change
+        response.headers["Cache-Control"] = "public, max-age=86400" if closed_day else "no-cache"
+        return response.make_conditional(request)
+
+    def get_last_event_id(self, value):
+        """
+        Parse the ID of the last event a client received.
+
+        :param value: The ID as a string, or None for a new client.
+        :return: The ID, 0 to send every buffered event.
+        """
+        try:
+            last_id = int(value)
+        except (TypeError, ValueError):
+            return 0
+        # IDs start over when the application restarts
+        if last_id > self.main.events.last_id:
+            return 0
+        return last_id
+
+    @staticmethod
+    def format_event(event_id, data):
+        """
+        Format an event for a Server-Sent Events stream.
+
+        :param event_id: The event's ID, sent back by the browser when it reconnects.
+        :param data: JSON serializable event data.
+        :return: The event as a string.
+        """
+        return f"id: {event_id}\nevent: message\ndata: {json.dumps(data)}\n\n"
+
+    def get_page_size(self, limit=None):
+        """
+        Get the number of logs per page, clamped to the configured maximum.
+
+        :param limit: The requested number, None for the default.
+        :return: The page size.
+        """
+        server_config = self.config["server"]
+        if limit is None or limit < 1:
+            limit = server_config.get("page_size", 100)
+        return min(limit, server_config.get("max_page_size", 1000))
+
+    def get_range_args(self):
+        """
+        Get the timestamp range of an API request, from its 'date', or its 'start' and 'end' arguments.
+        Each can be a date, yyyy-mm-dd, or a timestamp, yyyy-mm-dd HH:mm:ss. 'end' is exclusive.
+
+        :return: The start and end timestamps, None where there is no limit.
+        :raises ValueError: If a date or timestamp is malformed.
+        """
+        date = request.args.get("date")
+        if date is not None:
+            self.parse_timestamp(date)
+            return self.get_day_range(date)
+        start = request.args.get("start")
+        end = request.args.get("end")
+        for value in (start, end):
+            if value is not None:
+                self.parse_timestamp(value)
+        return start, end
+
+    @staticmethod
+    def parse_timestamp(value):
+        """
+        Check a date or timestamp argument.
+
+        :param value: yyyy-mm-dd or yyyy-mm-dd HH:mm:ss.
+        :raises ValueError: If the value is neither.
+        """
+        for date_format in ("%Y-%m-%d", "%Y-%m-%d %H:%M:%S"):
+            try:
+                return datetime.strptime(value, date_format)
+            except ValueError:
+                continue
+        raise ValueError(f"Invalid date '{value}', expected yyyy-mm-dd or yyyy-mm-dd HH:mm:ss")
+
+    @staticmethod
+    def parse_cursor(cursor):
         """
-        query = "SELECT timestamp, string FROM light_logs WHERE timestamp LIKE ?"
-        date_pattern = f"{date}%"
-        results = self.execute_query(query, (date_pattern,))
-        return [f"{row[0]}: {row[1]}" for row in results]
+        Parse a cursor returned by a previous page.
+
+        :param cursor: 'timestamp|id', or None for the first page.
+        :return: (timestamp, id), or None for the first page.
+        :raises ValueError: If the cursor is malformed.
+        """
+        if not cursor:
+            return None
+        timestamp, _, log_id = cursor.rpartition("|")
+        try:
+            return timestamp, int(log_id)
+        except ValueError:
+            raise ValueError(f"Invalid cursor '{cursor}'")
 
     def get_daily_string_counts(self):
         """
-        Fetches the count of strings for each day from the SQLite database.
+        Fetches the count of strings for each day from the daily rollup.
 
-        :return: A list of dictionaries with 'date' and 'count'.
+        :return: A list of dictionaries with 'date', 'count', 'high' and 'low'.
         """
         query = """
-        SELECT DATE(timestamp) as date, COUNT(*) as count
-        FROM light_logs
-        GROUP BY DATE(timestamp)
-        ORDER BY DATE(timestamp) ASC
+        SELECT date, count, high_count, low_count
+        FROM daily_rollup
+        ORDER BY date ASC
         """
         results = self.execute_query(query)
-        return [{"date": row[0], "count": row[1]} for row in results]
+        return [{"date": row[0], "count": row[1], "high": row[2], "low": row[3]} for row in results]
+
+    def get_daily_summary(self, date):
+        """
+        Fetches a day's counts and min/avg/p95 performance from the daily rollup.
+        The p95 is read from the latency histogram, so it is accurate to within 5%.
+
+        :param date: The date in yyyy-mm-dd format.
+        :return: A dictionary of the day's summary, or None if nothing was logged that day.
+        """
+        query = """
+        SELECT count, high_count, low_count, time_count, time_sum, time_min, time_max
+        FROM daily_rollup
+        WHERE date = ?
+        """
+        results = self.execute_query(query, (date,))
+        if not results:
+            return None
+        count, high_count, low_count, time_count, time_sum, time_min, time_max = results[0]
+
+        p95 = None
+        if time_count:
+            query = "SELECT bucket, count FROM daily_latency_histogram WHERE date = ? ORDER BY bucket ASC"
+            seen = 0
+            for bucket, bucket_count in self.execute_query(query, (date,)):
+                seen += bucket_count
+                if seen >= 0.95 * time_count:
+                    p95 = min(bucket_upper_bound(bucket), time_max)
+                    break
+
+        return {
+            "count": count,
+            "high": high_count,
+            "low": low_count,
+            "min": time_min,
+            "avg": time_sum / time_count if time_count else None,
+            "p95": p95,
+        }
 
     def get_performance_data(self, date):
         """
-        Fetches the performance data for today based on 'timer_id' and 'time'.
+        Fetches a day's average performance per hour from the hourly rollup.
 
-        :return: A list of dictionaries with 'timer_id' and 'time'.
+        :param date: The date in yyyy-mm-dd format.
+        :return: A list of dictionaries with 'timestamps', the hour as HH:00, and 'time', the average in seconds.
         """
         query = """
-        SELECT timestamp, time
-        FROM light_logs
-        WHERE DATE(timestamp) = ?
+        SELECT hour, time_sum / time_count
+        FROM hourly_rollup
+        WHERE hour >= ? AND hour < ? AND time_count > 0
+        ORDER BY hour ASC
         """
 
-        results = self.execute_query(query, (date,))
-        formatted_results = [{"timestamps": row[0].split(" ")[1], "time": row[1]} for row in results]
+        results = self.execute_query(query, self.get_day_range(date))
+        formatted_results = [{"timestamps": f"{row[0][11:13]}:00", "time": row[1]} for row in results]
         self.main.debug(f"Formatted Results: {formatted_results}")
         return formatted_results
 
     def get_high_low_data(self, date):
-        query = "SELECT timestamp, string FROM light_logs WHERE timestamp LIKE ?"
-        date_pattern = f"{date}%"
-        results = self.execute_query(query, (date_pattern,))
-        formatted_results = []
-        for row in results:
-            timestamp = row[0]
-            value = 0 if "HIGH" in row[1].upper() else 1
-            formatted_results.append({"timestamp": timestamp, "value": value})
-        return formatted_results
+        """
+        Fetches a day's HIGH and LOW counts per hour from the hourly rollup.
+
+        :param date: The date in yyyy-mm-dd format.
+        :return: A list of dictionaries with 'hour', as HH:00, 'high' and 'low'.
+        """
+        query = """
+        SELECT hour, high_count, low_count
+        FROM hourly_rollup
+        WHERE hour >= ? AND hour < ?
+        ORDER BY hour ASC
+        """
+        results = self.execute_query(query, self.get_day_range(date))
+        return [{"hour": f"{row[0][11:13]}:00", "high": row[1], "low": row[2]} for row in results]
+
+    def get_day_range(self, date):
+        """
+        Get the timestamp bounds of a day, for range queries that can use the timestamp index.
+        Timestamps are stored as 'YYYY-MM-DD HH:mm:ss', so they sort in chronological order.
+
+        :param date: The date in yyyy-mm-dd format.
+        :return: A tuple of the day's start (inclusive) and the next day's start (exclusive).
+        """
+        next_date = datetime.strptime(date, "%Y-%m-%d") + timedelta(days=1)
+        return date, next_date.strftime("%Y-%m-%d")
 
     def execute_query(self, query, params=()):
         """
@@ -133,17 +627,15 @@ class Server:
         :return: A list of processed rows.
         """
         try:
-            conn = sqlite3.connect(self.config["database"]["path"])
-            cursor = conn.cursor()
-            cursor.execute(query, params)
-            results = cursor.fetchall()
-            conn.close()
+            results = self.read_pool.get().execute(query, params).fetchall()
 
             if not results:
                 self.main.debug("results is null")
             return results
         except Exception as e:
             print(f"Error executing query: {e}")
+            # Start from a fresh connection on the next query
+            self.read_pool.discard()
             return []
 
     def run(self):
@@ -152,11 +644,26 @@ class Server:
         """
         host: str = self.config["server"]["host"]
         port: int = self.config["server"]["port"]
-        thread = threading.Thread(target=self.app.run, args=(host, port), kwargs={
-            "debug": False,
-            "use_reloader": False
-        }, daemon=True)
+        # Server modes: DEVELOPMENT, PRODUCTION
+        mode: str = self.config["server"].get("mode", "DEVELOPMENT")
+
+        target, args, kwargs = self.app.run, (host, port), {"debug": False, "use_reloader": False}
+        if mode == "PRODUCTION":
+            try:
+                from waitress import serve
+                target, args = serve, (self.app,)
+                kwargs = {"host": host, "port": port, "threads": self.config["server"].get("threads", 8)}
+            except ImportError:
+                print("waitress isn't installed, falling back to the development server.")
+
+        thread = threading.Thread(target=target, args=args, kwargs=kwargs, name="server", daemon=True)
         thread.start()
         print(host, port)
 
+    def close(self):
+        """
+        Close the database connections.
+        """
+        self.read_pool.close()
+
 
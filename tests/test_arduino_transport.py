@@ -0,0 +1,157 @@
+import re
+import socket
+import threading
+import time
+
+import pytest
+
+from arduino_transport import AsyncArduinoTransport
+from fake_arduino import FakeArduino
+
+
+class StubMain:
+    def __init__(self, **arduino):
+        self.config = {"arduino": dict({"connect_timeout": 1, "reconnect_delay": 0.05, "max_reconnect_delay": 0.2,
+                                        "max_message_size": 64}, **arduino)}
+        self.messages = []
+
+    def get_config(self):
+        return self.config
+
+    def add_message(self, message):
+        self.messages.append(message)
+
+    def debug(self, message):
+        pass
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+@pytest.fixture
+def fake():
+    fakes = []
+
+    def start(port=0):
+        device = FakeArduino(port=port)
+        device.start()
+        fakes.append(device)
+        return device
+
+    yield start
+    for device in fakes:
+        device.stop()
+
+
+@pytest.fixture
+def transports():
+    started = []
+
+    def create(main, port):
+        transport = AsyncArduinoTransport(main, "127.0.0.1", port)
+        started.append(transport)
+        return transport
+
+    yield create
+    for transport in started:
+        transport.disconnect()
+
+
+def test_replies_are_received(fake, transports):
+    device = fake()
+    main = StubMain()
+    transport = transports(main, device.port)
+    assert transport.connect()
+    transport.send_message("1:FLIPSTATE")
+    assert wait_until(lambda: main.messages == ["Pin 7 set to HIGH"])
+    assert device.received == ["1:FLIPSTATE"]
+
+
+def test_reconnects_after_the_device_restarts(fake, transports):
+    device = fake()
+    transport = transports(StubMain(), device.port)
+    assert transport.connect()
+
+    device.stop()
+    assert wait_until(lambda: not transport.connected.is_set())
+    # Queued while the device is off, and sent once it's back
+    transport.send_message("2:GETSTATE")
+    restarted = fake(device.port)
+    assert wait_until(transport.connected.is_set)
+    assert wait_until(lambda: restarted.received == ["2:GETSTATE"])
+
+
+def test_reconnect_delay_doubles_up_to_the_maximum(transports, capsys):
+    transport = transports(StubMain(reconnect_delay=0.1, max_reconnect_delay=0.4), free_port())
+    assert not transport.connect(wait=False)
+    time.sleep(0.9)
+    delays = [float(delay) for delay in re.findall(r"retrying in ([\d.]+)s", capsys.readouterr().out)]
+    assert delays[:4] == [0.1, 0.2, 0.4, 0.4]
+
+
+def test_full_queue_drops_the_oldest_messages(fake, transports):
+    port = free_port()
+    transport = transports(StubMain(queue_size=3), port)
+    transport.connect(wait=False)
+    for index in range(5):
+        transport.send_message(f"{index}:ECHO")
+    assert wait_until(lambda: transport.dropped == 2)
+
+    device = fake(port)
+    assert wait_until(lambda: device.received == ["2:ECHO", "3:ECHO", "4:ECHO"])
+
+
+def test_oversized_messages_are_discarded(fake, transports):
+    device = fake()
+    main = StubMain()
+    transport = transports(main, device.port)
+    assert transport.connect()
+    # Echoed back by the fake device
+    transport.send_message("x" * 200)
+    transport.send_message("1:FLIPSTATE")
+    assert wait_until(lambda: main.messages == ["Pin 7 set to HIGH"])
+    assert transport.connected.is_set()
+
+
+def test_heartbeats_keep_a_replying_device_connected(fake, transports):
+    device = fake()
+    main = StubMain(heartbeat_message="PING", heartbeat_interval=0.05, heartbeat_timeout=0.3)
+    transport = transports(main, device.port)
+    assert transport.connect()
+    assert wait_until(lambda: device.received.count("PING") >= 10)
+    assert transport.connected.is_set()
+    # The echoed heartbeats aren't messages
+    assert main.messages == []
+
+
+def test_silent_device_is_reconnected_after_the_heartbeat_timeout(transports):
+    listener = socket.create_server(("127.0.0.1", 0))
+    connections = []
+
+    def accept():
+        while True:
+            try:
+                connections.append(listener.accept()[0])
+            except OSError:
+                return
+
+    threading.Thread(target=accept, daemon=True).start()
+    try:
+        main = StubMain(heartbeat_message="PING", heartbeat_interval=0.05, heartbeat_timeout=0.2)
+        transport = transports(main, listener.getsockname()[1])
+        assert transport.connect()
+        assert wait_until(lambda: len(connections) >= 2)
+    finally:
+        listener.close()
+        for connection in connections:
+            connection.close()
@@ -0,0 +1,135 @@
+import threading
+
+import pytest
+
+pytest.importorskip("flask")
+
+from camera_pool import CameraPool
+from server import Server
+from timer_registry import TimerRegistry
+
+
+class StubLogger:
+    def __init__(self):
+        self.messages = []
+
+    def add_message(self, message, date_time=None):
+        self.messages.append(message)
+
+
+class StubMain:
+    def __init__(self, path):
+        self.config = {"database": {"path": str(path)}, "server": {}, "tracker": {}, "debug": False}
+        self.logger = StubLogger()
+        self.tracker = None
+        self.timers = TimerRegistry(self, 30, 5)
+
+    def get_logger(self):
+        return self.logger
+
+    def get_database(self):
+        return None
+
+    def get_config(self):
+        return self.config
+
+    def get_tracker(self):
+        return self.tracker
+
+    def get_current_time(self):
+        return "2024-11-02 10:00:00"
+
+    def get_current_date(self):
+        return "2024-11-02"
+
+    def debug(self, message):
+        pass
+
+
+class StubTracker:
+    def __init__(self, main):
+        self.main = main
+        self.stop_event = threading.Event()
+        self.rate_controller = None
+        self.camera_pool = None
+        self.commands = []
+
+    def poll_controls(self):
+        pass
+
+    def send_command(self, command):
+        self.commands.append(command)
+
+
+class StubProcess:
+    def __init__(self, tracker):
+        self.tracker = tracker
+
+    def is_alive(self):
+        return not self.tracker.stop_event.is_set()
+
+    def join(self, timeout=None):
+        pass
+
+
+WORKER_STATS = {"stats": {"stages": {"tracker.process_frame": {"count": 3}}}, "rate": {"inference_scale": 0.75}}
+
+
+@pytest.fixture
+def main(tmp_path):
+    main = StubMain(tmp_path / "database.db")
+    main.tracker = StubTracker(main)
+    yield main
+    main.timers.close()
+
+
+def run_pool(main, events):
+    """
+    Run a pool without worker processes, dispatching the given events then stopping.
+    """
+    pool = CameraPool(main.tracker, [0, 1])
+    pool.start = lambda: pool.processes.append(StubProcess(main.tracker))
+    for event in events:
+        pool.events.put(event)
+    pool.events.put(("stop", None, None))
+    original_get = pool.events.get
+
+    def get(timeout=None):
+        kind, camera, payload = original_get(timeout=timeout)
+        if kind == "stop":
+            main.tracker.stop_event.set()
+        return kind, camera, payload
+
+    pool.events.get = get
+    pool.run()
+    return pool
+
+
+def test_pool_dispatches_commands_logs_and_stats(main):
+    pool = run_pool(main, [("command", 0, "FLIPSTATE"), ("log", 1, "Hello"), ("stats", 1, WORKER_STATS)])
+    assert main.tracker.commands == ["FLIPSTATE"]
+    assert main.logger.messages == ["[Camera 1] Hello"]
+    assert pool.get_stats() == {"1": WORKER_STATS}
+
+
+def test_server_reports_each_camera_worker(main):
+    main.tracker.camera_pool = run_pool(main, [("stats", 1, WORKER_STATS), ("stats", 0, dict(WORKER_STATS, rate=None))])
+    server = Server(main)
+    try:
+        client = server.app.test_client()
+        cameras = client.get("/stats").get_json()["cameras"]
+        assert cameras["1"] == WORKER_STATS["stats"]
+        rate = client.get("/tracker/rate").get_json()
+        assert rate == {"enabled": True, "cameras": {"0": None, "1": {"inference_scale": 0.75}}}
+    finally:
+        server.close()
+
+
+def test_single_camera_stats_have_no_cameras(main):
+    server = Server(main)
+    try:
+        client = server.app.test_client()
+        assert "cameras" not in client.get("/stats").get_json()
+        assert client.get("/tracker/rate").get_json() == {"enabled": False}
+    finally:
+        server.close()
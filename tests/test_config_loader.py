@@ -0,0 +1,55 @@
+import os
+import time
+
+from config_loader import ConfigLoader
+
+
+def write_config(path, content, mtime=None):
+    path.write_text(content)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+
+def test_config_is_loaded_once(tmp_path):
+    path = tmp_path / "config.yml"
+    write_config(path, "debug: true\ntracker:\n  mode: BOX\n")
+    loader = ConfigLoader(str(path))
+    path.unlink()
+    assert loader.get() == {"debug": True, "tracker": {"mode": "BOX"}}
+
+
+def test_reload_updates_the_same_dictionary(tmp_path):
+    path = tmp_path / "config.yml"
+    write_config(path, "debug: false\nold: 1\n")
+    loader = ConfigLoader(str(path))
+    config = loader.get()
+    write_config(path, "debug: true\n")
+    assert loader.load()
+    assert config is loader.get()
+    assert config == {"debug": True}
+
+
+def test_unreadable_config_keeps_the_current_one(tmp_path):
+    path = tmp_path / "config.yml"
+    write_config(path, "debug: true\n")
+    loader = ConfigLoader(str(path))
+    for content in ("debug: [unclosed\n", "- not a mapping\n"):
+        write_config(path, content)
+        assert not loader.load()
+        assert loader.get() == {"debug": True}
+
+
+def test_missing_config_is_empty(tmp_path):
+    assert ConfigLoader(str(tmp_path / "missing.yml")).get() == {}
+
+
+def test_watch_reloads_a_changed_file(tmp_path):
+    path = tmp_path / "config.yml"
+    write_config(path, "debug: false\n", mtime=1_000_000)
+    loader = ConfigLoader(str(path))
+    loader.watch(0.01)
+    write_config(path, "debug: true\n", mtime=2_000_000)
+    deadline = time.monotonic() + 5
+    while not loader.get()["debug"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert loader.get() == {"debug": True}
@@ -0,0 +1,218 @@
+import sqlite3
+
+import pytest
+
+from database import MIGRATIONS, Database
+from event_bus import EventBus
+
+
+class StubLogger:
+    def __init__(self):
+        self.messages = []
+
+    def add_message(self, message, date_time):
+        self.messages.append(message)
+
+
+class StubMain:
+    def __init__(self, path):
+        self.config = {"database": {"path": str(path), "batch_size": 10, "flush_interval": 0.01,
+                                    "max_retries": 0, "retry_delay": 0.01}}
+        self.logger = StubLogger()
+        self.events = EventBus()
+
+    def get_server(self):
+        return None
+
+    def get_events(self):
+        return self.events
+
+    def get_logger(self):
+        return self.logger
+
+    def get_config(self):
+        return self.config
+
+    def get_current_time(self):
+        return "2024-11-02 12:00:00"
+
+    def debug(self, message):
+        pass
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return tmp_path / "db" / "database.db"
+
+
+def test_queued_rows_are_saved_on_close(db_path):
+    database = Database(StubMain(db_path))
+    for index in range(25):
+        database.save_to_db(f"message {index}", str(index), 0.01, f"2024-11-02 12:00:{index:02d}")
+    database.close()
+
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute("SELECT string FROM light_logs ORDER BY id").fetchall()
+    assert rows == [(f"message {index}",) for index in range(25)]
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    conn.close()
+
+
+def test_rows_are_saved_after_the_flush_interval(db_path):
+    database = Database(StubMain(db_path))
+    database.save_to_db("Pin 7 set to HIGH", "1", 0.01, "2024-11-02 12:00:00")
+
+    conn = sqlite3.connect(db_path)
+    try:
+        for _ in range(100):
+            if conn.execute("SELECT count(*) FROM light_logs").fetchone()[0]:
+                break
+            database.writer_thread.join(timeout=0.01)
+        assert conn.execute("SELECT count(*) FROM light_logs").fetchone()[0] == 1
+    finally:
+        conn.close()
+        database.close()
+
+
+def test_rows_that_cannot_be_saved_are_logged(db_path):
+    main = StubMain(db_path)
+    database = Database(main)
+    conn = sqlite3.connect(db_path)
+    conn.execute("DROP TABLE light_logs")
+    conn.commit()
+    conn.close()
+
+    database.save_to_db("Pin 7 set to HIGH", "1", 0.01, "2024-11-02 12:00:00")
+    database.close()
+    assert database.writer_thread is not None and not database.writer_thread.is_alive()
+    assert any(message.startswith("[UNSAVED] Pin 7 set to HIGH") for message in main.logger.messages)
+    assert [data["message"] for event_id, data in main.events.get_since(0)] == ["Pin 7 set to HIGH"]
+
+
+def test_rows_are_published_once_committed(db_path):
+    main = StubMain(db_path)
+    main.config["database"]["flush_interval"] = 60
+    database = Database(main)
+    database.save_to_db("Pin 7 set to HIGH", "1", 0.01, "2024-11-02 12:00:00")
+    database.writer_thread.join(timeout=0.05)
+
+    # A page rendered now, with the logs read after the event ID, must not miss the pending row
+    last_event_id = main.events.last_id
+    conn = sqlite3.connect(db_path)
+    try:
+        saved = conn.execute("SELECT count(*) FROM light_logs").fetchone()[0]
+    finally:
+        conn.close()
+    assert (last_event_id, saved) == (0, 0)
+
+    database.close()
+    assert main.events.get_since(last_event_id) == [
+        (1, {"timestamp": "2024-11-02 12:00:00", "message": "Pin 7 set to HIGH", "timer_id": "1", "time": 0.01})]
+
+
+def create_unmigrated_database(path, rows):
+    """
+    Create a database as it was before the migrations, with some logs.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE light_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT NOT NULL,
+            string TEXT NOT NULL,
+            timer_id TEXT,
+            time FLOAT
+            )
+    """)
+    conn.executemany("INSERT INTO light_logs (timestamp, string, timer_id, time) VALUES (?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+
+def test_migrations_are_applied_to_an_existing_database(db_path):
+    create_unmigrated_database(db_path, [("2024-11-01 10:00:00", "Pin 7 set to HIGH", "1", 0.02)])
+    Database(StubMain(db_path)).close()
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == len(MIGRATIONS)
+    assert conn.execute("SELECT count(*) FROM light_logs").fetchone()[0] == 1
+    conn.close()
+
+
+def test_migrations_are_only_applied_once(db_path, capsys):
+    Database(StubMain(db_path)).close()
+    capsys.readouterr()
+    Database(StubMain(db_path)).close()
+    assert "Applied database migration" not in capsys.readouterr().out
+
+
+def test_day_range_queries_use_the_timestamp_index(db_path):
+    Database(StubMain(db_path)).close()
+
+    conn = sqlite3.connect(db_path)
+    plan = " ".join(row[-1] for row in conn.execute(
+        "EXPLAIN QUERY PLAN SELECT timestamp, string FROM light_logs WHERE timestamp >= ? AND timestamp < ?",
+        ("2024-11-01", "2024-11-02")))
+    assert "idx_light_logs_timestamp" in plan
+    conn.close()
+
+
+def test_migrations_backfill_the_rollups_and_drop_the_date_index(db_path):
+    create_unmigrated_database(db_path, [
+        ("2024-11-01 10:00:00", "Pin 7 set to HIGH", "1", 0.02),
+        ("2024-11-01 10:30:00", "Pin 7 set to LOW", "2", 0.04),
+        ("2024-11-01 11:00:00", "Pin 7 set to LOW", None, None),
+        ("2024-11-02 09:00:00", "Pin 7 set to HIGH", None, None),
+    ])
+    Database(StubMain(db_path)).close()
+
+    conn = sqlite3.connect(db_path)
+    indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert "idx_light_logs_date" not in indexes
+    assert conn.execute("SELECT date, count, high_count, low_count, time_count, time_min, time_max "
+                        "FROM daily_rollup ORDER BY date").fetchall() \
+        == [("2024-11-01", 3, 1, 2, 2, 0.02, 0.04), ("2024-11-02", 1, 1, 0, 0, None, None)]
+    assert conn.execute("SELECT hour, high_count, low_count, time_count FROM hourly_rollup ORDER BY hour").fetchall() \
+        == [("2024-11-01 10", 1, 1, 2), ("2024-11-01 11", 0, 1, 0), ("2024-11-02 09", 1, 0, 0)]
+    conn.close()
+
+
+def test_saved_rows_update_the_rollups(db_path):
+    database = Database(StubMain(db_path))
+    database.save_to_db("Pin 7 set to HIGH", "1", 0.01, "2024-11-02 12:00:00")
+    database.save_to_db("Pin 7 set to LOW", "2", 0.03, "2024-11-02 12:00:01")
+    database.close()
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT count, high_count, low_count, time_sum FROM daily_rollup").fetchone() \
+        == (2, 1, 1, pytest.approx(0.04))
+    assert conn.execute("SELECT sum(count) FROM daily_latency_histogram").fetchone()[0] == 2
+    assert conn.execute("SELECT hour, time_count FROM hourly_rollup").fetchall() == [("2024-11-02 12", 2)]
+    conn.close()
+
+
+def read_rollups(path):
+    """
+    Read every rollup table, with the float sums rounded so they compare equal whatever the summing order.
+    """
+    conn = sqlite3.connect(path)
+    try:
+        return {table: sorted(tuple(round(value, 9) if isinstance(value, float) else value for value in row)
+                              for row in conn.execute(f"SELECT * FROM {table}"))
+                for table in ("daily_rollup", "daily_latency_histogram", "hourly_rollup")}
+    finally:
+        conn.close()
+
+
+def test_rebuild_matches_the_incremental_rollups(db_path):
+    database = Database(StubMain(db_path))
+    for index in range(30):
+        database.save_to_db("Pin 7 set to HIGH" if index % 2 else "Pin 7 set to LOW", str(index),
+                            0.001 * index or None, f"2024-11-0{1 + index % 3} 1{index % 4}:00:00")
+    database.close()
+
+    incremental = read_rollups(db_path)
+    database.rebuild_rollup()
+    assert read_rollups(db_path) == incremental
+    assert sum(row[1] for row in incremental["daily_rollup"]) == 30
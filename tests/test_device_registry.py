@@ -0,0 +1,78 @@
+import itertools
+import time
+
+import pytest
+
+from device_registry import DeviceRegistry
+from fake_arduino import FakeArduino
+
+
+class StubMain:
+    def __init__(self, arduino):
+        self.config = {"arduino": dict({"connect_timeout": 2, "reconnect_delay": 0.05}, **arduino)}
+        self.timer_ids = itertools.count(1)
+        self.messages = []
+
+    def get_config(self):
+        return self.config
+
+    def start_timer(self, command=None):
+        return str(next(self.timer_ids))
+
+    def add_message(self, message):
+        self.messages.append(message)
+
+    def debug(self, message):
+        pass
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+@pytest.fixture
+def fakes():
+    devices = [FakeArduino(), FakeArduino()]
+    for device in devices:
+        device.start()
+    yield devices
+    for device in devices:
+        device.stop()
+
+
+def test_commands_reach_every_device_with_their_own_timer(fakes):
+    main = StubMain({"devices": [{"name": "ceiling", "host": "127.0.0.1", "port": fakes[0].port},
+                                 {"name": "desk", "host": "127.0.0.1", "port": fakes[1].port}]})
+    registry = DeviceRegistry(main)
+    try:
+        assert registry.connect()
+        registry.send_command("FLIPSTATE")
+        assert wait_until(lambda: all(device.received for device in fakes))
+        assert sorted(fakes[0].received + fakes[1].received) == ["1:FLIPSTATE", "2:FLIPSTATE"]
+        assert wait_until(lambda: len(main.messages) == 2)
+        assert [status["name"] for status in registry.get_status()] == ["ceiling", "desk"]
+        assert all(status["connected"] for status in registry.get_status())
+    finally:
+        registry.disconnect()
+
+
+def test_single_arduino_is_used_without_devices(fakes):
+    registry = DeviceRegistry(StubMain({"host": "127.0.0.1", "port": fakes[0].port}))
+    try:
+        assert registry.connect()
+        assert list(registry.devices) == [f"127.0.0.1:{fakes[0].port}"]
+    finally:
+        registry.disconnect()
+
+
+@pytest.mark.parametrize("devices", [
+    [{"name": "desk", "host": "10.0.0.1", "port": 5001}, {"name": "desk", "host": "10.0.0.2", "port": 5001}],
+    [{"host": "10.0.0.1", "port": 5001}, {"host": "10.0.0.1", "port": 5001}],
+    [{"name": "10.0.0.1:5001", "host": "10.0.0.2", "port": 5001}, {"host": "10.0.0.1", "port": 5001}],
+])
+def test_duplicate_device_names_are_rejected(devices):
+    with pytest.raises(ValueError):
+        DeviceRegistry(StubMain({"devices": devices}))
@@ -0,0 +1,47 @@
+import threading
+
+from event_bus import EventBus
+
+
+def test_publish_returns_increasing_ids():
+    bus = EventBus()
+    assert bus.publish({"message": "a"}) == 1
+    assert bus.publish({"message": "b"}) == 2
+    assert bus.last_id == 2
+
+
+def test_get_since_returns_only_newer_events():
+    bus = EventBus()
+    for message in "abc":
+        bus.publish({"message": message})
+    assert bus.get_since(1) == [(2, {"message": "b"}), (3, {"message": "c"})]
+    assert bus.get_since(3) == []
+
+
+def test_history_keeps_only_the_latest_events():
+    bus = EventBus(history=2)
+    for message in "abc":
+        bus.publish({"message": message})
+    assert [event_id for event_id, data in bus.get_since(0)] == [2, 3]
+
+
+def test_wait_times_out_without_new_events():
+    bus = EventBus()
+    bus.publish({"message": "a"})
+    assert bus.wait(1, timeout=0.01) == []
+
+
+def test_wait_wakes_up_on_publish():
+    bus = EventBus()
+    timer = threading.Timer(0.05, bus.publish, args=({"message": "a"},))
+    timer.start()
+    try:
+        assert bus.wait(0, timeout=5) == [(1, {"message": "a"})]
+    finally:
+        timer.cancel()
+
+
+def test_wait_returns_the_backlog_at_once():
+    bus = EventBus()
+    bus.publish({"message": "a"})
+    assert bus.wait(0, timeout=5) == [(1, {"message": "a"})]
@@ -0,0 +1,41 @@
+import threading
+
+from frame_queue import FrameQueue
+
+
+def test_get_returns_frames_in_order():
+    frames = FrameQueue(maxsize=2)
+    frames.put("a")
+    frames.put("b")
+    assert frames.get(timeout=0) == "a"
+    assert frames.get(timeout=0) == "b"
+
+
+def test_put_drops_the_oldest_frame_when_full():
+    frames = FrameQueue(maxsize=1)
+    frames.put("old")
+    frames.put("new")
+    assert frames.get(timeout=0) == "new"
+    assert frames.dropped == 1
+
+
+def test_get_times_out_on_an_empty_queue():
+    assert FrameQueue().get(timeout=0.01) is None
+
+
+def test_get_wakes_up_on_put():
+    frames = FrameQueue()
+    timer = threading.Timer(0.05, frames.put, args=("frame",))
+    timer.start()
+    try:
+        assert frames.get(timeout=5) == "frame"
+    finally:
+        timer.cancel()
+
+
+def test_clear_discards_every_frame():
+    frames = FrameQueue(maxsize=3)
+    frames.put("a")
+    frames.put("b")
+    frames.clear()
+    assert frames.get(timeout=0) is None
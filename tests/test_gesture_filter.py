@@ -0,0 +1,76 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from gesture_filter import GestureStateMachine, OneEuroFilter
+
+
+def test_state_changes_on_every_frame_without_debounce():
+    machine = GestureStateMachine()
+    assert machine.update(True) is True
+    assert machine.state == 1
+    assert machine.update(False) is False
+    assert machine.state == 0
+
+
+def test_state_needs_confirm_frames_to_turn_on():
+    machine = GestureStateMachine(confirm_frames=3, window=3)
+    assert machine.update(True) is False
+    assert machine.update(True) is False
+    assert machine.update(True) is True
+    assert machine.get_stats() == {"state": 1, "transitions": 1, "rejected": 2}
+
+
+def test_single_jittery_frame_does_not_turn_the_state_off():
+    machine = GestureStateMachine(confirm_frames=2, window=3)
+    machine.set_state(1)
+    machine.update(False)
+    machine.update(True)
+    assert machine.state == 1
+    machine.update(False)
+    assert machine.state == 0
+
+
+def test_none_observation_keeps_the_state():
+    machine = GestureStateMachine(confirm_frames=2, window=2)
+    machine.update(True)
+    assert machine.update(None) is False
+    assert machine.update(True) is True
+
+
+def test_older_frames_do_not_count_after_a_change():
+    machine = GestureStateMachine(confirm_frames=2, window=4)
+    machine.update(True)
+    machine.update(True)
+    machine.update(False)
+    # The window restarted when the state turned on, so one release isn't enough
+    assert machine.state == 1
+
+
+def test_one_euro_returns_the_first_sample_as_is():
+    one_euro = OneEuroFilter()
+    values = np.array([[10.0, 20.0], [30.0, 40.0]])
+    np.testing.assert_array_equal(one_euro.filter(values, 0.0), values)
+
+
+def test_one_euro_smooths_jitter_on_a_still_hand():
+    one_euro = OneEuroFilter(min_cutoff=1.0, beta=0.0)
+    one_euro.filter(np.array([100.0]), 0.0)
+    filtered = one_euro.filter(np.array([110.0]), 1 / 30)
+    assert 100.0 < filtered[0] < 105.0
+
+
+def test_one_euro_follows_fast_movements_more_closely():
+    slow = OneEuroFilter(min_cutoff=1.0, beta=0.0)
+    fast = OneEuroFilter(min_cutoff=1.0, beta=1.0)
+    for one_euro in (slow, fast):
+        one_euro.filter(np.array([0.0]), 0.0)
+    assert fast.filter(np.array([300.0]), 1 / 30)[0] > slow.filter(np.array([300.0]), 1 / 30)[0]
+
+
+def test_one_euro_restarts_after_reset_or_a_new_shape():
+    one_euro = OneEuroFilter()
+    one_euro.filter(np.array([0.0]), 0.0)
+    one_euro.reset()
+    np.testing.assert_array_equal(one_euro.filter(np.array([50.0]), 1.0), [50.0])
+    np.testing.assert_array_equal(one_euro.filter(np.array([1.0, 2.0]), 2.0), [1.0, 2.0])
@@ -0,0 +1,72 @@
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip("numpy")
+mp = pytest.importorskip("mediapipe")
+if not hasattr(mp, "solutions"):
+    pytest.skip("mediapipe without the solutions API", allow_module_level=True)
+
+from hand_tracker import HandTracker
+
+
+class StubMain:
+    def __init__(self):
+        self.config = {
+            "debug": False,
+            "tracker": {"mode": "GESTURE", "headless": True, "roi": {"enabled": True, "margin": 80, "min_size": 160}},
+        }
+
+    def get_config(self):
+        return self.config
+
+    def get_logger(self):
+        return None
+
+    def debug(self, message):
+        pass
+
+
+@pytest.fixture
+def tracker():
+    tracker = HandTracker(StubMain(), headless=True, connect=False)
+    yield tracker
+    tracker.hands.close()
+    tracker.roi_hands.close()
+
+
+def hand_at(x, y):
+    return [np.array([[x, y], [x + 40, y + 60]])]
+
+
+def test_region_stays_while_the_hand_is_inside(tracker):
+    tracker.update_roi(hand_at(300, 200))
+    roi = tracker.roi
+    assert roi == (220, 120, 420, 340)
+    tracker.update_roi(hand_at(330, 230))
+    assert tracker.roi == roi
+    # Closer than half the margin to the edge
+    tracker.update_roi(hand_at(350, 200))
+    assert tracker.roi == (270, 120, 470, 340)
+    tracker.update_roi([])
+    assert tracker.roi is None
+
+
+def test_miss_in_the_region_observes_nothing(tracker):
+    calls = []
+    tracker.roi_hands.process = lambda frame: calls.append("roi") or SimpleNamespace(multi_hand_landmarks=None)
+    tracker.hands.process = lambda frame: calls.append("full") or SimpleNamespace(multi_hand_landmarks=None)
+    tracker.roi = (220, 120, 420, 340)
+    tracker.hand_present = True
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+
+    tracker.process_frame(frame)
+    assert calls == ["roi"]
+    # The hand may just have left the region, so nothing is forgotten yet
+    assert tracker.hand_present
+    assert tracker.roi == (220, 120, 420, 340)
+
+    tracker.process_frame(frame)
+    assert calls == ["roi", "full"]
+    assert not tracker.hand_present
+    assert tracker.roi is None
@@ -0,0 +1,63 @@
+import os
+import time
+
+import logger as logger_module
+from logger import Logger
+
+
+class StubMain:
+    def __init__(self, directory, **logs):
+        self.config = {"logs": dict({"directory": str(directory), "flush_interval": 10, "buffer_size": 100}, **logs)}
+
+    def read_config(self):
+        return self.config
+
+    def debug(self, message):
+        pass
+
+
+def read_logs(directory):
+    return {name: (directory / name).read_text() for name in sorted(os.listdir(directory))}
+
+
+def test_buffered_lines_are_written_on_close(tmp_path):
+    logger = Logger(StubMain(tmp_path))
+    logger.add_message("first", "2024-11-02 12:00:00")
+    logger.add_message("second", "2024-11-02 12:00:01")
+    assert not any(read_logs(tmp_path).values())
+    logger.close()
+    assert list(read_logs(tmp_path).values()) == ["2024-11-02 12:00:00: first\n2024-11-02 12:00:01: second\n"]
+    assert logger.file is None
+
+
+def test_full_buffer_is_written_straight_away(tmp_path):
+    logger = Logger(StubMain(tmp_path, buffer_size=2))
+    logger.add_message("first", "t")
+    logger.add_message("second", "t")
+    deadline = time.monotonic() + 5
+    while not any(read_logs(tmp_path).values()) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert list(read_logs(tmp_path).values()) == ["t: first\nt: second\n"]
+    logger.close()
+
+
+def test_file_is_rotated_past_max_size(tmp_path):
+    logger = Logger(StubMain(tmp_path, buffer_size=1, max_size=10))
+    logger.write_lines(["a" * 20 + "\n"])
+    logger.write_lines(["b\n"])
+    logger.close()
+    base, extension = os.path.splitext(os.path.basename(logger.log_file))
+    assert read_logs(tmp_path) == {f"{base}.1{extension}": "a" * 20 + "\n", f"{base}{extension}": "b\n"}
+
+
+def test_failed_rotation_keeps_logging(tmp_path, monkeypatch):
+    def fail(source, destination):
+        raise PermissionError("file in use")
+
+    logger = Logger(StubMain(tmp_path, buffer_size=1, max_size=10))
+    monkeypatch.setattr(logger_module.os, "replace", fail)
+    logger.write_lines(["a" * 20 + "\n"])
+    logger.write_lines(["b\n"])
+    assert logger.file is not None and not logger.file.closed
+    logger.close()
+    assert list(read_logs(tmp_path).values()) == ["a" * 20 + "\nb\n"]
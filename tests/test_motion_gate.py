@@ -0,0 +1,61 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+from motion_gate import MotionGate
+
+
+def still_frame():
+    return np.full((120, 160, 3), 100, dtype=np.uint8)
+
+
+def moving_frame():
+    frame = still_frame()
+    frame[30:90, 40:120] = 250
+    return frame
+
+
+def make_gate(**config):
+    return MotionGate(dict({"hold_frames": 2, "max_skip": 0}, **config))
+
+
+def test_first_frame_is_processed():
+    gate = make_gate()
+    assert gate.should_process(still_frame())
+
+
+def test_still_frames_are_skipped_after_the_hold():
+    gate = make_gate()
+    decisions = [gate.should_process(still_frame()) for _ in range(5)]
+    # The first frame counts as motion, detection is held for 2 more frames
+    assert decisions == [True, True, True, False, False]
+    assert gate.get_stats() == {"processed": 3, "skipped": 2, "skipped_ratio": 0.4}
+
+
+def test_motion_restarts_detection():
+    gate = make_gate(hold_frames=0)
+    gate.should_process(still_frame())
+    assert not gate.should_process(still_frame())
+    assert gate.should_process(moving_frame())
+    assert gate.should_process(still_frame())
+    assert not gate.should_process(still_frame())
+
+
+def test_tracked_hand_is_always_processed():
+    gate = make_gate(hold_frames=0)
+    gate.should_process(still_frame())
+    assert all(gate.should_process(still_frame(), hand_present=True) for _ in range(5))
+
+
+def test_detection_runs_every_max_skip_frames():
+    gate = make_gate(hold_frames=0, max_skip=3)
+    gate.should_process(still_frame())
+    decisions = [gate.should_process(still_frame()) for _ in range(8)]
+    assert decisions == [False, False, False, True, False, False, False, True]
+
+
+def test_small_changes_are_not_motion():
+    gate = make_gate(hold_frames=0)
+    gate.should_process(still_frame())
+    assert not gate.should_process(still_frame() + 10)
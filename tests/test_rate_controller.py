@@ -0,0 +1,99 @@
+import pytest
+
+from rate_controller import AdaptiveRateController
+
+
+class StubLogger:
+    def __init__(self):
+        self.messages = []
+
+    def add_message(self, message, date_time=None):
+        self.messages.append(message)
+
+
+class StubMain:
+    def __init__(self):
+        self.logger = StubLogger()
+
+    def get_logger(self):
+        return self.logger
+
+    def get_current_time(self):
+        return "2024-11-02 10:00:00"
+
+    def debug(self, message):
+        pass
+
+
+def make_controller(inference_scale=0.5, **config):
+    config = dict({"target_latency": 50, "tolerance": 0.2, "min_scale": 0.25, "scale_step": 0.05,
+                   "max_skip": 3, "adjust_interval": 1, "smoothing": 1.0}, **config)
+    return AdaptiveRateController(StubMain(), config, inference_scale)
+
+
+def frame(milliseconds, capture=0.0):
+    return {"capture": capture, "inference": milliseconds / 1000}
+
+
+def test_slow_frames_lower_the_scale_then_skip_frames():
+    controller = make_controller()
+    scales = []
+    for _ in range(7):
+        controller.record_frame(frame(100))
+        scales.append((round(controller.scale, 2), controller.skip))
+    assert scales == [(0.45, 1), (0.4, 1), (0.35, 1), (0.3, 1), (0.25, 1), (0.25, 2), (0.25, 3)]
+    # Never more than max_skip
+    controller.record_frame(frame(100))
+    assert controller.skip == 3
+
+
+def test_headroom_stops_skipping_then_raises_the_scale_up_to_the_configured_one():
+    controller = make_controller()
+    controller.scale, controller.skip = 0.4, 2
+    steps = []
+    for _ in range(4):
+        controller.record_frame(frame(10))
+        steps.append((round(controller.scale, 2), controller.skip))
+    assert steps == [(0.4, 1), (0.45, 1), (0.5, 1), (0.5, 1)]
+
+
+def test_latency_within_tolerance_changes_nothing():
+    controller = make_controller()
+    for milliseconds in (41, 50, 59):
+        controller.record_frame(frame(milliseconds))
+    assert (controller.scale, controller.skip) == (0.5, 1)
+    assert controller.main.logger.messages == []
+
+
+def test_capture_time_is_not_controlled():
+    controller = make_controller()
+    controller.record_frame(frame(40, capture=0.5))
+    assert controller.latency == pytest.approx(40)
+    assert controller.scale == 0.5
+
+
+def test_adjusts_every_interval_on_the_moving_average():
+    controller = make_controller(adjust_interval=3, smoothing=0.5)
+    controller.record_frame(frame(100))
+    controller.record_frame(frame(100))
+    assert controller.scale == 0.5
+    controller.record_frame(frame(100))
+    assert controller.scale == pytest.approx(0.45)
+    controller.record_frame(frame(20))
+    assert controller.latency == pytest.approx(60)
+
+
+def test_should_process_one_frame_in_skip():
+    controller = make_controller()
+    controller.skip = 3
+    assert [controller.should_process() for _ in range(6)] == [False, False, True, False, False, True]
+
+
+def test_status_reports_the_last_change():
+    controller = make_controller()
+    controller.record_frame(frame(100))
+    status = controller.get_status()
+    assert status["inference_scale"] == pytest.approx(0.45)
+    assert status["process_one_in"] == 1
+    assert status["reason"].startswith("Inference scale 0.50 -> 0.45: latency 100.0ms above 60.0ms")
+    assert controller.main.logger.messages == [f"Adaptive rate: {status['reason']}"]
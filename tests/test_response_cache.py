@@ -0,0 +1,71 @@
+import hashlib
+import time
+
+from response_cache import ResponseCache
+
+
+def test_put_then_get_returns_the_page_and_its_etag():
+    cache = ResponseCache()
+    cache.put(("date", "2024-11-01"), "<html>", "2024-11-01")
+    entry = cache.get(("date", "2024-11-01"))
+    assert entry["body"] == "<html>"
+    assert entry["etag"] == hashlib.sha1(b"<html>").hexdigest()
+
+
+def test_same_body_has_the_same_etag():
+    cache = ResponseCache()
+    first = cache.put("a", "page", "2024-11-01")
+    second = cache.put("b", "page", "2024-11-02")
+    assert first["etag"] == second["etag"]
+    assert cache.put("c", "other page", "2024-11-02")["etag"] != first["etag"]
+
+
+def test_entries_expire_after_their_ttl():
+    cache = ResponseCache()
+    cache.put("today", "page", "2024-11-01", ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get("today") is None
+
+
+def test_least_recently_used_page_is_evicted():
+    cache = ResponseCache(max_entries=2)
+    cache.put("a", "a", "2024-11-01")
+    cache.put("b", "b", "2024-11-02")
+    cache.get("a")
+    cache.put("c", "c", "2024-11-03")
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get_stats()["evictions"] == 1
+
+
+def test_invalidate_dates_removes_only_their_pages():
+    cache = ResponseCache()
+    cache.put(("date", "2024-11-01"), "old", "2024-11-01")
+    cache.put(("metrics", "2024-11-01"), "old", "2024-11-01")
+    cache.put(("date", "2024-11-02"), "kept", "2024-11-02")
+    cache.invalidate_dates(["2024-11-01"])
+    assert cache.get(("date", "2024-11-01")) is None
+    assert cache.get(("metrics", "2024-11-01")) is None
+    assert cache.get(("date", "2024-11-02")) is not None
+    assert cache.get_stats()["invalidations"] == 2
+
+
+def test_page_rendered_during_a_write_is_not_cached():
+    cache = ResponseCache()
+    generation = cache.generation("2024-11-01")
+    # Rows are saved for the date while the page is being rendered
+    cache.invalidate_dates(["2024-11-01"])
+    entry = cache.put("page", "stale", "2024-11-01", generation=generation)
+    assert entry["body"] == "stale"
+    assert cache.get("page") is None
+    cache.put("page", "fresh", "2024-11-01", generation=cache.generation("2024-11-01"))
+    assert cache.get("page")["body"] == "fresh"
+
+
+def test_stats_count_hits_and_misses():
+    cache = ResponseCache()
+    cache.get("missing")
+    cache.put("page", "page", "2024-11-01")
+    cache.get("page")
+    stats = cache.get_stats()
+    assert (stats["entries"], stats["hits"], stats["misses"]) == (1, 1, 1)
@@ -0,0 +1,104 @@
+import sqlite3
+
+import pytest
+
+pytest.importorskip("flask")
+
+from server import Server
+
+
+class StubMain:
+    def __init__(self, path):
+        self.config = {"database": {"path": str(path)}, "server": {"cache": {"max_entries": 8, "today_ttl": 60}}}
+
+    def get_logger(self):
+        return None
+
+    def get_database(self):
+        return None
+
+    def get_config(self):
+        return self.config
+
+    def get_current_date(self):
+        return "2024-11-02"
+
+    def debug(self, message):
+        pass
+
+
+def insert_log(path, timestamp, message):
+    conn = sqlite3.connect(path)
+    conn.execute("INSERT INTO light_logs (timestamp, string, timer_id, time) VALUES (?, ?, NULL, NULL)",
+                 (timestamp, message))
+    conn.commit()
+    conn.close()
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / "database.db"
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE light_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT NOT NULL,
+            string TEXT NOT NULL,
+            timer_id TEXT,
+            time FLOAT
+            )
+    """)
+    conn.commit()
+    conn.close()
+    insert_log(path, "2024-11-01 10:00:00", "Pin 7 set to HIGH")
+    insert_log(path, "2024-11-02 10:00:00", "Pin 7 set to LOW")
+    return path
+
+
+@pytest.fixture
+def server(db_path):
+    server = Server(StubMain(db_path))
+    yield server
+    server.close()
+
+
+def test_past_day_is_served_with_an_etag(server):
+    response = server.app.test_client().get("/date=2024-11-01")
+    assert response.status_code == 200
+    assert response.headers["ETag"]
+    assert response.headers["Cache-Control"] == "public, max-age=86400"
+    assert b"Pin 7 set to HIGH" in response.data
+
+
+def test_matching_etag_gets_an_empty_304(server):
+    client = server.app.test_client()
+    etag = client.get("/date=2024-11-01").headers["ETag"]
+    response = client.get("/date=2024-11-01", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.data == b""
+    assert server.cache.get_stats()["hits"] == 1
+
+
+def test_today_must_be_revalidated(server):
+    response = server.app.test_client().get("/date=2024-11-02")
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"] == "no-cache"
+
+
+def test_new_rows_change_the_etag(server, db_path):
+    client = server.app.test_client()
+    etag = client.get("/date=2024-11-02").headers["ETag"]
+    insert_log(db_path, "2024-11-02 11:00:00", "Pin 7 set to HIGH")
+    # As the database writer does once the rows are committed
+    server.cache.invalidate_dates(["2024-11-02"])
+
+    response = client.get("/date=2024-11-02", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert b"2024-11-02 11:00:00" in response.data
+
+
+def test_day_without_logs_is_not_cached(server):
+    response = server.app.test_client().get("/date=2024-10-31")
+    assert response.status_code == 404
+    assert server.cache.get_stats()["entries"] == 0
@@ -0,0 +1,130 @@
+import json
+import sqlite3
+
+import pytest
+
+pytest.importorskip("flask")
+
+from database import ReadConnectionPool
+from server import Server
+
+
+class StubMain:
+    def debug(self, message):
+        pass
+
+
+@pytest.fixture
+def server(tmp_path):
+    path = tmp_path / "database.db"
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE light_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT NOT NULL,
+            string TEXT NOT NULL,
+            timer_id TEXT,
+            time FLOAT
+            )
+    """)
+    conn.execute("CREATE INDEX idx_light_logs_timestamp ON light_logs (timestamp)")
+    # Several logs share a timestamp, so pages must break ties on the id
+    conn.executemany("INSERT INTO light_logs (timestamp, string, timer_id, time) VALUES (?, ?, ?, ?)",
+                     [(f"2024-11-01 10:00:{second // 3:02d}", f"message {second}", None, None)
+                      for second in range(10)])
+    conn.commit()
+    conn.close()
+
+    # Only the parts of the server the log queries need
+    server = Server.__new__(Server)
+    server.main = StubMain()
+    server.read_pool = ReadConnectionPool(str(path))
+    yield server
+    server.read_pool.close()
+
+
+def read_every_page(server, limit, order, start=None, end=None):
+    messages, cursor = [], None
+    while True:
+        logs, next_cursor = server.get_logs(start, end, limit, server.parse_cursor(cursor), order)
+        messages.extend(log["message"] for log in logs)
+        if next_cursor is None:
+            return messages
+        cursor = next_cursor
+
+
+@pytest.mark.parametrize("limit", [1, 3, 4, 10])
+def test_pages_cover_every_log_once_in_order(server, limit):
+    assert read_every_page(server, limit, "asc") == [f"message {index}" for index in range(10)]
+    assert read_every_page(server, limit, "desc") == [f"message {index}" for index in reversed(range(10))]
+
+
+def test_last_page_has_no_cursor(server):
+    logs, next_cursor = server.get_logs(limit=10)
+    assert len(logs) == 10
+    assert next_cursor is None
+
+
+def test_pages_stay_in_the_range(server):
+    messages = read_every_page(server, 2, "asc", "2024-11-01 10:00:01", "2024-11-01 10:00:03")
+    assert messages == [f"message {index}" for index in range(3, 9)]
+
+
+def test_pages_are_read_from_the_timestamp_index(server):
+    query, params = server.build_logs_query(None, None, ("2024-11-01 10:00:01", 4), "desc")
+    plan = " ".join(row[-1] for row in server.read_pool.get().execute("EXPLAIN QUERY PLAN " + query, params))
+    assert "idx_light_logs_timestamp" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def test_invalid_cursor_is_rejected():
+    with pytest.raises(ValueError):
+        Server.parse_cursor("2024-11-01 10:00:00|abc")
+
+
+class ExportMain(StubMain):
+    def __init__(self, path):
+        self.config = {"database": {"path": str(path)}, "server": {}}
+
+    def get_config(self):
+        return self.config
+
+    def get_logger(self):
+        return None
+
+    def get_database(self):
+        return None
+
+
+@pytest.fixture
+def client(server, tmp_path):
+    server = Server(ExportMain(tmp_path / "database.db"))
+    yield server.app.test_client()
+    server.close()
+
+
+def test_export_is_a_json_array(client):
+    response = client.get("/api/logs/export?start=2024-11-01 10:00:01&end=2024-11-01 10:00:03")
+    assert response.mimetype == "application/json"
+    assert [log["message"] for log in response.get_json()] == [f"message {index}" for index in range(3, 9)]
+
+
+def test_export_as_ndjson(client):
+    response = client.get("/api/logs/export?format=ndjson&order=desc")
+    assert response.mimetype == "application/x-ndjson"
+    lines = response.get_data(as_text=True).splitlines()
+    assert [json.loads(line)["message"] for line in lines] == [f"message {index}" for index in reversed(range(10))]
+
+
+def test_export_is_aborted_on_a_database_error(client, monkeypatch):
+    rows = []
+
+    def failing_row_to_log(row):
+        rows.append(row)
+        if len(rows) == 3:
+            raise sqlite3.OperationalError("disk I/O error")
+        return Server.row_to_log(row)
+
+    monkeypatch.setattr(Server, "row_to_log", staticmethod(failing_row_to_log))
+    with pytest.raises(sqlite3.OperationalError):
+        client.get("/api/logs/export?format=ndjson").get_data()
@@ -0,0 +1,83 @@
+import pytest
+
+pytest.importorskip("flask")
+
+from flask import render_template
+
+from database import Database
+from server import Server
+
+
+class StubLogger:
+    def add_message(self, message, date_time):
+        pass
+
+
+class StubMain:
+    def __init__(self, path):
+        self.config = {"database": {"path": str(path), "flush_interval": 0.01}, "server": {}}
+
+    def get_server(self):
+        return None
+
+    def get_events(self):
+        return None
+
+    def get_logger(self):
+        return StubLogger()
+
+    def get_database(self):
+        return None
+
+    def get_config(self):
+        return self.config
+
+    def get_current_time(self):
+        return "2024-11-02 12:00:00"
+
+    def get_current_date(self):
+        return "2024-11-02"
+
+    def debug(self, message):
+        pass
+
+
+@pytest.fixture
+def server(tmp_path):
+    main = StubMain(tmp_path / "db" / "database.db")
+    database = Database(main)
+    database.save_to_db("Pin 7 set to HIGH", "1", 0.02, "2024-11-01 10:00:00")
+    database.save_to_db("Pin 7 set to HIGH", "2", 0.01, "2024-11-02 10:00:00")
+    database.save_to_db("Pin 7 set to LOW", "3", 0.03, "2024-11-02 10:30:00")
+    database.save_to_db("Pin 7 set to LOW", None, None, "2024-11-02 11:00:00")
+    database.close()
+    server = Server(main)
+    yield server
+    server.close()
+
+
+def test_todays_charts_are_read_per_hour(server):
+    assert server.get_performance_data("2024-11-02") == [{"timestamps": "10:00", "time": pytest.approx(0.02)}]
+    assert server.get_high_low_data("2024-11-02") == [{"hour": "10:00", "high": 1, "low": 1},
+                                                      {"hour": "11:00", "high": 0, "low": 1}]
+
+
+def test_todays_charts_do_not_read_the_logs(server):
+    conn = server.read_pool.get()
+    query = "EXPLAIN QUERY PLAN SELECT hour, high_count, low_count FROM hourly_rollup WHERE hour >= ? AND hour < ?"
+    plan = " ".join(row[-1] for row in conn.execute(query, server.get_day_range("2024-11-02")))
+    assert "light_logs" not in plan
+
+
+def test_metrics_page_renders(server):
+    response = server.app.test_client().get("/metrics")
+    assert response.status_code == 200
+    assert b"3 entries (1 high, 2 low)" in response.data
+
+
+def test_summary_without_a_p95_renders(server):
+    summary = {"count": 1, "high": 1, "low": 0, "min": 0.01, "avg": 0.01, "p95": None}
+    with server.app.test_request_context("/metrics"):
+        page = render_template("metrics.html", daily_data=[], today_performance=[], today_summary=summary,
+                               high_low_data=[])
+    assert "average <strong>0.010</strong> seconds." in page
@@ -0,0 +1,129 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("requests")
+
+from thingspeak_uploader import ThingSpeakUploader
+
+
+class StubThingSpeak:
+    def __init__(self):
+        """
+        Local stand-in for ThingSpeak, recording the bulk updates and answering with the queued status codes.
+        """
+        self.updates = []
+        self.statuses = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                stub.updates.append((time.monotonic(), self.path, body))
+                self.send_response(stub.statuses.pop(0) if stub.statuses else 202)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, args=(0.01,), daemon=True).start()
+
+    def wait_for(self, count, timeout=5):
+        deadline = time.monotonic() + timeout
+        while len(self.updates) < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return len(self.updates) >= count
+
+
+# The uploader times the rate limit from when it starts a request, the stub from when it arrives
+TOLERANCE = 0.05
+
+
+class StubMain:
+    def __init__(self, url, **thingspeak):
+        self.config = {"thingspeak": dict({"url": url, "min_interval": 0, "retry_delay": 0.05}, **thingspeak)}
+        self.messages = []
+
+    def get_config(self):
+        return self.config
+
+    def add_message(self, message):
+        self.messages.append(message)
+
+    def debug(self, message):
+        pass
+
+
+@pytest.fixture
+def thingspeak():
+    stub = StubThingSpeak()
+    yield stub
+    stub.server.shutdown()
+
+
+def test_points_are_uploaded_to_their_channel(thingspeak):
+    uploader = ThingSpeakUploader(StubMain(thingspeak.url), {"42": "KEY"})
+    uploader.send("42", 1)
+    assert thingspeak.wait_for(1)
+    uploader.close()
+    _, path, body = thingspeak.updates[0]
+    assert path == "/channels/42/bulk_update.json"
+    assert body["write_api_key"] == "KEY"
+    assert [point["field1"] for point in body["updates"]] == [1]
+
+
+def test_points_queued_during_the_rate_limit_are_coalesced(thingspeak):
+    uploader = ThingSpeakUploader(StubMain(thingspeak.url, min_interval=0.3), {"42": "KEY"})
+    uploader.send("42", 1)
+    assert thingspeak.wait_for(1)
+    for value in (2, 3, 4):
+        uploader.send("42", value)
+    assert thingspeak.wait_for(2)
+    uploader.close()
+    (first, _, _), (second, _, body) = thingspeak.updates
+    assert [point["field1"] for point in body["updates"]] == [2, 3, 4]
+    assert second - first >= 0.3 - TOLERANCE
+
+
+def test_failed_uploads_are_retried_with_backoff(thingspeak):
+    thingspeak.statuses = [500, 500]
+    uploader = ThingSpeakUploader(StubMain(thingspeak.url), {"42": "KEY"})
+    uploader.send("42", 1)
+    # New points must not cut the backoff short
+    for value in range(2, 6):
+        time.sleep(0.02)
+        uploader.send("42", value)
+    assert thingspeak.wait_for(3)
+    uploader.close()
+    times = [update[0] for update in thingspeak.updates]
+    assert times[1] - times[0] >= 0.05 - TOLERANCE / 2
+    assert times[2] - times[1] >= 0.1 - TOLERANCE
+    assert [point["field1"] for point in thingspeak.updates[2][2]["updates"]] == [1, 2, 3, 4, 5]
+
+
+def test_points_are_dropped_and_reported_after_max_retries(thingspeak):
+    thingspeak.statuses = [500] * 10
+    main = StubMain(thingspeak.url, max_retries=1)
+    uploader = ThingSpeakUploader(main, {"42": "KEY"})
+    uploader.send("42", 1)
+    assert thingspeak.wait_for(2)
+    deadline = time.monotonic() + 5
+    while not main.messages and time.monotonic() < deadline:
+        time.sleep(0.01)
+    uploader.close()
+    assert main.messages and "Dropped 1 ThingSpeak point(s)" in main.messages[0]
+
+
+def test_close_uploads_the_queued_points(thingspeak):
+    uploader = ThingSpeakUploader(StubMain(thingspeak.url, min_interval=0.2), {"42": "KEY"})
+    uploader.send("42", 1)
+    assert thingspeak.wait_for(1)
+    uploader.send("42", 2)
+    uploader.close()
+    assert len(thingspeak.updates) == 2
+    assert thingspeak.updates[1][0] - thingspeak.updates[0][0] >= 0.2 - TOLERANCE
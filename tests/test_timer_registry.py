@@ -0,0 +1,86 @@
+import time
+
+import timer_registry
+from instrumentation import stats
+from timer_registry import TimerRegistry
+
+
+class StubMain:
+    def __init__(self):
+        self.messages = []
+
+    def debug(self, message):
+        self.messages.append(message)
+
+
+def test_stop_returns_the_elapsed_time():
+    timers = TimerRegistry(StubMain(), sweep_interval=0)
+    timer_id = timers.start()
+    elapsed = timers.stop(timer_id)
+    assert elapsed is not None and elapsed >= 0
+    assert timers.get_stats() == {"pending": 0, "started": 1, "stopped": 1, "expired": 0, "orphaned": 0}
+
+
+def test_ids_are_compact():
+    timers = TimerRegistry(StubMain(), sweep_interval=0)
+    ids = [timers.start() for _ in range(300)]
+    assert len(set(ids)) == 300
+    assert ids[0] == f"{timers.prefix}-1"
+    assert ids[-1] == f"{timers.prefix}-12c"
+    assert all(":" not in timer_id and len(timer_id) <= 8 for timer_id in ids)
+
+
+def test_timer_is_only_stopped_once():
+    timers = TimerRegistry(StubMain(), sweep_interval=0)
+    timer_id = timers.start()
+    timers.stop(timer_id)
+    assert timers.stop(timer_id) is None
+    assert timers.get_stats()["orphaned"] == 1
+
+
+def test_garbage_ids_are_orphaned():
+    timers = TimerRegistry(StubMain(), sweep_interval=0)
+    assert timers.stop("not a timer") is None
+    assert timers.stop(None) is None
+    assert timers.get_stats()["orphaned"] == 2
+
+
+def test_ids_differ_across_restarts(monkeypatch):
+    prefixes = iter(["aaaa", "bbbb"])
+    monkeypatch.setattr(timer_registry.secrets, "token_hex", lambda nbytes: next(prefixes))
+    previous = TimerRegistry(StubMain(), sweep_interval=0)
+    late_reply = [previous.start() for _ in range(5)][0]
+    timers = TimerRegistry(StubMain(), sweep_interval=0)
+    timer_id = timers.start()
+    assert timer_id != late_reply
+    assert timers.stop(late_reply) is None
+    assert timer_id in timers.timers
+
+
+def test_round_trip_is_recorded_per_command():
+    stats.reset()
+    timers = TimerRegistry(StubMain(), sweep_interval=0)
+    timers.stop(timers.start("GETSTATE"))
+    timers.stop(timers.start("GETSTATE"))
+    timers.stop(timers.start())
+    stages = stats.snapshot()["stages"]
+    assert stages["arduino.round_trip.GETSTATE"]["count"] == 2
+    assert not any(stage.startswith("arduino.round_trip.None") for stage in stages)
+
+
+def test_sweep_expires_old_timers():
+    main = StubMain()
+    timers = TimerRegistry(main, ttl=0, sweep_interval=0)
+    timer_id = timers.start()
+    time.sleep(0.001)
+    assert timers.sweep() == 1
+    assert timers.stop(timer_id) is None
+    assert timers.get_stats()["expired"] == 1
+    assert main.messages
+
+
+def test_sweep_thread_stops_on_close():
+    timers = TimerRegistry(StubMain(), sweep_interval=0.01)
+    timers.close()
+    timers.sweep_thread.join(timeout=1)
+    assert not timers.sweep_thread.is_alive()
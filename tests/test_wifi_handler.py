@@ -0,0 +1,73 @@
+import socket
+
+import pytest
+
+pytest.importorskip("flask")
+
+from wifi_handler import WiFiClientHandler
+
+
+class StubServer:
+    def run(self):
+        pass
+
+
+class StubMain:
+    def __init__(self):
+        self.config = {"arduino": {"host": "127.0.0.1", "port": 5001, "max_message_size": 16}}
+        self.messages = []
+
+    def get_config(self):
+        return self.config
+
+    def get_server(self):
+        return StubServer()
+
+    def get_logger(self):
+        return None
+
+    def add_message(self, message):
+        self.messages.append(message)
+
+    def debug(self, message):
+        pass
+
+
+@pytest.fixture
+def connection():
+    handler = WiFiClientHandler(StubMain())
+    arduino, handler.client_socket = socket.socketpair()
+    yield handler, arduino
+    arduino.close()
+    handler.disconnect()
+
+
+def receive(handler, arduino, data):
+    arduino.sendall(data)
+    assert handler.receive_chunk()
+    return list(handler.pending_messages)
+
+
+def test_messages_are_split_on_newlines(connection):
+    handler, arduino = connection
+    assert receive(handler, arduino, b"1:HIGH\n2:LOW\n3:HI") == ["1:HIGH", "2:LOW"]
+    assert receive(handler, arduino, b"GH\n") == ["1:HIGH", "2:LOW", "3:HIGH"]
+    assert handler.main.messages == ["1:HIGH", "2:LOW", "3:HIGH"]
+
+
+def test_oversized_message_in_one_chunk_is_dropped(connection):
+    handler, arduino = connection
+    assert receive(handler, arduino, b"1:HIGH\n" + b"x" * 40 + b"\n2:LOW\n") == ["1:HIGH", "2:LOW"]
+
+
+def test_tail_of_an_oversized_message_is_dropped(connection):
+    handler, arduino = connection
+    assert receive(handler, arduino, b"x" * 40) == []
+    assert receive(handler, arduino, b"still the same message\n1:HIGH\n") == ["1:HIGH"]
+
+
+def test_closed_connection_ends_the_messages(connection):
+    handler, arduino = connection
+    arduino.sendall(b"1:HIGH\n")
+    arduino.close()
+    assert list(handler.iter_messages()) == ["1:HIGH"]
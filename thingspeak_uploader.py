@@ -0,0 +1,162 @@
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import requests
+
+
+class ChannelUploader:
+    def __init__(self, uploader, channel_id, api_key):
+        """
+        Queues the points of one ThingSpeak channel and uploads them from a background thread,
+        coalescing everything queued since the last upload into a single bulk update.
+        :param uploader: The ThingSpeakUploader owning this channel.
+        :param channel_id: The ThingSpeak channel ID.
+        :param api_key: The channel's write API key.
+        """
+        self.uploader = uploader
+        self.channel_id = channel_id
+        self.api_key = api_key
+        self.points = deque(maxlen=uploader.queue_size)
+        self.condition = threading.Condition()
+        self.closing = False
+        self.last_upload = 0.0
+        self.dropped = 0
+        self.thread = threading.Thread(target=self.upload_loop, name=f"thingspeak-{channel_id}", daemon=True)
+        self.thread.start()
+
+    def send(self, value):
+        """
+        Queue a point for upload. Never blocks on the network.
+        :param value: The value for field1.
+        """
+        point = {"created_at": datetime.now().astimezone().isoformat(timespec="seconds"), "field1": value}
+        with self.condition:
+            if len(self.points) == self.points.maxlen:
+                self.dropped += 1
+            self.points.append(point)
+            self.condition.notify()
+
+    def upload_loop(self):
+        """
+        Wait for points and for the rate limit window, then upload them, retrying with exponential backoff.
+        New points and closing wake the thread, but it only uploads once both the rate limit window
+        and the retry backoff have passed. Closing skips the backoff, but not the rate limit.
+        """
+        retries = 0
+        retry_at = 0.0
+        while True:
+            with self.condition:
+                while True:
+                    if not self.points:
+                        if self.closing:
+                            return
+                        self.condition.wait()
+                        continue
+                    # Respect the channel's rate limit, points queued meanwhile join this upload
+                    next_attempt = self.last_upload + self.uploader.min_interval
+                    if not self.closing:
+                        next_attempt = max(next_attempt, retry_at)
+                    wait = next_attempt - time.monotonic()
+                    if wait <= 0:
+                        break
+                    self.condition.wait(wait)
+                batch = [self.points.popleft() for _ in range(min(len(self.points), self.uploader.max_batch))]
+
+            self.last_upload = time.monotonic()
+            if self.upload(batch):
+                retries = 0
+                continue
+
+            with self.condition:
+                retries += 1
+                if retries > self.uploader.max_retries or self.closing:
+                    self.uploader.report_error(f"Dropped {len(batch)} ThingSpeak point(s) "
+                                               f"for channel {self.channel_id} after {retries} attempt(s).")
+                    retries = 0
+                    continue
+                # Put the points back in order, ahead of anything queued since
+                self.points.extendleft(reversed(batch))
+                retry_at = time.monotonic() + self.uploader.retry_delay * 2 ** (retries - 1)
+
+    def upload(self, batch):
+        """
+        Send points to ThingSpeak in one bulk update.
+        :param batch: The points to send.
+        :return: True if ThingSpeak accepted the points, False otherwise.
+        """
+        url = f"{self.uploader.url}/channels/{self.channel_id}/bulk_update.json"
+        try:
+            response = requests.post(url, json={"write_api_key": self.api_key, "updates": batch},
+                                     timeout=self.uploader.timeout)
+            if response.status_code in (200, 202):
+                self.uploader.main.debug(f"Uploaded {len(batch)} point(s) to ThingSpeak channel {self.channel_id}.")
+                return True
+            self.uploader.main.debug(f"ThingSpeak channel {self.channel_id} returned {response.status_code}.")
+        except Exception as e:
+            self.uploader.main.debug(f"ThingSpeak upload to channel {self.channel_id} failed: {e}")
+        return False
+
+    def close(self, timeout):
+        """
+        Upload the remaining points and stop the thread.
+        :param timeout: Maximum time to wait in seconds.
+        """
+        with self.condition:
+            self.closing = True
+            self.condition.notify()
+        self.thread.join(timeout)
+
+
+class ThingSpeakUploader:
+    def __init__(self, main, api_keys):
+        """
+        Uploads data to ThingSpeak in the background, with a queue per channel.
+        :param main: The Main instance.
+        :param api_keys: Dictionary of channel ID to write API key.
+        """
+        self.main = main
+        thingspeak_config = main.get_config().get("thingspeak", {})
+        self.url: str = thingspeak_config.get("url", "https://api.thingspeak.com").rstrip("/")
+        # Free accounts may only update a channel every 15 seconds
+        self.min_interval: float = thingspeak_config.get("min_interval", 15)
+        self.max_retries: int = thingspeak_config.get("max_retries", 5)
+        self.retry_delay: float = thingspeak_config.get("retry_delay", 2)
+        self.queue_size: int = thingspeak_config.get("queue_size", 960)
+        self.timeout: float = thingspeak_config.get("timeout", 10)
+        # ThingSpeak accepts up to 960 points per bulk update
+        self.max_batch = 960
+        self.api_keys = api_keys
+        self.channels = {}
+        self.lock = threading.Lock()
+
+    def send(self, channel_id, value):
+        """
+        Queue a value for upload to a channel's field1. Returns immediately.
+        :param channel_id: The ThingSpeak channel ID.
+        :param value: The value to send.
+        """
+        channel = self.channels.get(channel_id)
+        if channel is None:
+            with self.lock:
+                channel = self.channels.get(channel_id)
+                if channel is None:
+                    channel = ChannelUploader(self, channel_id, self.api_keys[channel_id])
+                    self.channels[channel_id] = channel
+        channel.send(value)
+
+    def report_error(self, message):
+        """
+        Log an upload error.
+        :param message: The error message.
+        """
+        self.main.add_message(f"[ERROR] {message}")
+
+    def close(self, timeout=5):
+        """
+        Upload what is still queued and stop the channel threads.
+        :param timeout: Maximum time to wait per channel, in seconds.
+        """
+        for channel in list(self.channels.values()):
+            channel.close(timeout)
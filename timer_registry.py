@@ -0,0 +1,117 @@
+import itertools
+import secrets
+import threading
+import time
+
+from instrumentation import stats
+
+
+class TimerRegistry:
+    def __init__(self, main, ttl=30, sweep_interval=5):
+        """
+        Round trip timers of the commands sent to the Arduino, safe to use from any thread.
+        Timers are started on the tracker's thread and stopped on the server's request threads,
+        and the ones whose reply never arrives are expired by a background sweep.
+        Each round trip is recorded in the instrumentation as arduino.round_trip.<command>.
+        :param main: The Main instance.
+        :param ttl: Seconds a timer waits for its reply before it expires.
+        :param sweep_interval: Seconds between sweeps for expired timers, 0 disables the sweep.
+        """
+        self.main = main
+        self.ttl_ns = int(ttl * 1e9)
+        self.sweep_interval = sweep_interval
+        # Single dict operations are atomic, so starting and stopping timers needs no lock,
+        # and pop() makes sure a timer is only ever stopped or expired once.
+        self.timers = {}
+        # IDs are a random prefix picked for this run and a hexadecimal counter, e.g. 3fa2-1b.
+        # A previous run's late replies carry another prefix, so they are counted as orphaned
+        # instead of stopping this run's timers. The prefix must not contain the ':' ending the ID.
+        self.prefix = secrets.token_hex(2)
+        self.ids = itertools.count(1)
+        # Only the counters shared by the request threads need a lock
+        self.counter_lock = threading.Lock()
+        self.started = 0
+        self.stopped = 0
+        self.expired = 0
+        self.orphaned = 0
+        self.stop_event = threading.Event()
+        self.sweep_thread = None
+        if sweep_interval:
+            self.sweep_thread = threading.Thread(target=self.sweep_loop, name="timer-sweep", daemon=True)
+            self.sweep_thread.start()
+
+    def start(self, command=None):
+        """
+        Start a timer.
+        :param command: The command being timed, e.g. GETSTATE, None to not record its round trip.
+        :return: The timer's ID, a short string unique to this run.
+        """
+        self.started = next(self.ids)
+        timer_id = f"{self.prefix}-{self.started:x}"
+        self.timers[timer_id] = (time.perf_counter_ns(), command)
+        return timer_id
+
+    def stop(self, timer_id):
+        """
+        Stop a timer.
+        :param timer_id: The timer's ID, as sent back by the Arduino.
+        :return: Elapsed time in seconds, or None if there is no such timer or it expired.
+        """
+        now = time.perf_counter_ns()
+        timer = self.timers.pop(timer_id, None) if isinstance(timer_id, str) else None
+
+        with self.counter_lock:
+            if timer is None:
+                # A late reply, a reply to another process' timer, or garbage
+                self.orphaned += 1
+                return None
+            self.stopped += 1
+        started, command = timer
+        elapsed = (now - started) / 1e9
+        if command is not None:
+            stats.record(f"arduino.round_trip.{command}", elapsed)
+        return elapsed
+
+    def sweep(self):
+        """
+        Remove the timers older than the TTL.
+        :return: The number of timers that expired.
+        """
+        deadline = time.perf_counter_ns() - self.ttl_ns
+        expired = 0
+        for timer_id, (started, command) in list(self.timers.items()):
+            # Another thread may have stopped the timer since the copy was made
+            if started < deadline and self.timers.pop(timer_id, None) is not None:
+                expired += 1
+        if expired:
+            with self.counter_lock:
+                self.expired += expired
+            self.main.debug(f"Expired {expired} timers without a reply.")
+        return expired
+
+    def sweep_loop(self):
+        """
+        Sweep for expired timers every sweep_interval seconds until closed.
+        """
+        while not self.stop_event.wait(self.sweep_interval):
+            self.sweep()
+
+    def get_stats(self):
+        """
+        Get the registry's counters.
+        :return: A dictionary of the counters and the number of pending timers.
+        """
+        with self.counter_lock:
+            return {
+                "pending": len(self.timers),
+                "started": self.started,
+                "stopped": self.stopped,
+                "expired": self.expired,
+                "orphaned": self.orphaned,
+            }
+
+    def close(self):
+        """
+        Stop the background sweep.
+        """
+        self.stop_event.set()
@@ -1,5 +1,8 @@
 import socket
+import time
+from collections import deque
 from server import Server
+from instrumentation import stats
 
 client_handler = None
 class WiFiClientHandler:
@@ -13,6 +16,12 @@ class WiFiClientHandler:
         self.port: int = self.config['arduino']["port"]
         print(f"Connecting to {self.host}:{self.port}")
         self.client_socket = None
+        # Bytes received but not yet terminated by a newline, and complete messages not yet read
+        self.receive_buffer = bytearray()
+        # Set after an oversized message is discarded, until the newline that ends it
+        self.discarding = False
+        self.pending_messages = deque()
+        self.max_message_size: int = self.config['arduino'].get("max_message_size", 1024)
         self.server = main.get_server()
         self.server.run()
         self.logger = main.get_logger()
@@ -56,36 +65,94 @@ class WiFiClientHandler:
 
         try:
             # Add newline to indicate end of message
-            self.client_socket.sendall((message.strip() + '\n').encode())
+            with stats.timed("arduino.send"):
+                self.client_socket.sendall((message.strip() + '\n').encode())
             print(f"Sent: {message}")
         except Exception as e:
             print(f"Error sending message: {e}")
 
+    def send_command(self, command):
+        """
+        Sends a command to the Arduino server, with a new timer to measure the reply time.
+
+        :param command: The command, e.g. FLIPSTATE or GETSTATE
+        """
+        self.send_message(f"{self.main.start_timer(command)}:{command}")
+
     def receive_message(self):
         """
-        Receives a message from the Arduino server.
+        Receives one complete, newline terminated message from the Arduino server.
+
+        :return: The received message as a string, or None if the connection failed or closed
+        """
+        while not self.pending_messages:
+            if not self.receive_chunk():
+                return None
+        return self.pending_messages.popleft()
+
+    def iter_messages(self):
+        """
+        Yields complete messages from the Arduino server until the connection closes.
 
-        :return: The received message as a string
+        :return: A generator of messages
+        """
+        while True:
+            message = self.receive_message()
+            if message is None:
+                return
+            yield message
+
+    def receive_chunk(self):
+        """
+        Reads from the socket into the receive buffer, and moves every complete message to the pending messages.
+        Messages are terminated by a newline, like the ones sent by send_message.
+
+        :return: False if the connection failed or was closed, True otherwise
         """
         if not self.client_socket:
             print("Not connected to the server. Call connect() first.")
-            i = 1
-            while i < 10:
-                print(f"Retrying {10-i} more times...")
-                self.client_socket.connect()
-                i += 1
-            if not self.client_socket:
-                exit()
+            return False
 
         try:
-            response = self.client_socket.recv(1024).decode().strip()
-            if response != " " and response != "":
-                self.main.add_message(response)
-                self.main.debug(f"SERVER: Received from Arduino: {response}")
-            return response
+            chunk = self.client_socket.recv(4096)
         except Exception as e:
             print(f"Error receiving message: {e}")
-            return None
+            return False
+        if not chunk:
+            print("Connection closed by the Arduino server.")
+            return False
+
+        # Time spent handling the data, not waiting for it
+        start = time.perf_counter()
+        if self.discarding:
+            # Drop the rest of the discarded message, it isn't a message of its own
+            newline = chunk.find(b"\n")
+            if newline == -1:
+                return True
+            chunk = chunk[newline + 1:]
+            self.discarding = False
+
+        self.receive_buffer += chunk
+        *lines, remainder = self.receive_buffer.split(b"\n")
+        self.receive_buffer = bytearray(remainder)
+        # Don't let a sender that never terminates its messages grow the buffer forever
+        if len(self.receive_buffer) > self.max_message_size:
+            print(f"Discarding {len(self.receive_buffer)} bytes received without a newline.")
+            self.receive_buffer.clear()
+            self.discarding = True
+
+        for line in lines:
+            # A message can also arrive whole in one chunk, without ever sitting in the buffer
+            if len(line) > self.max_message_size:
+                print(f"Discarding a {len(line)} byte message, longer than {self.max_message_size} bytes.")
+                continue
+            response = line.decode(errors="replace").strip()
+            if response != "":
+                self.main.add_message(response)
+                self.main.debug(f"SERVER: Received from Arduino: {response}")
+                self.pending_messages.append(response)
+        stats.record("arduino.receive", time.perf_counter() - start)
+        return True
 
     def disconnect(self):
         """
@@ -100,6 +167,15 @@ class WiFiClientHandler:
         self.client_socket = None
 
 
+def register_client_handler(handler):
+    """
+    Set the handler used by send_message, for transports other than WiFiClientHandler.
+    :param handler: Object with a send_message method.
+    """
+    global client_handler
+    client_handler = handler
+
+
 def send_message(message):
     """
     Static method to send a message to the arduino.